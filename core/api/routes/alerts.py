@@ -15,129 +15,106 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from fastapi import APIRouter, UploadFile, File, Request
-from fastapi.responses import JSONResponse, HTMLResponse
-from core.services.ml_classifier import classify_alert, get_latest_model_dir
-from core.services.enrichment.fusion import enrich_ioc
-from core.services.attck_mapper import map_event_to_mitre
-from core.services.actions import suggest_action
-from core.services.create_alert_dataset import generate_dataset_from_results
-from core.services.integrations.webhook import should_trigger_webhook
-from core.services.integrations.webhook_slack import send_webhook_to_slack
-from core.services.risk import calculate_risk_score
-import os, csv, json, logging
+from fastapi import APIRouter, UploadFile, File, Request, Body
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse
+from core.services.alert_pipeline import (iter_upload_rows, process_rows, process_alerts,
+                                          dedup_ratio, ResultsWriter)
+from core.services import alert_writer, results_store, model_registry
 from collections import Counter
+from datetime import datetime
+import os, json, time, logging
 
 router = APIRouter()
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
 
+# Smaller windows when streaming, so the first results go out quickly
+STREAM_BATCH_SIZE = int(os.getenv("ALERT_STREAM_BATCH_SIZE", 25))
+
+STREAM_MEDIA_TYPES = ("application/x-ndjson", "text/event-stream")
+
+# Inline triage (/classify-alert): micro-batch size limit and per-IOC enrichment deadline (0 disables)
+MICRO_BATCH_MAX = int(os.getenv("ALERT_MICRO_BATCH_MAX", 100))
+INLINE_DEADLINE = float(os.getenv("ALERT_INLINE_DEADLINE_SECONDS", 5)) or None
+
+
+def _frame(media_type: str, event: str, payload: dict) -> str:
+    if media_type == "text/event-stream":
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    if event == "alert":
+        return json.dumps(payload) + "\n"
+    return json.dumps({event: payload}) + "\n"
+
+
+def _json_array(results):
+    """
+    Serializes an iterable of results as a JSON array, one item at a time.
+    """
+    yield "["
+    for i, result in enumerate(results):
+        yield ("," if i else "") + json.dumps(result)
+    yield "]"
+
+
+async def _stream_results(file: UploadFile, media_type: str):
+    """
+    Emits each processed alert as soon as it is ready, then a summary frame.
+    Results are persisted as they are emitted, like the buffered response.
+    """
+    started = time.monotonic()
+    batch_stats = {}
+    priorities = Counter()
+    writer = ResultsWriter()
+    committed = False
+    try:
+        async for result in process_rows(iter_upload_rows(file), batch_stats,
+                                         batch_size=STREAM_BATCH_SIZE):
+            writer.write(result)
+            priorities[result.get("ml_priority")] += 1
+            yield _frame(media_type, "alert", result)
+        writer.commit()
+        committed = True
+
+        yield _frame(media_type, "summary", {
+            "rows": batch_stats["rows"],
+            "unique_iocs": batch_stats["unique_iocs"],
+            "dedup_ratio": dedup_ratio(batch_stats),
+            "timed_out": batch_stats["timed_out"],
+            "ml_priority": dict(priorities),
+            "elapsed_seconds": round(time.monotonic() - started, 3)
+        })
+    except Exception as e:
+        logging.error(f"Error API: {e}")
+        yield _frame(media_type, "error", {"error": str(e)})
+    finally:
+        # Also reached when the client disconnects mid-stream
+        if not committed:
+            writer.abort()
+
 
 @router.post("/process-alert")
 async def process_alert(request: Request, file: UploadFile = File(...)):
-    results = []
+    writer = None
     try:
-        previous_results = []
-        try:
-            with open("output/results.json", "r") as f:
-                previous_results = json.load(f)
-        except Exception:
-            previous_results = []
-
-        ioc_history = {}
-        for r in previous_results:
-            ioc_key = f"{r.get('ioc_type')}::{r.get('ioc_value')}"
-            if ioc_key not in ioc_history:
-                ioc_history[ioc_key] = []
-            ioc_history[ioc_key].append(r.get("timestamp"))
-
-        try:
-            _ = get_latest_model_dir()
-        except FileNotFoundError:
+        if not model_registry.is_model_available():
             return JSONResponse(
                 content={"error": "No trained model found. Please train the model before processing alerts."},
                 status_code=400
             )
 
-        content = await file.read()
-        lines = content.decode().splitlines()
-        reader = csv.DictReader(lines)
-
-        for row in reader:
-            event_type = row['event_type']
-            ioc_type = row.get("ioc_type", "ip")
-            ioc_value = row.get("ioc_value") or row.get("src_ip")
-
-            fusion_data = enrich_ioc(ioc_type, ioc_value)
-            abuse_data = fusion_data["sources"].get("abuseipdb", {})
-            simplified_enrichment = {
-                "abuse_score": abuse_data.get("abuse_score", 0),
-                "country": abuse_data.get("country", "unknown"),
-                "usage_type": abuse_data.get("usage_type", "unknown"),
-                "total_reports": abuse_data.get("total_reports", 0),
-                "source": "fusion"
-            }
-
-            legacy_score = calculate_risk_score(abuse_data, event_type)
-            risk_score = fusion_data.get("risk_score", 0)
-            action = suggest_action(risk_score, event_type)
-
-            result = {
-                "timestamp": row["timestamp"],
-                "ioc_type": ioc_type,
-                "ioc_value": ioc_value,
-                "event_type": event_type,
-                "risk_score": risk_score,
-                "legacy_risk_score": legacy_score,
-                "enrichment": simplified_enrichment,
-                "suggested_action": action,
-                "sources": fusion_data.get("sources", {})
-            }
-
-            ioc_key = f"{ioc_type}::{ioc_value}"
-            timestamps = ioc_history.get(ioc_key, [])
-            if timestamps:
-                result["ioc_seen_before"] = True
-                result["seen_count"] = len(timestamps)
-                result["last_seen"] = sorted(timestamps)[-1]
-            else:
-                result["ioc_seen_before"] = False
-                result["seen_count"] = 0
-                result["last_seen"] = None
-
-            result["mitre_technique"] = map_event_to_mitre(event_type)
-            ml_priority, confidence = classify_alert(result)
-            result["ml_priority"] = ml_priority
-            result["confidence_score"] = round(confidence, 3)
-
-            if should_trigger_webhook(result, destination="slack"):
-                send_webhook_to_slack(result)
-
-            logging.info(f"Alert classified as '{ml_priority}' by ML model.")
-            results.append(result)
-
-        os.makedirs("output", exist_ok=True)
-        with open("output/results.json", "w") as f:
-            json.dump(results, f, indent=4)
-
-        generate_dataset_from_results()
-        logging.info("dataset_for_ml.csv updated after processing alerts.")
-
-        try:
-            counter = Counter()
-            for alert in results:
-                country = alert.get("enrichment", {}).get("country")
-                score = alert.get("risk_score", 0)
-                if country and score >= 80:
-                    counter[country] += 1
-
-            top_countries = [c for c, _ in counter.most_common(15)]
-            os.makedirs("data", exist_ok=True)
-            with open("data/high_abuse_countries.json", "w") as f:
-                json.dump(top_countries, f, indent=2)
-            logging.info(f"Updated local statistics by country: {top_countries}")
-        except Exception as e:
-            logging.warning(f"Error updating local statistics by country: {e}")
+        accept = request.headers.get("accept", "")
+        media_type = next((m for m in STREAM_MEDIA_TYPES if m in accept), None)
+        if media_type:
+            return StreamingResponse(_stream_results(file, media_type), media_type=media_type,
+                                     headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+        # Rows are parsed from the upload chunk by chunk, enriched in bounded windows
+        # (each distinct IOC once per window) and flushed to disk as they complete
+        batch_stats = {}
+        writer = ResultsWriter()
+        async for result in process_rows(iter_upload_rows(file), batch_stats):
+            writer.write(result)
+        writer.commit()
 
         if "text/html" in request.headers.get("accept", ""):
             return HTMLResponse(content="""
@@ -149,8 +126,63 @@ async def process_alert(request: Request, file: UploadFile = File(...)):
                 </html>
             """, status_code=200)
 
-        return JSONResponse(content=results)
+        headers = {
+            "X-Enrichment-Rows": str(batch_stats["rows"]),
+            "X-Enrichment-Unique-IOCs": str(batch_stats["unique_iocs"]),
+            "X-Enrichment-Dedup-Ratio": str(dedup_ratio(batch_stats)),
+            "X-Enrichment-Timed-Out": str(batch_stats["timed_out"])
+        }
+        # Stream this batch back from the store instead of holding it in memory
+        return StreamingResponse(_json_array(results_store.iter_results(writer.batch_id)),
+                                 media_type="application/json", headers=headers)
+
+    except Exception as e:
+        if writer is not None:
+            writer.abort()
+        logging.error(f"Error API: {e}")
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+
+@router.post("/classify-alert")
+async def classify_alert_inline(payload: dict | list = Body(...)):
+    """
+    Scores and classifies a single alert (JSON object) or a micro-batch (JSON array)
+    inline. Results are persisted and webhooks sent asynchronously by the alert writer.
+    """
+    started = time.perf_counter()
+    alerts = payload if isinstance(payload, list) else [payload]
+
+    if not alerts:
+        return JSONResponse(content={"error": "No alerts provided."}, status_code=400)
+    if len(alerts) > MICRO_BATCH_MAX:
+        return JSONResponse(content={"error": f"At most {MICRO_BATCH_MAX} alerts per request."}, status_code=413)
+    for i, alert in enumerate(alerts):
+        if not isinstance(alert, dict) or not alert.get("event_type") or \
+                not (alert.get("ioc_value") or alert.get("src_ip")):
+            return JSONResponse(content={"error": f"Alert {i} needs event_type and ioc_value (or src_ip)."},
+                                status_code=422)
+
+    if not model_registry.is_model_available():
+        return JSONResponse(
+            content={"error": "No trained model found. Please train the model before processing alerts."},
+            status_code=400
+        )
 
+    try:
+        now = datetime.now().isoformat(timespec="seconds")
+        rows = [{**alert, "timestamp": alert.get("timestamp") or now} for alert in alerts]
+        results, batch_stats = await process_alerts(rows, INLINE_DEADLINE)
+        alert_writer.enqueue(results)
     except Exception as e:
         logging.error(f"Error API: {e}")
-        return JSONResponse(content={"error": str(e)}, status_code=500)
\ No newline at end of file
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+    return JSONResponse(content=results if isinstance(payload, list) else results[0], headers={
+        "X-Processing-Time-Ms": str(round((time.perf_counter() - started) * 1000, 2)),
+        "X-Enrichment-Timed-Out": str(batch_stats["timed_out"])
+    })
+
+
+@router.get("/classify-alert/writer-stats")
+def alert_writer_stats():
+    return alert_writer.get_stats()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from core.services import archive
+
+router = APIRouter()
+
+
+def _split(value: str) -> list:
+    return [item.strip() for item in value.split(",") if item.strip()] if value else []
+
+
+def _parse_filters(request: Request) -> tuple:
+    """
+    Equality filters (`country=RU,CN`) and numeric ranges (`min_risk_score=80`) from the query string.
+    """
+    filters, ranges = {}, {}
+    for column in archive.FILTER_COLUMNS:
+        values = request.query_params.getlist(column)
+        if values:
+            filters[column] = [item for value in values for item in _split(value)]
+    for column in archive.NUMERIC_COLUMNS:
+        low = request.query_params.get(f"min_{column}")
+        high = request.query_params.get(f"max_{column}")
+        if low is not None or high is not None:
+            ranges[column] = (float(low) if low is not None else None, float(high) if high is not None else None)
+    return filters, ranges
+
+
+@router.get("/archive/query")
+async def query_archive(request: Request, start: str = None, end: str = None, columns: str = None,
+                        limit: int = archive.QUERY_MAX_ROWS):
+    """
+    Archived alerts between the dates `start` and `end` (YYYY-MM-DD), filtered by any
+    of archive.FILTER_COLUMNS and min_/max_ numeric ranges, projected onto `columns`.
+    """
+    try:
+        filters, ranges = _parse_filters(request)
+        rows = await run_in_threadpool(archive.query, _split(columns), start, end, filters, ranges, limit)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    except RuntimeError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=503)
+    return {"count": len(rows), "rows": rows}
+
+
+@router.get("/archive/aggregate")
+async def aggregate_archive(request: Request, group_by: str = None, metrics: str = None,
+                            start: str = None, end: str = None):
+    """
+    Alert counts per group (e.g. `group_by=country,mitre_id`) with optional averages
+    of numeric `metrics` (e.g. `metrics=risk_score`), using the same filters as /archive/query.
+    """
+    try:
+        filters, ranges = _parse_filters(request)
+        rows = await run_in_threadpool(archive.aggregate, _split(group_by), _split(metrics),
+                                       start, end, filters, ranges)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    except RuntimeError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=503)
+    return {"groups": len(rows), "rows": rows}
+
+
+@router.get("/archive/stats")
+def archive_stats():
+    return archive.get_stats()
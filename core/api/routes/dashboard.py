@@ -19,9 +19,10 @@ import os
 import logging
 from fastapi import APIRouter
 from fastapi.responses import HTMLResponse
-from core.services.ml_classifier import get_latest_model_dir
 from core.services.report import generate_html_report
 from core.services.generate_threat_data import generate_threat_data
+from core.services import results_store, model_registry
+from core.api.routes.results import parse_filters
 from core.version import __version__
 from fastapi.templating import Jinja2Templates
 from fastapi import Request
@@ -30,17 +31,13 @@ router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
-REPORT_DIR = os.path.join(BASE_DIR, "output")
 
 
 @router.get("/report")
 def get_report(request: Request):
-    page_path = "/results.json"
     fallback_page_title = "Report"
 
-    try:
-        _ = get_latest_model_dir()
-    except FileNotFoundError:
+    if not model_registry.is_model_available():
         return templates.TemplateResponse("train_fallback.html", {
             "request": request,
             "page_title": fallback_page_title,
@@ -48,7 +45,8 @@ def get_report(request: Request):
         })
 
     try:
-        html = generate_html_report(REPORT_DIR + page_path)
+        html = generate_html_report(parse_filters(request.query_params), request.query_params.get("cursor"),
+                                    dict(request.query_params))
         html = html.replace("{{ version }}", __version__)
         return HTMLResponse(content=html, status_code=200)
     except Exception as e:
@@ -64,9 +62,7 @@ def get_dashboard(request: Request):
     page_path = "static/public/artifacts/dashboard.html"
     fallback_page_title = "Dashboard - Model Performance"
 
-    try:
-        _ = get_latest_model_dir()
-    except FileNotFoundError:
+    if not model_registry.is_model_available():
         return templates.TemplateResponse("train_fallback.html", {
             "request": request,
             "page_title": fallback_page_title,
@@ -88,12 +84,9 @@ def get_dashboard(request: Request):
 
 @router.get("/threat-overview")
 def threat_overview(request: Request):
-    page_path = BASE_DIR+"/output/results.json"
     fallback_page_title = "Dashboard - Threat Intelligence Overview"
 
-    try:
-        _ = get_latest_model_dir()
-    except FileNotFoundError:
+    if not model_registry.is_model_available():
         return templates.TemplateResponse("train_fallback.html", {
             "request": request,
             "page_title": fallback_page_title,
@@ -101,7 +94,7 @@ def threat_overview(request: Request):
         })
 
     try:
-        if os.path.exists(page_path):
+        if results_store.count() or results_store.count_compacted():
             data = generate_threat_data()
             return templates.TemplateResponse("threat_overview.html",
                                               {"request": request, "data": data, "version": __version__})
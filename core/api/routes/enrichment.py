@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from core.services.enrichment import cache, ratelimit, local_feeds, singleflight, providers, refresher
+
+router = APIRouter()
+
+
+@router.get("/enrichment/cache-stats")
+def enrichment_cache_stats():
+    return JSONResponse(content=cache.get_stats())
+
+
+@router.get("/enrichment/rate-limits")
+def enrichment_rate_limits():
+    return JSONResponse(content=ratelimit.get_stats())
+
+
+@router.get("/enrichment/local-feeds")
+def enrichment_local_feeds():
+    return JSONResponse(content=local_feeds.get_stats())
+
+
+@router.get("/enrichment/coalescing")
+def enrichment_coalescing():
+    return JSONResponse(content=singleflight.get_stats())
+
+
+@router.get("/enrichment/providers")
+def enrichment_providers():
+    return JSONResponse(content=providers.get_stats())
+
+
+@router.get("/enrichment/refresher")
+def enrichment_refresher():
+    return JSONResponse(content=refresher.get_stats())
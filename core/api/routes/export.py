@@ -16,13 +16,12 @@
 # limitations under the License.
 
 import os
-import json
 import logging
 import pandas as pd
 from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-import io
+from core.services import results_store
 from core.version import __version__
 
 router = APIRouter()
@@ -31,16 +30,43 @@ templates = Jinja2Templates(directory="templates")
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
 
 
+EXPORT_CHUNK_SIZE = 1000
+
+
+def _chunks(iterable, size: int):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _export_columns() -> list:
+    """
+    Union of the flattened columns of all stored results, in first-seen order.
+    """
+    columns = {}
+    for chunk in _chunks(results_store.iter_results(), EXPORT_CHUNK_SIZE):
+        columns.update(dict.fromkeys(pd.json_normalize(chunk).columns))
+    return list(columns)
+
+
+def _iter_csv(columns: list):
+    yield pd.DataFrame(columns=columns).to_csv(index=False)
+    for chunk in _chunks(results_store.iter_results(), EXPORT_CHUNK_SIZE):
+        yield pd.json_normalize(chunk).reindex(columns=columns).to_csv(index=False, header=False)
+
+
 @router.get("/export-results-csv")
 def export_results_csv():
     try:
-        with open("output/results.json", "r") as f:
-            data = json.load(f)
-
-        df = pd.json_normalize(data)
-        csv_data = df.to_csv(index=False)
+        # Two passes over the store keep memory bounded while producing one consistent header
+        columns = _export_columns()
 
-        return StreamingResponse(io.StringIO(csv_data), media_type="text/csv", headers={
+        return StreamingResponse(_iter_csv(columns), media_type="text/csv", headers={
             "Content-Disposition": "attachment; filename=alerts_export.csv"
         })
 
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from fastapi import APIRouter, UploadFile, File
+from fastapi.responses import JSONResponse, StreamingResponse
+from core.services.alert_pipeline import UPLOAD_CHUNK_SIZE
+from core.services import jobs, model_registry
+import asyncio, logging
+
+router = APIRouter()
+
+
+@router.post("/jobs")
+async def submit_job(file: UploadFile = File(...)):
+    """
+    Stores the uploaded CSV and queues it for background processing.
+    """
+    if not model_registry.is_model_available():
+        return JSONResponse(
+            content={"error": "No trained model found. Please train the model before processing alerts."},
+            status_code=400
+        )
+
+    job = None
+    try:
+        job = jobs.create_job(file.filename)
+        with open(jobs.input_path(job["id"]), "wb") as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                f.write(chunk)
+        job = await asyncio.to_thread(jobs.submit, job["id"])
+        return JSONResponse(content=job, status_code=202, headers={"Location": f"/jobs/{job['id']}"})
+    except Exception as e:
+        logging.error(f"[Jobs] Failed to submit job: {e}")
+        if job is not None:
+            jobs.abort_upload(job["id"], str(e))
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+
+@router.get("/jobs")
+def list_jobs():
+    return jobs.list_jobs()
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = jobs.get_job(job_id)
+    if job is None:
+        return JSONResponse(content={"error": "Job not found"}, status_code=404)
+    return job
+
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = jobs.cancel(job_id)
+    if job is None:
+        return JSONResponse(content={"error": "Job not found"}, status_code=404)
+    return job
+
+
+@router.get("/jobs/{job_id}/results")
+def get_job_results(job_id: str, offset: int = 0, limit: int = None):
+    """
+    Processed alerts as NDJSON; partial while the job is still running.
+    """
+    job = jobs.get_job(job_id)
+    if job is None:
+        return JSONResponse(content={"error": "Job not found"}, status_code=404)
+    return StreamingResponse(jobs.iter_results(job_id, offset, limit), media_type="application/x-ndjson",
+                             headers={"X-Job-Status": job["status"], "X-Job-Rows-Done": str(job["rows_done"])})
@@ -21,7 +21,9 @@ import shutil
 import logging
 from fastapi import APIRouter
 from fastapi.responses import HTMLResponse, JSONResponse
-from core.services.ml_classifier import load_latest_model_and_encoders, get_latest_model_dir
+from core.services.ml_classifier import reload_model
+from core.services.enrichment import cache
+from core.services import results_store, feature_encoder, model_registry
 
 router = APIRouter()
 
@@ -30,16 +32,25 @@ TRAIN_MODEL_DIR = os.path.join(BASE_DIR, "core/models")
 
 
 @router.post("/train-model")
-def train_model():
+def train_model(mode: str = None):
+    """
+    Retrains the model; mode=incremental extends the current version with the alerts
+    added since it was trained (default from ML_TRAINING_MODE).
+    """
+    command = ["python3", os.path.join(TRAIN_MODEL_DIR, "train_alert_classifier.py")]
+    if mode == "incremental":
+        command.append("--incremental")
+    elif mode == "full":
+        command.append("--full")
     try:
         result = subprocess.run(
-            ["python3", os.path.join(TRAIN_MODEL_DIR, "train_alert_classifier.py")],
+            command,
             check=True,
             capture_output=True,
             text=True
         )
 
-        load_latest_model_and_encoders.cache_clear()
+        reload_model()
 
         return HTMLResponse(content="""
             <html>
@@ -70,6 +81,8 @@ def reset_system():
                 path = os.path.join(models_dir, item)
                 if os.path.isdir(path):
                     shutil.rmtree(path)
+                elif item == os.path.basename(model_registry.CURRENT_PATH):
+                    os.remove(path)
 
         for path in [
             os.path.join(BASE_DIR, "output", "results.json"),
@@ -82,11 +95,14 @@ def reset_system():
             if os.path.exists(path):
                 os.remove(path)
 
+        cache.clear()
+        results_store.clear()
+
         artifacts_dir = os.path.join(BASE_DIR, "static", "public", "artifacts")
         if os.path.isdir(artifacts_dir):
             shutil.rmtree(artifacts_dir)
 
-        load_latest_model_and_encoders.cache_clear()
+        reload_model()
 
         return HTMLResponse(content="""
             <html>
@@ -99,4 +115,20 @@ def reset_system():
 
     except Exception as e:
         logging.error(f"Failed to reset system: {e}")
-        return JSONResponse(content={"error": str(e)}, status_code=500)
\ No newline at end of file
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@router.get("/model/status")
+def model_status():
+    """
+    Model version served by this worker and the registry's reload counters.
+    """
+    return model_registry.get_stats()
+
+
+@router.get("/model/encoder-stats")
+def encoder_stats(version: str = None):
+    """
+    Per-feature counts of encoded and unknown (unseen at training time) values for the
+    served model version, or for `version`.
+    """
+    return feature_encoder.get_stats(version or model_registry.get_stats()["version"])
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from core.services import results_store, retention
+
+router = APIRouter()
+
+LIST_FILTERS = ("ioc_type", "ioc_value", "ml_priority", "event_type", "country", "batch_id")
+
+
+def parse_filters(params) -> dict:
+    """
+    Results filters from query parameters; list filters accept comma-separated values.
+    """
+    filters = {}
+    for name in LIST_FILTERS:
+        values = [item.strip() for value in params.getlist(name) for item in value.split(",") if item.strip()]
+        if values:
+            filters[name] = values
+    for name in ("since", "until"):
+        if params.get(name):
+            filters[name] = params[name]
+    for name in ("min_risk", "max_risk"):
+        if params.get(name):
+            filters[name] = float(params[name])
+    if params.get("seen_before"):
+        filters["seen_before"] = params["seen_before"].lower() in ("1", "true", "yes")
+    return filters
+
+
+@router.get("/results")
+def list_results(request: Request, sort: str = "timestamp", order: str = "desc", limit: int = 100,
+                 cursor: str = None):
+    """
+    Pages through stored alerts. Filters: since, until, ioc_type, ioc_value, ml_priority,
+    event_type, country, batch_id, min_risk, max_risk, seen_before. Pass the returned
+    next_cursor back with the same filters and sort to get the next page.
+    """
+    try:
+        items, next_cursor = results_store.query(parse_filters(request.query_params), sort,
+                                                 order.lower() != "asc", limit, cursor)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    return {"count": len(items), "next_cursor": next_cursor, "items": items}
+
+
+@router.get("/sightings/{ioc_type}/{ioc_value:path}")
+def get_sightings(ioc_type: str, ioc_value: str, window_hours: float = 24, since: str = None, until: str = None):
+    """
+    First/last seen and total count for an IOC, plus the number of sightings in a time
+    window: the last `window_hours` hours, or [since, until] (ISO timestamps).
+    """
+    sighting = results_store.get_sighting(ioc_type, ioc_value)
+    if sighting is None:
+        return JSONResponse(content={"ioc_type": ioc_type, "ioc_value": ioc_value, "seen_before": False,
+                                     "count": 0, "count_in_window": 0}, status_code=404)
+
+    if since is None:
+        since = (datetime.now() - timedelta(hours=window_hours)).isoformat(timespec="seconds")
+
+    return {
+        "ioc_type": ioc_type,
+        "ioc_value": ioc_value,
+        "seen_before": True,
+        **sighting,
+        "window": {"since": since, "until": until},
+        "count_in_window": results_store.count_sightings(ioc_type, ioc_value, since, until)
+    }
+
+
+@router.get("/summaries")
+def list_summaries(ioc_type: str = None, ioc_value: str = None, since: str = None, until: str = None,
+                   limit: int = 1000):
+    """
+    Daily per-IOC summaries of alerts older than the retention window.
+    """
+    summaries = list(results_store.iter_summaries(ioc_type, ioc_value, since, until, limit))
+    return {"count": len(summaries), "items": summaries}
+
+
+@router.get("/retention")
+def retention_stats():
+    return retention.get_stats()
+
+
+@router.post("/retention/run")
+async def run_retention():
+    return await run_in_threadpool(retention.run_once)
@@ -17,9 +17,9 @@
 
 import os
 from fastapi import APIRouter
-from core.services.ml_classifier import get_latest_model_dir
 from fastapi import Request
 from fastapi.templating import Jinja2Templates
+from core.services import model_registry
 from core.version import __version__
 
 router = APIRouter()
@@ -32,9 +32,7 @@ def upload_alerts_form(request: Request):
     fallback_path = "train_fallback.html"
     fallback_page_title = "Upload Alerts"
 
-    try:
-        _ = get_latest_model_dir()
-    except FileNotFoundError:
+    if not model_registry.is_model_available():
         return templates.TemplateResponse(fallback_path, {
             "request": request,
             "page_title": fallback_page_title,
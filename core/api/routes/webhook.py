@@ -18,7 +18,7 @@
 from fastapi import APIRouter, Request, Form
 from fastapi.responses import RedirectResponse
 from fastapi.templating import Jinja2Templates
-from core.services.webhook_rules import load_rules, save_rules
+from core.services.webhook_rules import load_rules, update_rules
 from core.version import __version__
 
 router = APIRouter()
@@ -39,8 +39,6 @@ def update_webhook_rules(
     confidence_score_min: float = Form(...),
     edit_index: int = Form(None)
 ):
-    current = load_rules()
-
     new_rule = {
         "ml_priority": ml_priority,
         "confidence_score_min": confidence_score_min,
@@ -49,40 +47,43 @@ def update_webhook_rules(
     if event_type:
         new_rule["event_type"] = event_type
 
-    if destination not in current:
-        current[destination] = []
+    def add_rule(current):
+        if destination not in current:
+            current[destination] = []
 
-    if isinstance(current[destination], dict):
-        current[destination] = [current[destination]]
+        if isinstance(current[destination], dict):
+            current[destination] = [current[destination]]
 
-    if edit_index is not None and 0 <= edit_index < len(current[destination]):
-        current[destination][edit_index] = new_rule
-    else:
-        current[destination].append(new_rule)
+        if edit_index is not None and 0 <= edit_index < len(current[destination]):
+            current[destination][edit_index] = new_rule
+        else:
+            current[destination].append(new_rule)
 
-    save_rules(current)
+    update_rules(add_rule)
     return RedirectResponse(url="/webhook-rules", status_code=302)
 
 
 @router.post("/webhook-rules/delete")
 def delete_webhook_rule(request: Request, destination: str = Form(...), index: int = Form(...)):
-    config = load_rules()
-    if destination in config and isinstance(config[destination], list):
-        if 0 <= index < len(config[destination]):
-            config[destination].pop(index)
-            if not config[destination]:
-                del config[destination]
-            save_rules(config)
+    def delete_rule(config):
+        if destination in config and isinstance(config[destination], list):
+            if 0 <= index < len(config[destination]):
+                config[destination].pop(index)
+                if not config[destination]:
+                    del config[destination]
+
+    update_rules(delete_rule)
     return RedirectResponse(url="/webhook-rules", status_code=302)
 
 
 @router.post("/webhook-rules/toggle")
 def toggle_webhook_rule(request: Request, destination: str = Form(...), index: int = Form(...)):
-    config = load_rules()
-    if destination in config and isinstance(config[destination], list) and 0 <= index < len(config[destination]):
-        current_value = config[destination][index].get("enabled", True)
-        config[destination][index]["enabled"] = not current_value
-        save_rules(config)
+    def toggle_rule(config):
+        if destination in config and isinstance(config[destination], list) and 0 <= index < len(config[destination]):
+            current_value = config[destination][index].get("enabled", True)
+            config[destination][index]["enabled"] = not current_value
+
+    update_rules(toggle_rule)
     return RedirectResponse(url="/webhook-rules", status_code=302)
 
 
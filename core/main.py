@@ -17,8 +17,15 @@
 
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from core.api.routes import alerts, home, dashboard, model, export, webhook
+from core.api.routes import alerts, home, dashboard, model, export, webhook, enrichment, jobs, results
+from core.api.routes import archive
 from core.api.routes import upload
+from core.services import http_client
+from core.services import jobs as job_queue
+from core.services import alert_writer
+from core.services import retention
+from core.services import model_registry
+from core.services.enrichment import refresher
 
 app = FastAPI()
 
@@ -30,4 +37,27 @@ app.include_router(alerts.router)
 app.include_router(dashboard.router)
 app.include_router(model.router)
 app.include_router(export.router)
-app.include_router(webhook.router)
\ No newline at end of file
+app.include_router(webhook.router)
+app.include_router(enrichment.router)
+app.include_router(jobs.router)
+app.include_router(results.router)
+app.include_router(archive.router)
+
+
+@app.on_event("startup")
+def start_background_tasks():
+    refresher.start()
+    job_queue.start()
+    alert_writer.start()
+    retention.start()
+    model_registry.start()
+
+
+@app.on_event("shutdown")
+def stop_background_tasks():
+    refresher.stop()
+    job_queue.stop()
+    alert_writer.stop()
+    retention.stop()
+    model_registry.stop()
+    http_client.close_all()
\ No newline at end of file
@@ -15,11 +15,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import io
 import os
 import sys
+import json
+import argparse
 from datetime import datetime
 from collections import Counter
 import joblib
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from sklearn.ensemble import RandomForestClassifier
@@ -30,7 +34,9 @@ import plotly.graph_objects as go
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from core.services.create_alert_dataset import example_data
+from core.services.create_alert_dataset import example_data, dataset_record, ensure_dataset, DATASET_COLUMNS
+from core.services import state_files, model_registry
+from core.services.compiled_forest import export_forest, verify_export, FOREST_ARRAYS, FOREST_META
 
 import logging
 logging.basicConfig(level=logging.INFO)
@@ -45,12 +51,47 @@ metrics_path = os.path.join(BASE_DIR, "static", "public", "artifacts", "metrics.
 template_path = os.path.join(BASE_DIR, "templates", "dashboard_template.html")
 output_dashboard = os.path.join(BASE_DIR, "static", "public", "artifacts", "dashboard.html")
 
+# Incremental mode: grow the current version's forest with trees fitted on the rows
+# appended to the dataset since that version (its watermark) plus a small per-class
+# replay sample kept with each version, instead of refitting on the whole history
+TRAINING_MODE = os.getenv("ML_TRAINING_MODE", "full")
+INCREMENTAL_TREES = int(os.getenv("ML_INCREMENTAL_TREES", 20))
+# A full retrain is done instead once the forest would grow past this
+MAX_TREES = int(os.getenv("ML_MAX_TREES", 500))
+REPLAY_ROWS_PER_CLASS = int(os.getenv("ML_REPLAY_ROWS_PER_CLASS", 200))
+
+TRAINING_META = "training.json"
+REPLAY_FILE = "replay.csv"
+FEATURES = ["event_type_enc", "abuse_score", "total_reports", "country_enc", "usage_type_enc", "legacy_risk_score"]
+
+parser = argparse.ArgumentParser(description="Train the alert classifier")
+parser.add_argument("--incremental", dest="incremental", action="store_true", default=TRAINING_MODE == "incremental",
+                    help="extend the current model with the alerts added since it was trained")
+parser.add_argument("--full", dest="incremental", action="store_false", help="refit on the whole dataset")
+args = parser.parse_args()
+
 os.makedirs(model_base_dir, exist_ok=True)
 os.makedirs(report_dir, exist_ok=True)
 os.makedirs(charts_dir, exist_ok=True)
-
-# Load dataset
-df = pd.read_csv(data_path)
+ensure_dataset()
+
+
+def read_dataset(offset: int = 0):
+    """
+    Reads the dataset rows stored after byte offset (0: every row).
+    Returns them with the watermark reached: end offset and the file's generation id,
+    which changes whenever the dataset is rebuilt or recreated (e.g. after /reset-system).
+    """
+    # Shared lock: workers may be appending to it
+    with state_files.locked(data_path, shared=True) as lock_file:
+        generation = state_files.read_generation(lock_file)
+        with open(data_path, "rb") as f:
+            header = f.readline()
+            f.seek(max(offset, len(header)))
+            body = f.read()
+            end = f.tell()
+    df = pd.read_csv(io.BytesIO(header + body)) if header else pd.DataFrame(columns=DATASET_COLUMNS)
+    return df, {"offset": end, "generation": generation}
 
 
 # Validate dataset before proceeding
@@ -64,40 +105,175 @@ def is_dataset_ready(df):
     return True
 
 
-if not is_dataset_ready(df):
-    logging.info("[!] Insufficient or missing data in dataset_for_ml.csv.")
-    logging.info("[!] Using example fallback dataset to initialize the model...")
-
-    df = pd.DataFrame(example_data)
-
-le_event, le_country, le_usage, le_action = LabelEncoder(), LabelEncoder(), LabelEncoder(), LabelEncoder()
-df["event_type_enc"] = le_event.fit_transform(df["event_type"])
-df["country_enc"] = le_country.fit_transform(df["country"])
-df["usage_type_enc"] = le_usage.fit_transform(df["usage_type"])
-df["action_enc"] = le_action.fit_transform(df["suggested_action"])
-
-X = df[["event_type_enc", "abuse_score", "total_reports", "country_enc", "usage_type_enc", "legacy_risk_score"]]
-y = df["action_enc"]
-stratify_param = y if min(Counter(y).values()) >= 2 else None
+def extend_encoder(encoder, values) -> list:
+    """
+    Appends values the encoder has not seen to its classes, keeping existing codes stable.
+    classes_ becomes object dtype: LabelEncoder.transform looks object values up by hash,
+    while for numeric dtypes it uses searchsorted, which needs sorted classes.
+    """
+    encoder.classes_ = np.asarray(encoder.classes_, dtype=object)
+    values = pd.Index(pd.unique(pd.Series(values, dtype=object)))
+    unseen = list(values[~values.isin(encoder.classes_)])
+    if unseen:
+        encoder.classes_ = np.concatenate([encoder.classes_, np.asarray(unseen, dtype=object)])
+    return [str(value) for value in unseen]
+
+
+def encode_extended(encoder, values) -> np.ndarray:
+    """
+    Transforms with an encoder extended by extend_encoder, as object values.
+    """
+    assert encoder.classes_.dtype == object, "extended encoders must keep object classes"
+    return encoder.transform(pd.Series(values, dtype=object))
+
+
+def plan_incremental():
+    """
+    Everything an incremental run needs, or None (with the reason logged) when the
+    current version cannot be extended and a full retrain is done instead.
+    """
+    parent = model_registry.resolve_version()
+    if parent is None:
+        logging.info("[Train] No model to extend, doing a full retrain")
+        return None
+    parent_dir = os.path.join(model_base_dir, parent)
+    meta_path = os.path.join(parent_dir, TRAINING_META)
+    if not os.path.exists(meta_path) or not os.path.exists(os.path.join(parent_dir, REPLAY_FILE)):
+        logging.info(f"[Train] {parent} has no training watermark, doing a full retrain")
+        return None
+    with open(meta_path, "r") as f:
+        parent_meta = json.load(f)
+    watermark = parent_meta["watermark"]
+
+    new_df, new_watermark = read_dataset(watermark["offset"])
+    # Watermarks from before generation ids cannot be trusted either
+    if "generation" not in watermark or new_watermark["generation"] != watermark["generation"]:
+        logging.info("[Train] dataset_for_ml.csv was rebuilt since the last version, doing a full retrain")
+        return None
+    if new_df.empty:
+        return {"parent": parent, "new_df": new_df}
+
+    model = joblib.load(os.path.join(parent_dir, "alert_classifier.joblib"))
+    encoders = {name: joblib.load(os.path.join(parent_dir, f"{name}.joblib"))
+                for name in ("le_event", "le_country", "le_usage", "le_action")}
+    # Existing trees cannot vote for a new class, and warm_start needs the fit to see
+    # exactly the classes the forest already has: the replay sample provides them
+    known_actions = set(encoders["le_action"].classes_[model.classes_])
+    unseen_actions = set(new_df["suggested_action"]) - known_actions
+    if unseen_actions:
+        logging.info(f"[Train] New actions {sorted(unseen_actions)}, doing a full retrain")
+        return None
+    replay = pd.read_csv(os.path.join(parent_dir, REPLAY_FILE))
+    replay = replay[replay["suggested_action"].isin(known_actions)]
+    if set(replay["suggested_action"]) != known_actions:
+        logging.info(f"[Train] Replay sample of {parent} does not cover every action, doing a full retrain")
+        return None
+    if model.n_estimators + INCREMENTAL_TREES > MAX_TREES:
+        logging.info(f"[Train] Forest would exceed {MAX_TREES} trees, doing a full retrain")
+        return None
+
+    return {
+        "parent": parent,
+        "parent_rows": parent_meta["watermark"]["rows"],
+        "new_df": new_df,
+        "watermark": new_watermark,
+        "model": model,
+        "encoders": encoders,
+        "replay": replay
+    }
+
+
+incremental = plan_incremental() if args.incremental else None
+if incremental is not None and incremental["new_df"].empty:
+    logging.info(f"[Train] No new alerts since {incremental['parent']}, nothing to train")
+    sys.exit(0)
+
+if incremental is not None:
+    mode = "incremental"
+    parent = incremental["parent"]
+    new_df = incremental["new_df"]
+    model = incremental["model"]
+    le_event, le_country, le_usage, le_action = (incremental["encoders"][name] for name in
+                                                 ("le_event", "le_country", "le_usage", "le_action"))
+    unseen_categories = {
+        "event_type": extend_encoder(le_event, new_df["event_type"]),
+        "country": extend_encoder(le_country, new_df["country"]),
+        "usage_type": extend_encoder(le_usage, new_df["usage_type"])
+    }
+
+    # New rows are split for evaluation; the replay sample keeps every class in the fit
+    if len(new_df) >= 5:
+        new_train, new_test = train_test_split(new_df, test_size=0.2, random_state=42)
+    else:
+        new_train, new_test = new_df, new_df.copy()
+    df = pd.concat([new_train, incremental["replay"]], ignore_index=True)
+    for frame in (df, new_test):
+        frame["event_type_enc"] = encode_extended(le_event, frame["event_type"])
+        frame["country_enc"] = encode_extended(le_country, frame["country"])
+        frame["usage_type_enc"] = encode_extended(le_usage, frame["usage_type"])
+        frame["action_enc"] = le_action.transform(frame["suggested_action"])
+
+    X_train, y_train = df[FEATURES], df["action_enc"]
+    X_test, y_test = new_test[FEATURES], new_test["action_enc"]
+    X = X_train
+
+    # warm_start keeps the fitted trees and only fits the additional ones
+    model.set_params(warm_start=True, n_estimators=model.n_estimators + INCREMENTAL_TREES)
+    model.fit(X_train, y_train)
+    model.set_params(warm_start=False)
+    y_pred = model.predict(X_test)
+
+    watermark = dict(incremental["watermark"], rows=incremental["parent_rows"] + len(new_df))
+    replay_source = pd.concat([incremental["replay"], new_df], ignore_index=True)
+    logging.info(f"[Train] Extended {parent} with {INCREMENTAL_TREES} trees on {len(new_df)} new alerts "
+                 f"({model.n_estimators} trees, unseen categories: {unseen_categories})")
 
-from math import ceil
-
-num_classes = y.nunique()
-min_test_size = min(max(3, ceil(len(y) * 0.2)), len(y) - 1)
-
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y,
-    test_size=min_test_size,
-    stratify=stratify_param,
-    random_state=42
-)
+else:
+    mode = "full"
+    parent = None
+    unseen_categories = {}
+
+    # Load dataset
+    df, watermark = read_dataset()
+    watermark["rows"] = len(df)
+
+    if not is_dataset_ready(df):
+        logging.info("[!] Insufficient or missing data in dataset_for_ml.csv.")
+        logging.info("[!] Using example fallback dataset to initialize the model...")
+
+        df = pd.DataFrame([dataset_record(alert) for alert in example_data])
+        # Nothing from the dataset was used: the next incremental run starts from its first row
+        watermark.update(offset=0, rows=0)
+
+    le_event, le_country, le_usage, le_action = LabelEncoder(), LabelEncoder(), LabelEncoder(), LabelEncoder()
+    df["event_type_enc"] = le_event.fit_transform(df["event_type"])
+    df["country_enc"] = le_country.fit_transform(df["country"])
+    df["usage_type_enc"] = le_usage.fit_transform(df["usage_type"])
+    df["action_enc"] = le_action.fit_transform(df["suggested_action"])
+
+    X = df[FEATURES]
+    y = df["action_enc"]
+    stratify_param = y if min(Counter(y).values()) >= 2 else None
+
+    from math import ceil
+
+    num_classes = y.nunique()
+    min_test_size = min(max(3, ceil(len(y) * 0.2)), len(y) - 1)
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y,
+        test_size=min_test_size,
+        stratify=stratify_param,
+        random_state=42
+    )
 
-logging.info(f"Number of classes: {num_classes}, selected test_size: {min_test_size}")
+    logging.info(f"Number of classes: {num_classes}, selected test_size: {min_test_size}")
 
-# Training model
-model = RandomForestClassifier(n_estimators=100, random_state=42)
-model.fit(X_train, y_train)
-y_pred = model.predict(X_test)
+    # Training model
+    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    model.fit(X_train, y_train)
+    y_pred = model.predict(X_test)
+    replay_source = df
 
 # Metrics
 accuracy = accuracy_score(y_test, y_pred)
@@ -109,7 +285,9 @@ report = classification_report(y_test, y_pred, labels=le_action.transform(le_act
 
 # Version
 version = datetime.now().strftime("v%Y%m%d-%H%M%S")
-version_dir = os.path.join(model_base_dir, version)
+# Written to a hidden staging directory and renamed when complete, so serving
+# workers never see a partial version
+version_dir = os.path.join(model_base_dir, f".{version}.tmp")
 os.makedirs(version_dir, exist_ok=True)
 
 # Model Save and encoders
@@ -119,6 +297,40 @@ joblib.dump(le_country, os.path.join(version_dir, "le_country.joblib"))
 joblib.dump(le_usage, os.path.join(version_dir, "le_usage.joblib"))
 joblib.dump(le_action, os.path.join(version_dir, "le_action.joblib"))
 
+# Latest rows of every class, replayed by the next incremental run
+replay_source[DATASET_COLUMNS].groupby("suggested_action", group_keys=False).tail(REPLAY_ROWS_PER_CLASS) \
+    .to_csv(os.path.join(version_dir, REPLAY_FILE), index=False)
+
+# What this version was trained from, up to which dataset row
+with open(os.path.join(version_dir, TRAINING_META), "w") as f:
+    json.dump({
+        "version": version,
+        "mode": mode,
+        "parent": parent,
+        "watermark": watermark,
+        "trained_rows": len(X_train),
+        "n_estimators": model.n_estimators,
+        "unseen_categories": unseen_categories,
+        "trained_at": datetime.now().isoformat(timespec="seconds")
+    }, f, indent=2)
+
+# Compiled NumPy export for serving, checked against sklearn on the training data
+try:
+    export_forest(model, version_dir, list(X.columns),
+                  {"event_type": le_event, "country": le_country, "usage_type": le_usage, "action": le_action})
+    verification = verify_export(model, version_dir, X)
+    logging.info(f"Compiled forest exported and verified: {verification}")
+except Exception as e:
+    logging.warning(f"Compiled forest export failed, serving will use the joblib model: {e}")
+    for name in (FOREST_ARRAYS, FOREST_META):
+        if os.path.exists(os.path.join(version_dir, name)):
+            os.remove(os.path.join(version_dir, name))
+
+# Publish: every worker's model registry swaps to the version named in models/CURRENT
+os.rename(version_dir, os.path.join(model_base_dir, version))
+model_registry.publish(version)
+logging.info(f"Published model {version}")
+
 # Save report
 with open(os.path.join(report_dir, f"report_{version}.txt"), "w") as f:
     f.write(f"Accuracy: {accuracy:.2f}\n")
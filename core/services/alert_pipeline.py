@@ -0,0 +1,363 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# SOAR Lite – Alert processing pipeline
+#
+# CSV rows are parsed incrementally, enriched in bounded windows of ALERT_BATCH_SIZE
+# rows, scored, classified and appended to the results store as they complete, so
+# memory use does not grow with the size of the upload.
+
+import os
+import re
+import csv
+import codecs
+import asyncio
+import logging
+from collections import Counter
+from dotenv import load_dotenv
+from core.services.ml_classifier import classify_alerts
+from core.services.enrichment.fusion import enrich_batch, DEADLINE
+from core.services.attck_mapper import map_event_to_mitre
+from core.services.actions import suggest_action
+from core.services.create_alert_dataset import DATASET_COLUMNS, DATASET_HEADER, dataset_record
+from core.services.integrations.webhook import should_trigger_webhook
+from core.services.integrations.webhook_slack import send_webhook_to_slack
+from core.services.risk import calculate_risk_score
+from core.services import results_store, archive, state_files
+
+load_dotenv()
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+DATASET_PATH = os.path.join(BASE_DIR, "data", "dataset_for_ml.csv")
+COUNTRIES_PATH = os.path.join(BASE_DIR, "data", "high_abuse_countries.json")
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("ALERT_UPLOAD_CHUNK_SIZE", 1024 * 1024))
+BATCH_SIZE = int(os.getenv("ALERT_BATCH_SIZE", 500))
+
+
+# Splits text after \n, \r\n or a lone \r, like a file opened with newline="".
+# str.splitlines() is much faster but also breaks on other separators, which csv
+# treats as ordinary characters, so it is only used when none of them occur.
+_LINE_END = re.compile(r"(?<=\n)|(?<=\r)(?!\n)")
+_OTHER_LINE_BREAKS = re.compile("[\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+
+
+def _split_lines(text: str) -> list:
+    if _OTHER_LINE_BREAKS.search(text):
+        return _LINE_END.split(text)
+    lines = text.splitlines(keepends=True)
+    if not lines or lines[-1].endswith(("\n", "\r")):
+        lines.append("")
+    return lines
+
+
+class _PendingLines:
+    """
+    Line iterator behind CsvRowParser's csv.reader. Running out of lines only means
+    no more text has been fed yet: the reader is asked again after the next feed().
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.pos = 0
+        self.exhausted = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            line = self.lines[self.pos]
+        except IndexError:
+            self.exhausted = True
+            raise StopIteration
+        self.pos += 1
+        return line
+
+
+class CsvRowParser:
+    """
+    Incremental csv.DictReader: feed() takes decoded text of any length and returns
+    the rows it completes. One csv.reader tracks quoting, so quoted fields may span
+    lines and chunk boundaries.
+    """
+
+    def __init__(self):
+        self.header = None
+        self.partial = ""
+        self.pending = _PendingLines()
+        self.reader = csv.reader(self.pending)
+
+    def _records(self, final: bool) -> list:
+        records = []
+        pending = self.pending
+        pending.exhausted = False
+        done = pending.pos
+        for values in self.reader:
+            if pending.exhausted and not final:
+                # The reader hit the end of the fed text inside this record:
+                # parse it again once the rest has arrived
+                pending.pos = done
+                break
+            records.append(values)
+            done = pending.pos
+        del pending.lines[:pending.pos]
+        pending.pos = 0
+        return records
+
+    def _rows(self, records: list) -> list:
+        rows = []
+        for values in records:
+            if not values:
+                continue
+            if self.header is None:
+                self.header = values
+                continue
+            row = dict(zip(self.header, values))
+            if len(values) < len(self.header):
+                row.update((name, None) for name in self.header[len(values):])
+            elif len(values) > len(self.header):
+                row[None] = values[len(self.header):]
+            rows.append(row)
+        return rows
+
+    def feed(self, text: str) -> list:
+        lines = _split_lines(self.partial + text)
+        self.partial = lines.pop()
+        if lines and not self.partial and lines[-1].endswith("\r"):
+            # May be the first half of a \r\n split across chunks
+            self.partial = lines.pop()
+        self.pending.lines.extend(lines)
+        return self._rows(self._records(final=False))
+
+    def close(self) -> list:
+        if self.partial:
+            self.pending.lines.append(self.partial)
+            self.partial = ""
+        return self._rows(self._records(final=True))
+
+
+async def iter_upload_rows(upload, chunk_size: int = UPLOAD_CHUNK_SIZE):
+    """
+    Yields the rows of an uploaded CSV file as dicts, reading it chunk by chunk.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    parser = CsvRowParser()
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        for row in parser.feed(decoder.decode(chunk)):
+            yield row
+    for row in parser.feed(decoder.decode(b"", final=True)) + parser.close():
+        yield row
+
+
+def row_ioc(row: dict) -> tuple:
+    return row.get("ioc_type", "ip"), row.get("ioc_value") or row.get("src_ip")
+
+
+def build_result(row: dict, ioc_type: str, ioc_value: str, fusion_data: dict, sighting) -> dict:
+    """
+    Scores and maps one enriched alert. sighting is the IOC's entry in the sighting
+    index, or None if it was never seen. ML fields are added by classify_results().
+    """
+    event_type = row['event_type']
+
+    abuse_data = fusion_data["sources"].get("abuseipdb", {})
+    simplified_enrichment = {
+        "abuse_score": abuse_data.get("abuse_score", 0),
+        "country": abuse_data.get("country", "unknown"),
+        "usage_type": abuse_data.get("usage_type", "unknown"),
+        "total_reports": abuse_data.get("total_reports", 0),
+        "source": "fusion"
+    }
+
+    legacy_score = calculate_risk_score(abuse_data, event_type)
+    risk_score = fusion_data.get("risk_score", 0)
+    action = suggest_action(risk_score, event_type)
+
+    result = {
+        "timestamp": row["timestamp"],
+        "ioc_type": ioc_type,
+        "ioc_value": ioc_value,
+        "event_type": event_type,
+        "risk_score": risk_score,
+        "legacy_risk_score": legacy_score,
+        "enrichment": simplified_enrichment,
+        "suggested_action": action,
+        "sources": fusion_data.get("sources", {})
+    }
+
+    if sighting:
+        result["ioc_seen_before"] = True
+        result["seen_count"] = sighting["count"]
+        result["last_seen"] = sighting["last_seen"]
+    else:
+        result["ioc_seen_before"] = False
+        result["seen_count"] = 0
+        result["last_seen"] = None
+
+    result["mitre_technique"] = map_event_to_mitre(event_type)
+    return result
+
+
+def classify_results(results: list) -> list:
+    """
+    Adds ml_priority and confidence_score to a batch of results (one model call).
+    """
+    for result, (ml_priority, confidence) in zip(results, classify_alerts(results)):
+        result["ml_priority"] = ml_priority
+        result["confidence_score"] = round(confidence, 3)
+    logging.info(f"{len(results)} alerts classified by ML model.")
+    return results
+
+
+async def process_alerts(rows: list, deadline=DEADLINE) -> tuple:
+    """
+    Enriches (each distinct IOC once), scores and classifies a list of rows.
+    Returns the results in input order and the enrichment batch stats. No webhooks are sent.
+    """
+    iocs = [row_ioc(row) for row in rows]
+    enriched, batch_stats = await enrich_batch(iocs, deadline)
+    sightings = results_store.get_sightings(iocs)
+    results = [build_result(row, ioc_type, ioc_value, fusion_data,
+                            sightings.get(results_store.make_key(ioc_type, ioc_value)))
+               for row, (ioc_type, ioc_value), fusion_data in zip(rows, iocs, enriched)]
+    return classify_results(results), batch_stats
+
+
+async def _process_window(rows: list, stats: dict, deadline) -> list:
+    results, batch_stats = await process_alerts(rows, deadline)
+    stats["rows"] += batch_stats["rows"]
+    stats["unique_iocs"] += batch_stats["unique_iocs"]
+    stats["timed_out"] += batch_stats["timed_out"]
+
+    for result in results:
+        if should_trigger_webhook(result, destination="slack"):
+            await asyncio.to_thread(send_webhook_to_slack, result)
+    return results
+
+
+async def _aiter(rows):
+    if hasattr(rows, "__aiter__"):
+        async for row in rows:
+            yield row
+    else:
+        for row in rows:
+            yield row
+
+
+async def process_rows(rows, stats: dict, batch_size: int = BATCH_SIZE, deadline=DEADLINE):
+    """
+    Processes an iterable (or async iterable) of CSV rows in windows of batch_size rows
+    and yields the results in input order. Each distinct IOC is enriched once per window.
+    stats is updated in place with rows, unique_iocs and timed_out.
+    """
+    stats.setdefault("rows", 0)
+    stats.setdefault("unique_iocs", 0)
+    stats.setdefault("timed_out", 0)
+
+    window = []
+    async for row in _aiter(rows):
+        window.append(row)
+        if len(window) >= batch_size:
+            for result in await _process_window(window, stats, deadline):
+                yield result
+            window = []
+
+    if window:
+        for result in await _process_window(window, stats, deadline):
+            yield result
+
+
+def dedup_ratio(stats: dict) -> float:
+    return round(stats["rows"] / stats["unique_iocs"], 2) if stats.get("unique_iocs") else 1.0
+
+
+class ResultsWriter:
+    """
+    Appends results to the results store in chunks as they are written, and updates
+    dataset_for_ml.csv and the high-abuse country list once the batch is committed.
+    """
+
+    def __init__(self, batch_id: str = None, dataset_path: str = DATASET_PATH,
+                 countries_path: str = COUNTRIES_PATH, flush_size: int = BATCH_SIZE):
+        self.batch_id = batch_id or results_store.new_batch_id()
+        self.dataset_path = dataset_path
+        self.countries_path = countries_path
+        self.flush_size = flush_size
+        self.count = 0
+        self.committed = False
+        self.pending = []
+        self.countries = Counter()
+
+        # Dataset rows are staged and appended to the dataset only on commit
+        os.makedirs(os.path.dirname(dataset_path), exist_ok=True)
+        self.dataset_file = open(f"{dataset_path}.{self.batch_id}.tmp", "w", newline="")
+        self.dataset_writer = csv.DictWriter(self.dataset_file, fieldnames=DATASET_COLUMNS)
+
+    def _flush(self):
+        results_store.append(self.pending, self.batch_id)
+        try:
+            archive.append(self.pending, self.batch_id)
+        except Exception as e:
+            logging.warning(f"[Archive] Could not archive {len(self.pending)} results: {e}")
+        self.pending = []
+
+    def write(self, result: dict):
+        self.pending.append(result)
+        if len(self.pending) >= self.flush_size:
+            self._flush()
+        self.dataset_writer.writerow(dataset_record(result))
+
+        country = result.get("enrichment", {}).get("country")
+        if country and result.get("risk_score", 0) >= 80:
+            self.countries[country] += 1
+        self.count += 1
+
+    def commit(self):
+        self._flush()
+        self.dataset_file.close()
+        staged = f"{self.dataset_path}.{self.batch_id}.tmp"
+        # The staged rows are appended in one locked write, shared with other workers
+        with open(staged, "r", newline="") as rows:
+            state_files.append_text(self.dataset_path, iter(lambda: rows.read(UPLOAD_CHUNK_SIZE), ""),
+                                    header=DATASET_HEADER)
+        os.remove(staged)
+        logging.info(f"dataset_for_ml.csv updated after processing {self.count} alerts.")
+
+        try:
+            top_countries = [c for c, _ in self.countries.most_common(15)]
+            state_files.write_json_coalesced(self.countries_path, top_countries)
+            logging.info(f"Updated local statistics by country: {top_countries}")
+        except Exception as e:
+            logging.warning(f"Error updating local statistics by country: {e}")
+        self.committed = True
+
+    def abort(self):
+        """
+        Called when processing stops early. Alerts processed so far were already
+        acted upon (webhooks), so they are kept like a committed batch.
+        """
+        if self.committed:
+            return
+        try:
+            self.commit()
+        except Exception as e:
+            logging.warning(f"[Pipeline] Could not store {len(self.pending)} results: {e}")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# SOAR Lite – Background writer for inline alerts
+#
+# Alerts classified through the JSON endpoint are queued here and persisted off the
+# request path: results are appended to the results store (which also updates the
+# sighting index), rows to dataset_for_ml.csv and webhooks are sent, in coalesced batches.
+
+import os
+import time
+import queue
+import logging
+import threading
+from dotenv import load_dotenv
+from core.services.alert_pipeline import DATASET_PATH
+from core.services import results_store, archive, state_files
+from core.services.create_alert_dataset import DATASET_HEADER, dataset_csv, dataset_record
+from core.services.integrations.webhook import should_trigger_webhook
+from core.services.integrations.webhook_slack import send_webhook_to_slack
+
+load_dotenv()
+
+FLUSH_INTERVAL = float(os.getenv("ALERT_WRITER_FLUSH_INTERVAL", 2.0))
+FLUSH_MAX = int(os.getenv("ALERT_WRITER_FLUSH_MAX", 1000))
+QUEUE_MAX = int(os.getenv("ALERT_WRITER_QUEUE_MAX", 100000))
+
+_queue = queue.Queue(maxsize=QUEUE_MAX)
+_lock = threading.Lock()
+_started = False
+_stop = threading.Event()
+
+stats = {"queued": 0, "written": 0, "flushes": 0, "dropped": 0, "webhooks": 0, "write_errors": 0,
+         "webhook_errors": 0, "errors": 0}
+
+
+def enqueue(results: list):
+    for result in results:
+        try:
+            _queue.put_nowait(result)
+            stats["queued"] += 1
+        except queue.Full:
+            stats["dropped"] += 1
+            logging.warning("[AlertWriter] Queue full, dropping result")
+    start()
+
+
+def _append_results(batch: list):
+    batch_id = results_store.new_batch_id()
+    results_store.append(batch, batch_id)
+    try:
+        archive.append(batch, batch_id)
+    except Exception as e:
+        logging.warning(f"[Archive] Could not archive {len(batch)} results: {e}")
+
+    state_files.append_text(DATASET_PATH, [dataset_csv([dataset_record(result) for result in batch])],
+                            header=DATASET_HEADER)
+
+
+def _flush(batch: list):
+    # A failed write is logged and counted; the batch is still alerted on
+    try:
+        _append_results(batch)
+        stats["written"] += len(batch)
+    except Exception as e:
+        stats["write_errors"] += 1
+        logging.error(f"[AlertWriter] Failed to persist {len(batch)} results: {e}")
+    stats["flushes"] += 1
+
+    for result in batch:
+        try:
+            if should_trigger_webhook(result, destination="slack"):
+                send_webhook_to_slack(result)
+                stats["webhooks"] += 1
+        except Exception as e:
+            stats["webhook_errors"] += 1
+            logging.error(f"[AlertWriter] Failed to send webhook for {result.get('ioc_value')}: {e}")
+
+
+def _drain(timeout: float) -> list:
+    """
+    Waits for a result, then keeps collecting for up to `timeout` seconds (or FLUSH_MAX
+    results) so bursts are persisted in one transaction.
+    """
+    batch = []
+    try:
+        batch.append(_queue.get(timeout=timeout))
+        deadline = time.monotonic() + timeout
+        while len(batch) < FLUSH_MAX:
+            remaining = 0 if _stop.is_set() else deadline - time.monotonic()
+            batch.append(_queue.get(timeout=remaining) if remaining > 0 else _queue.get_nowait())
+    except queue.Empty:
+        pass
+    return batch
+
+
+def _writer_loop():
+    while not _stop.is_set() or not _queue.empty():
+        batch = _drain(FLUSH_INTERVAL)
+        if not batch:
+            continue
+        try:
+            _flush(batch)
+        except Exception as e:
+            stats["errors"] += 1
+            logging.error(f"[AlertWriter] Failed to flush {len(batch)} results: {e}")
+
+
+def start():
+    global _started
+    if _started:
+        return
+    with _lock:
+        if _started:
+            return
+        _started = True
+    _stop.clear()
+    threading.Thread(target=_writer_loop, name="alert-writer", daemon=True).start()
+    logging.info("[AlertWriter] Background alert writer started")
+
+
+def stop(timeout: float = 10.0):
+    """
+    Stops the writer after flushing what is already queued.
+    """
+    global _started
+    _stop.set()
+    with _lock:
+        _started = False
+    for thread in threading.enumerate():
+        if thread.name == "alert-writer":
+            thread.join(timeout)
+
+
+def get_stats() -> dict:
+    return {"pending": _queue.qsize(), **stats}
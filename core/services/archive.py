@@ -0,0 +1,350 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# SOAR Lite – Columnar alert archive
+#
+# Processed alerts are flattened and appended as Parquet files partitioned by the
+# alert date (hive layout), for analytics over long periods:
+#
+#   output/archive/date=2025-04-14/part-<batch>-<n>.parquet
+#
+# Queries go through pyarrow.dataset, so only the partitions matching the date
+# range and the requested columns are read. Partitions that accumulate many small
+# files are compacted into one. Requires the pyarrow package.
+#
+# Every partition has an flock (date=.../_partition.lock, via state_files) shared by
+# all worker processes: appends and queries hold it shared, compaction exclusively,
+# so two workers never compact the same partition and a compaction never removes
+# files a query is reading.
+
+import os
+import uuid
+import logging
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from dotenv import load_dotenv
+from core.services import state_files
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+load_dotenv()
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# Relative paths are taken from the project directory, not the working directory
+ARCHIVE_DIR = os.path.join(BASE_DIR, os.getenv("ARCHIVE_DIR", os.path.join("output", "archive")))
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "true").lower() == "true" and pa is not None
+# Partitions with more files than this are rewritten as a single file
+MAX_FILES_PER_PARTITION = int(os.getenv("ARCHIVE_MAX_FILES_PER_PARTITION", 32))
+QUERY_MAX_ROWS = int(os.getenv("ARCHIVE_QUERY_MAX_ROWS", 10000))
+
+if pa is None and os.getenv("ARCHIVE_ENABLED", "true").lower() == "true":
+    logging.warning("[Archive] pyarrow is not installed, the alert archive is disabled")
+
+FIELDS = [
+    ("timestamp", "string"),
+    ("ioc_type", "string"),
+    ("ioc_value", "string"),
+    ("event_type", "string"),
+    ("ml_priority", "string"),
+    ("confidence_score", "float64"),
+    ("suggested_action", "string"),
+    ("risk_score", "int64"),
+    ("legacy_risk_score", "int64"),
+    ("country", "string"),
+    ("usage_type", "string"),
+    ("abuse_score", "int64"),
+    ("total_reports", "int64"),
+    ("mitre_id", "string"),
+    ("mitre_name", "string"),
+    ("mitre_tactic", "string"),
+    ("seen_before", "bool"),
+    ("seen_count", "int64"),
+    ("batch_id", "string"),
+    ("archived_at", "timestamp[s]")
+]
+COLUMNS = [name for name, _ in FIELDS]
+
+# Columns accepted as equality filters by query() and aggregate()
+FILTER_COLUMNS = ("ioc_type", "ioc_value", "event_type", "ml_priority", "suggested_action", "country",
+                  "usage_type", "mitre_id", "mitre_tactic", "batch_id")
+# Numeric columns accepted as ranges (min_<column> / max_<column>) and as aggregate metrics
+NUMERIC_COLUMNS = ("risk_score", "legacy_risk_score", "confidence_score", "abuse_score", "total_reports", "seen_count")
+
+stats = {"rows_written": 0, "files_written": 0, "compactions": 0, "queries": 0}
+
+
+def _schema():
+    return pa.schema([(name, pa.type_for_alias(type_name)) for name, type_name in FIELDS])
+
+
+def _partition_date(timestamp) -> str:
+    value = str(timestamp or "")[:10]
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+        return value
+    except ValueError:
+        return "unknown"
+
+
+def _int(value):
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _flatten(result: dict, batch_id: str, archived_at: datetime) -> dict:
+    enrichment = result.get("enrichment", {}) or {}
+    mitre = result.get("mitre_technique", {}) or {}
+    return {
+        "timestamp": result.get("timestamp"),
+        "ioc_type": result.get("ioc_type"),
+        "ioc_value": result.get("ioc_value", result.get("src_ip")),
+        "event_type": result.get("event_type"),
+        "ml_priority": result.get("ml_priority"),
+        "confidence_score": float(result["confidence_score"]) if result.get("confidence_score") is not None else None,
+        "suggested_action": result.get("suggested_action"),
+        "risk_score": _int(result.get("risk_score")),
+        "legacy_risk_score": _int(result.get("legacy_risk_score")),
+        "country": enrichment.get("country"),
+        "usage_type": enrichment.get("usage_type"),
+        "abuse_score": _int(enrichment.get("abuse_score")),
+        "total_reports": _int(enrichment.get("total_reports")),
+        "mitre_id": mitre.get("id"),
+        "mitre_name": mitre.get("name"),
+        "mitre_tactic": mitre.get("tactic"),
+        "seen_before": bool(result.get("ioc_seen_before")),
+        "seen_count": _int(result.get("seen_count", 0)),
+        "batch_id": batch_id,
+        "archived_at": archived_at
+    }
+
+
+def _partition_dir(date: str) -> str:
+    return os.path.join(ARCHIVE_DIR, f"date={date}")
+
+
+@contextmanager
+def _partition_lock(date: str, shared: bool = False):
+    # The leading underscore keeps the lock file out of pyarrow's dataset discovery
+    with state_files.locked(os.path.join(_partition_dir(date), "_partition"), shared=shared):
+        yield
+
+
+def _partition_dates(start_date: str = None, end_date: str = None) -> list:
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    dates = sorted(name[len("date="):] for name in os.listdir(ARCHIVE_DIR)
+                   if name.startswith("date=") and os.path.isdir(os.path.join(ARCHIVE_DIR, name)))
+    return [date for date in dates
+            if (not start_date or date >= start_date[:10]) and (not end_date or date <= end_date[:10])]
+
+
+def append(results: list, batch_id: str = None) -> int:
+    """
+    Archives a batch of processed alerts, one Parquet file per alert date.
+    """
+    if not ARCHIVE_ENABLED or not results:
+        return 0
+
+    batch_id = batch_id or uuid.uuid4().hex
+    archived_at = datetime.now().replace(microsecond=0)
+    by_date = {}
+    for result in results:
+        by_date.setdefault(_partition_date(result.get("timestamp")), []).append(
+            _flatten(result, batch_id, archived_at))
+
+    schema = _schema()
+    for date, rows in by_date.items():
+        table = pa.Table.from_pylist(rows, schema=schema)
+        path = os.path.join(_partition_dir(date), f"part-{batch_id}-{uuid.uuid4().hex[:8]}.parquet")
+        with _partition_lock(date, shared=True):
+            pq.write_table(table, f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+            files = len(_partition_files(date))
+        stats["files_written"] += 1
+
+        if files > MAX_FILES_PER_PARTITION:
+            compact_partition(date)
+
+    stats["rows_written"] += len(results)
+    return len(results)
+
+
+def _partition_files(date: str) -> list:
+    directory = _partition_dir(date)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".parquet"))
+
+
+def compact_partition(date: str):
+    """
+    Rewrites all files of one date partition as a single file, holding the partition
+    lock exclusively; a worker that was waiting for it finds the partition compacted.
+    """
+    if not os.path.isdir(_partition_dir(date)):
+        return
+    with _partition_lock(date):
+        files = _partition_files(date)
+        if len(files) < 2:
+            return
+        table = pa.concat_tables([pq.read_table(path, schema=_schema()) for path in files])
+        path = os.path.join(_partition_dir(date), f"part-compacted-{uuid.uuid4().hex[:8]}.parquet")
+        pq.write_table(table, f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+        for old in files:
+            os.remove(old)
+        stats["compactions"] += 1
+        logging.info(f"[Archive] Compacted {len(files)} files of partition {date} ({table.num_rows} rows)")
+
+
+@contextmanager
+def _locked_dataset(start_date: str = None, end_date: str = None):
+    """
+    Dataset over the partitions in the date range, holding their locks shared while it is read.
+    """
+    with ExitStack() as stack:
+        files = []
+        # Locks are always taken in date order, so concurrent readers cannot deadlock
+        for date in _partition_dates(start_date, end_date):
+            stack.enter_context(_partition_lock(date, shared=True))
+            files.extend(_partition_files(date))
+        if not files:
+            yield None
+            return
+        partitioning = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+        yield ds.dataset(files, format="parquet", schema=_schema().append(pa.field("date", pa.string())),
+                         partitioning=partitioning, partition_base_dir=ARCHIVE_DIR, exclude_invalid_files=True)
+
+
+def _filter_expression(start_date: str = None, end_date: str = None, filters: dict = None, ranges: dict = None):
+    """
+    Builds the pushdown filter. Date bounds prune partitions; the rest is evaluated
+    against Parquet row-group statistics and rows.
+    """
+    expression = None
+
+    def combine(condition):
+        nonlocal expression
+        expression = condition if expression is None else expression & condition
+
+    if start_date:
+        combine(ds.field("date") >= start_date[:10])
+    if end_date:
+        combine(ds.field("date") <= end_date[:10])
+    for column, value in (filters or {}).items():
+        if column not in FILTER_COLUMNS:
+            raise ValueError(f"Unsupported filter: {column}")
+        values = value if isinstance(value, (list, tuple)) else [value]
+        combine(ds.field(column).isin(values) if len(values) > 1 else ds.field(column) == values[0])
+    for column, (low, high) in (ranges or {}).items():
+        if column not in NUMERIC_COLUMNS:
+            raise ValueError(f"Unsupported range: {column}")
+        if low is not None:
+            combine(ds.field(column) >= low)
+        if high is not None:
+            combine(ds.field(column) <= high)
+    return expression
+
+
+def query(columns: list = None, start_date: str = None, end_date: str = None, filters: dict = None,
+          ranges: dict = None, limit: int = QUERY_MAX_ROWS) -> list:
+    """
+    Returns matching archived alerts as dicts, reading only the requested columns.
+    """
+    if not ARCHIVE_ENABLED:
+        raise RuntimeError("The alert archive is disabled (ARCHIVE_ENABLED=false or pyarrow missing)")
+
+    columns = columns or COLUMNS + ["date"]
+    unknown = [c for c in columns if c not in COLUMNS and c != "date"]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+
+    with _locked_dataset(start_date, end_date) as dataset:
+        if dataset is None:
+            return []
+        stats["queries"] += 1
+        expression = _filter_expression(start_date, end_date, filters, ranges)
+        table = dataset.head(min(limit, QUERY_MAX_ROWS), columns=columns, filter=expression)
+
+    if "archived_at" in columns:
+        table = table.set_column(columns.index("archived_at"), "archived_at", pc.cast(table["archived_at"], pa.string()))
+    return table.to_pylist()
+
+
+def aggregate(group_by: list, metrics: list = None, start_date: str = None, end_date: str = None,
+              filters: dict = None, ranges: dict = None) -> list:
+    """
+    Counts alerts (and averages numeric metrics) per group, e.g. group_by=["country", "mitre_id"].
+    Only the grouping, metric and filter columns are read.
+    """
+    if not ARCHIVE_ENABLED:
+        raise RuntimeError("The alert archive is disabled (ARCHIVE_ENABLED=false or pyarrow missing)")
+
+    metrics = metrics or []
+    for column in group_by:
+        if column not in FILTER_COLUMNS + ("date",):
+            raise ValueError(f"Unsupported group_by column: {column}")
+    for column in metrics:
+        if column not in NUMERIC_COLUMNS:
+            raise ValueError(f"Unsupported metric: {column}")
+
+    with _locked_dataset(start_date, end_date) as dataset:
+        if dataset is None:
+            return []
+        stats["queries"] += 1
+        expression = _filter_expression(start_date, end_date, filters, ranges)
+        table = dataset.to_table(columns=list(dict.fromkeys(group_by + metrics)) or ["date"], filter=expression)
+
+    if not group_by:
+        row = {"count": table.num_rows}
+        for column in metrics:
+            mean = pc.mean(table[column]).as_py()
+            row[f"{column}_avg"] = round(mean, 2) if mean is not None else None
+        return [row]
+
+    # count_all counts every row of a group; "count" on a key column skips nulls
+    aggregations = [([], "count_all")] + [(column, "mean") for column in metrics]
+    result = table.group_by(group_by).aggregate(aggregations).to_pylist()
+    rows = []
+    for row in result:
+        item = {column: row[column] for column in group_by}
+        item["count"] = row["count_all"]
+        for column in metrics:
+            mean = row[f"{column}_mean"]
+            item[f"{column}_avg"] = round(mean, 2) if mean is not None else None
+        rows.append(item)
+    return sorted(rows, key=lambda item: item["count"], reverse=True)
+
+
+def get_stats() -> dict:
+    partitions = []
+    if ARCHIVE_ENABLED:
+        for date in _partition_dates():
+            with _partition_lock(date, shared=True):
+                files = _partition_files(date)
+                rows = sum(pq.ParquetFile(path).metadata.num_rows for path in files)
+            partitions.append({"date": date, "files": len(files), "rows": rows})
+    return {"enabled": ARCHIVE_ENABLED, "path": ARCHIVE_DIR, "partitions": partitions, **stats}
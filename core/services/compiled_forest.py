@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# SOAR Lite – Compiled RandomForest inference
+#
+# The training script flattens the fitted forest into NumPy node arrays stored next
+# to the joblib files of a model version:
+#
+#   models/<version>/forest.npz   feature, threshold, left, right, value, roots, classes
+#   models/<version>/forest.json  feature names, encoder classes, verification result
+#
+# CompiledForest evaluates every tree for a whole batch at once with plain NumPy,
+# so serving needs neither joblib nor scikit-learn. Like sklearn, inputs are cast
+# to float32 and a sample goes left when feature <= threshold.
+
+import os
+import json
+import numpy as np
+
+FOREST_ARRAYS = "forest.npz"
+FOREST_META = "forest.json"
+FORMAT_VERSION = 1
+
+
+def export_forest(model, model_dir: str, feature_names: list, encoders: dict) -> dict:
+    """
+    Flattens a fitted RandomForestClassifier into node arrays. encoders maps a
+    feature name to its LabelEncoder (plus "action" for the target).
+    """
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        left = tree.children_left.astype(np.int32)
+        right = tree.children_right.astype(np.int32)
+        # Leaves have no children (-1); internal children are shifted to global node ids
+        lefts.append(np.where(left >= 0, left + offset, -1))
+        rights.append(np.where(right >= 0, right + offset, -1))
+        features.append(np.maximum(tree.feature, 0).astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+        value = tree.value[:, 0, :].astype(np.float64)
+        values.append(value / value.sum(axis=1, keepdims=True))
+        roots.append(offset)
+        offset += tree.node_count
+
+    np.savez_compressed(
+        os.path.join(model_dir, FOREST_ARRAYS),
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts),
+        right=np.concatenate(rights),
+        value=np.concatenate(values),
+        roots=np.asarray(roots, dtype=np.int32),
+        classes=np.asarray(model.classes_, dtype=np.int64)
+    )
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "feature_names": list(feature_names),
+        "n_trees": len(roots),
+        "n_nodes": offset,
+        "encoders": {name: [str(value) for value in encoder.classes_] for name, encoder in encoders.items()}
+    }
+    with open(os.path.join(model_dir, FOREST_META), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def exists(model_dir: str) -> bool:
+    return os.path.exists(os.path.join(model_dir, FOREST_ARRAYS)) and os.path.exists(os.path.join(model_dir, FOREST_META))
+
+
+class CompiledForest:
+    """
+    Pure-NumPy batch evaluator for an exported forest.
+    """
+
+    def __init__(self, arrays, meta: dict):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.classes_ = arrays["classes"]
+        self.meta = meta
+        self.feature_names = meta["feature_names"]
+        self.encoders = meta["encoders"]
+
+    @classmethod
+    def load(cls, model_dir: str):
+        with open(os.path.join(model_dir, FOREST_META), "r") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported forest format: {meta.get('format_version')}")
+        with np.load(os.path.join(model_dir, FOREST_ARRAYS)) as arrays:
+            return cls({name: arrays[name] for name in arrays.files}, meta)
+
+    def apply(self, X) -> np.ndarray:
+        """
+        Leaf node id reached in every tree, shape (n_samples, n_trees).
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_samples, n_features = X.shape
+        n_trees = len(self.roots)
+        values = X.ravel()
+        # One cursor per (sample, tree); only cursors still on an internal node are advanced
+        nodes = np.tile(self.roots, n_samples)
+        offsets = np.repeat(np.arange(n_samples) * n_features, n_trees)
+        active = np.flatnonzero(self.left[nodes] >= 0)
+        while active.size:
+            current = nodes[active]
+            goes_left = values[offsets[active] + self.feature[current]] <= self.threshold[current]
+            following = np.where(goes_left, self.left[current], self.right[current])
+            nodes[active] = following
+            active = active[self.left[following] >= 0]
+        return nodes.reshape(n_samples, n_trees)
+
+    def predict_proba(self, X) -> np.ndarray:
+        leaves = self.apply(X)
+        proba = np.zeros((leaves.shape[0], self.value.shape[1]), dtype=np.float64)
+        # Summed tree by tree, in the same order as sklearn
+        for tree in range(leaves.shape[1]):
+            proba += self.value[leaves[:, tree]]
+        proba /= leaves.shape[1]
+        return proba
+
+
+def verify_export(model, model_dir: str, X, atol: float = 1e-9) -> dict:
+    """
+    Compares the exported forest with sklearn's predict_proba on X and records the
+    result in forest.json. Raises ValueError if they disagree.
+    """
+    expected = model.predict_proba(X)
+    forest = CompiledForest.load(model_dir)
+    actual = forest.predict_proba(np.asarray(X, dtype=np.float64))
+    max_diff = float(np.abs(expected - actual).max()) if len(expected) else 0.0
+    same_labels = bool((expected.argmax(axis=1) == actual.argmax(axis=1)).all())
+    result = {"samples": len(expected), "max_abs_diff": max_diff, "same_labels": same_labels}
+    if max_diff > atol or not same_labels:
+        raise ValueError(f"Compiled forest does not match sklearn: {result}")
+
+    meta = dict(forest.meta, verification=result)
+    with open(os.path.join(model_dir, FOREST_META), "w") as f:
+        json.dump(meta, f, indent=2)
+    return result
@@ -15,43 +15,76 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import json
-import pandas as pd
+import io
+import csv
 import os
 from core.services.risk import calculate_risk_score
+from core.services import results_store, state_files
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-INPUT_PATH = os.path.join(BASE_DIR, "output", "results.json")
 OUTPUT_PATH = os.path.join(BASE_DIR, "data", "dataset_for_ml.csv")
 
 
+DATASET_COLUMNS = ["event_type", "abuse_score", "country", "usage_type", "total_reports", "risk_score",
+                   "legacy_risk_score", "suggested_action"]
+
+
+def dataset_csv(records) -> str:
+    """
+    Renders dataset rows (or just the header, for an empty list) as CSV text.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=DATASET_COLUMNS)
+    if not records:
+        writer.writeheader()
+    writer.writerows(records)
+    return buffer.getvalue()
+
+
+DATASET_HEADER = dataset_csv([])
+
+
+def dataset_record(alert: dict) -> dict:
+    """
+    Maps one processed alert to a dataset_for_ml.csv row.
+    """
+    enrichment = alert.get("enrichment", {})
+    legacy_score = alert.get("legacy_risk_score", calculate_risk_score(enrichment, alert.get("event_type", "")))
+
+    return {
+        "event_type": alert.get("event_type", ""),
+        "abuse_score": enrichment.get("abuse_score", 0),
+        "country": enrichment.get("country", "unknown"),
+        "usage_type": enrichment.get("usage_type", "unknown"),
+        "total_reports": enrichment.get("total_reports", 0),
+        "risk_score": alert.get("risk_score", 0),
+        "legacy_risk_score": legacy_score,
+        "suggested_action": alert.get("suggested_action", "unclassified")
+    }
+
+
 def generate_dataset_from_results():
+    """
+    Rebuilds dataset_for_ml.csv from every alert in the results store, streaming rows.
+    Alerts already compacted by retention (ALERT_RETENTION_DAYS) are no longer available.
+    """
+    count = 0
+
+    def write(f):
+        nonlocal count
+        writer = csv.DictWriter(f, fieldnames=DATASET_COLUMNS)
+        writer.writeheader()
+        for alert in results_store.iter_results():
+            writer.writerow(dataset_record(alert))
+            count += 1
+
     try:
-        with open(INPUT_PATH, "r") as f:
-            data_file = json.load(f)
+        state_files.replace_file(OUTPUT_PATH, write)
     except Exception as e:
-        print(f"[!] Could not read input file for dataset generation. Exception: {e}")
+        print(f"[!] Could not generate the dataset from stored results. Exception: {e}")
         return
 
-    records = []
-    for alert in data_file:
-        enrichment = alert.get("enrichment", {})
-        legacy_score = alert.get("legacy_risk_score", calculate_risk_score(enrichment, alert.get("event_type", "")))
-
-        records.append({
-            "event_type": alert.get("event_type", ""),
-            "abuse_score": enrichment.get("abuse_score", 0),
-            "country": enrichment.get("country", "unknown"),
-            "usage_type": enrichment.get("usage_type", "unknown"),
-            "total_reports": enrichment.get("total_reports", 0),
-            "risk_score": alert.get("risk_score", 0),
-            "legacy_risk_score": legacy_score,
-            "suggested_action": alert.get("suggested_action", "unclassified")
-        })
-
-    df = pd.DataFrame(records)
-    df.to_csv(OUTPUT_PATH, index=False)
-    print(f"[+] dataset_for_ml.csv updated with {len(records)} records.")
+    print(f"[+] dataset_for_ml.csv updated with {count} records.")
 
 
 # Dados fictícios para fallback local
@@ -88,33 +121,20 @@ example_data = [
     }
 ]
 
-# Load data from the last saved enrichment or use dummy data
-if os.path.isfile(INPUT_PATH) and os.path.getsize(INPUT_PATH) > 0:
-    print(f"[+] Loading enrichment data from '{INPUT_PATH}'")
-    with open(INPUT_PATH, "r") as f:
-        data_file = json.load(f)
-else:
-    print("[!] Results file not found. Using sample data.")
-    data_file = example_data
-
-# Assemble the dataset with the REAL values coming from the API (without modification!)
-records = []
-for alert in data_file:
-    enrichment = alert.get("enrichment", {})
-    legacy_score = alert.get("legacy_risk_score", calculate_risk_score(enrichment, alert.get("event_type", "")))
+def ensure_dataset():
+    """
+    The dataset is appended to as alerts are processed. Rebuilds it from the results store
+    when it is missing; on a fresh install it starts empty and training falls back to
+    the sample data above.
+    """
+    if os.path.isfile(OUTPUT_PATH):
+        return
+    if results_store.count():
+        generate_dataset_from_results()
+    else:
+        print("[!] No processed alerts found. Creating an empty dataset.")
+        state_files.append_text(OUTPUT_PATH, [], header=DATASET_HEADER)
 
-    records.append({
-        "event_type": alert.get("event_type", ""),
-        "abuse_score": enrichment.get("abuse_score", 0),
-        "country": enrichment.get("country", "unknown"),
-        "usage_type": enrichment.get("usage_type", "unknown"),
-        "total_reports": enrichment.get("total_reports", 0),
-        "risk_score": alert.get("risk_score", 0),
-        "legacy_risk_score": legacy_score,
-        "suggested_action": alert.get("suggested_action", "unclassified")
-    })
 
-# Save the new dataset
-df = pd.DataFrame(records)
-df.to_csv(OUTPUT_PATH, index=False)
-print(f"[+] Dataset successfully saved to: {OUTPUT_PATH}")
\ No newline at end of file
+if __name__ == "__main__":
+    ensure_dataset()
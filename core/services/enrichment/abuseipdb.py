@@ -16,8 +16,11 @@
 # limitations under the License.
 
 import os
-import requests
 import logging
+from core.services import http_client
+from core.services.enrichment.ratelimit import request_with_retry, QuotaExhausted
+
+ABUSEIPDB_BASE_URL = os.getenv("ABUSEIPDB_BASE_URL", "https://api.abuseipdb.com/api/v2").rstrip("/")
 
 
 def enrich_ip(ip):
@@ -45,15 +48,23 @@ def enrich_ip(ip):
         }
 
     try:
-        response = requests.get(
-            "https://api.abuseipdb.com/api/v2/check",
+        response = request_with_retry("abuseipdb", lambda: http_client.get(
+            f"{ABUSEIPDB_BASE_URL}/check",
             params={"ipAddress": ip, "maxAgeInDays": "90"},
-            headers={"Key": api_key, "Accept": "application/json"},
-            timeout=5
-        )
+            headers={"Key": api_key, "Accept": "application/json"}
+        ))
 
         logging.info(f"AbuseIPDB response status: {response.status_code}")
 
+        if response.status_code != 200:
+            logging.warning(f"AbuseIPDB returned {response.status_code} for {ip}")
+            return {
+                "abuse_score": 0,
+                "country": "unknown",
+                "source": "error",
+                "rate_limited": response.status_code == 429
+            }
+
         data = response.json().get("data", {})
         enrichment = {
             "abuse_score": data.get("abuseConfidenceScore", 0),
@@ -67,6 +78,16 @@ def enrich_ip(ip):
         logging.info(f"[ENRICH] IP {ip} => {enrichment}")
         return enrichment
 
+    except QuotaExhausted as e:
+        # A quota state, not an error about this IP: flag it so it is not negatively cached
+        logging.warning(f"[AbuseIPDB] {e}")
+        return {
+            "abuse_score": 0,
+            "country": "unknown",
+            "source": "error",
+            "rate_limited": True
+        }
+
     except Exception as e:
         logging.error(f"Error querying AbuseIPDB: {e}")
         return {
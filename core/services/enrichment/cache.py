@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+CACHE_PATH = os.getenv("ENRICHMENT_CACHE_PATH", os.path.join(BASE_DIR, "data", "enrichment_cache.db"))
+CACHE_ENABLED = os.getenv("ENRICHMENT_CACHE_ENABLED", "true").lower() == "true"
+CACHE_MAX_ENTRIES = int(os.getenv("ENRICHMENT_CACHE_MAX_ENTRIES", 50000))
+
+# Positive TTLs (seconds) per provider and IOC type.
+# Override with ENRICHMENT_CACHE_TTL_<PROVIDER>_<IOC_TYPE> or ENRICHMENT_CACHE_TTL_<PROVIDER>.
+DEFAULT_TTLS = {
+    "abuseipdb": {"ip": 6 * 3600},
+    "virustotal": {
+        "ip": 24 * 3600,
+        "domain": 24 * 3600,
+        "url": 6 * 3600,
+        "hash": 7 * 24 * 3600
+    }
+}
+DEFAULT_TTL = 6 * 3600
+
+# Negative caching: unknown IOCs (404) are stable for a while, transient errors are not
+NOT_FOUND_TTL = int(os.getenv("ENRICHMENT_CACHE_NOT_FOUND_TTL", 6 * 3600))
+ERROR_TTL = int(os.getenv("ENRICHMENT_CACHE_ERROR_TTL", 300))
+
+# Stale-while-revalidate: expired positive ('ok') entries are still served (tagged
+# stale) for this many seconds while a background refresh fetches a new copy. 0 disables it.
+STALE_TTL = int(os.getenv("ENRICHMENT_CACHE_STALE_TTL", 900))
+
+# Evict in batches instead of checking the table size on every write
+EVICTION_CHECK_INTERVAL = 100
+
+_lock = threading.Lock()
+_conn = None
+_writes_since_eviction = 0
+
+stats = {
+    "hits": 0,
+    "misses": 0,
+    "negative_hits": 0,
+    "expired": 0,
+    "stale_hits": 0,
+    "writes": 0,
+    "evictions": 0
+}
+
+
+def make_key(ioc_type: str, ioc_value: str) -> str:
+    return f"{ioc_type}::{ioc_value}"
+
+
+def get_ttl(provider: str, ioc_type: str) -> int:
+    for env_name in (f"ENRICHMENT_CACHE_TTL_{provider}_{ioc_type}".upper(),
+                     f"ENRICHMENT_CACHE_TTL_{provider}".upper()):
+        value = os.getenv(env_name)
+        if value:
+            return int(value)
+    return DEFAULT_TTLS.get(provider, {}).get(ioc_type, DEFAULT_TTL)
+
+
+def entry_status(data):
+    """
+    Returns how a provider response should be cached: 'ok', 'not_found', 'error',
+    or None when it must not be cached at all (mock, fallback or rate-limited data).
+    """
+    if not isinstance(data, dict):
+        return None
+    if data.get("source") in ("mock", "fallback"):
+        return None
+    if data.get("rate_limited"):
+        # Says nothing about the IOC itself, the next lookup should try again
+        return None
+    if "error" in data:
+        return "not_found" if "404" in str(data["error"]) else "error"
+    if data.get("source") == "error":
+        return "error"
+    return "ok"
+
+
+def _get_conn():
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        _conn = sqlite3.connect(CACHE_PATH, check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS enrichment_cache (
+                provider TEXT NOT NULL,
+                ioc_key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                data TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (provider, ioc_key)
+            )
+        """)
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_access ON enrichment_cache (last_access)")
+        # Background refreshes are claimed here so only one process re-fetches an entry
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS refresh_claims (
+                provider TEXT NOT NULL,
+                ioc_key TEXT NOT NULL,
+                claimed_until REAL NOT NULL,
+                PRIMARY KEY (provider, ioc_key)
+            )
+        """)
+
+        columns = {row[1] for row in _conn.execute("PRAGMA table_info(enrichment_cache)")}
+        if "hit_count" not in columns:
+            _conn.execute("ALTER TABLE enrichment_cache ADD COLUMN hit_count INTEGER NOT NULL DEFAULT 0")
+    return _conn
+
+
+def get(provider: str, ioc_type: str, ioc_value: str):
+    """
+    Returns the cached provider response, or None on a miss or an expired entry.
+    """
+    data, state = lookup(provider, ioc_type, ioc_value)
+    return data if state == "fresh" else None
+
+
+def lookup(provider: str, ioc_type: str, ioc_value: str) -> tuple:
+    """
+    Returns (data, state) where state is 'fresh', 'stale' (expired but inside the
+    stale window, only for 'ok' entries) or None on a miss.
+    """
+    if not CACHE_ENABLED:
+        return None, None
+
+    key = make_key(ioc_type, ioc_value)
+    now = time.time()
+    try:
+        with _lock:
+            conn = _get_conn()
+            row = conn.execute(
+                "SELECT status, data, expires_at FROM enrichment_cache WHERE provider = ? AND ioc_key = ?",
+                (provider, key)
+            ).fetchone()
+
+            if row is None:
+                stats["misses"] += 1
+                return None, None
+
+            status, data, expires_at = row
+            if expires_at <= now:
+                if status != "ok" or now >= expires_at + STALE_TTL:
+                    stats["expired"] += 1
+                    stats["misses"] += 1
+                    return None, None
+                state = "stale"
+                stats["stale_hits"] += 1
+            else:
+                state = "fresh"
+
+            conn.execute(
+                "UPDATE enrichment_cache SET last_access = ?, hit_count = hit_count + 1 "
+                "WHERE provider = ? AND ioc_key = ?",
+                (now, provider, key)
+            )
+            stats["hits"] += 1
+            if status != "ok":
+                stats["negative_hits"] += 1
+
+        return json.loads(data), state
+    except Exception as e:
+        logging.warning(f"[Cache] Failed to read {provider} entry for {key}: {e}")
+        return None, None
+
+
+def hot_entries(expiring_within: float, limit: int) -> list:
+    """
+    Most frequently hit positive entries that expire within the given number of
+    seconds (or already did, within the stale window), as (provider, ioc_type, ioc_value).
+    """
+    if not CACHE_ENABLED:
+        return []
+    now = time.time()
+    try:
+        with _lock:
+            rows = _get_conn().execute(
+                "SELECT provider, ioc_key FROM enrichment_cache "
+                "WHERE status = 'ok' AND expires_at <= ? AND expires_at + ? > ? "
+                "ORDER BY hit_count DESC LIMIT ?",
+                (now + expiring_within, STALE_TTL, now, limit)
+            ).fetchall()
+    except Exception as e:
+        logging.warning(f"[Cache] Failed to list hot entries: {e}")
+        return []
+    return [(provider, *key.split("::", 1)) for provider, key in rows]
+
+
+def claim_refresh(provider: str, ioc_type: str, ioc_value: str, lease: float) -> bool:
+    """
+    Claims the background refresh of an entry for lease seconds. Returns False if
+    another thread or process already holds the claim.
+    """
+    if not CACHE_ENABLED:
+        return True
+    key = make_key(ioc_type, ioc_value)
+    now = time.time()
+    try:
+        with _lock:
+            claimed = _get_conn().execute(
+                "INSERT INTO refresh_claims (provider, ioc_key, claimed_until) VALUES (?, ?, ?) "
+                "ON CONFLICT (provider, ioc_key) DO UPDATE SET claimed_until = excluded.claimed_until "
+                "WHERE refresh_claims.claimed_until <= ?",
+                (provider, key, now + lease, now)
+            ).rowcount
+        return claimed == 1
+    except Exception as e:
+        logging.warning(f"[Cache] Failed to claim refresh of {provider} entry for {key}: {e}")
+        return False
+
+
+def put(provider: str, ioc_type: str, ioc_value: str, data: dict):
+    global _writes_since_eviction
+
+    if not CACHE_ENABLED:
+        return
+
+    status = entry_status(data)
+    if status is None:
+        return
+
+    if status == "ok":
+        ttl = get_ttl(provider, ioc_type)
+    elif status == "not_found":
+        ttl = NOT_FOUND_TTL
+    else:
+        ttl = ERROR_TTL
+
+    key = make_key(ioc_type, ioc_value)
+    now = time.time()
+    try:
+        with _lock:
+            conn = _get_conn()
+            # Upsert so refreshed entries keep their hit_count
+            conn.execute(
+                "INSERT INTO enrichment_cache "
+                "(provider, ioc_key, status, data, stored_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (provider, ioc_key) DO UPDATE SET status = excluded.status, data = excluded.data, "
+                "stored_at = excluded.stored_at, expires_at = excluded.expires_at, last_access = excluded.last_access",
+                (provider, key, status, json.dumps(data), now, now + ttl, now)
+            )
+            stats["writes"] += 1
+
+            _writes_since_eviction += 1
+            if _writes_since_eviction >= EVICTION_CHECK_INTERVAL:
+                _writes_since_eviction = 0
+                _evict(conn)
+    except Exception as e:
+        logging.warning(f"[Cache] Failed to store {provider} entry for {key}: {e}")
+
+
+def _evict(conn):
+    """
+    Drops entries past their stale window, then the least recently used ones above CACHE_MAX_ENTRIES.
+    """
+    now = time.time()
+    removed = conn.execute(
+        "DELETE FROM enrichment_cache WHERE expires_at <= ? AND (status != 'ok' OR expires_at + ? <= ?)",
+        (now, STALE_TTL, now)
+    ).rowcount
+    conn.execute("DELETE FROM refresh_claims WHERE claimed_until <= ?", (now,))
+
+    total = conn.execute("SELECT COUNT(*) FROM enrichment_cache").fetchone()[0]
+    overflow = total - CACHE_MAX_ENTRIES
+    if overflow > 0:
+        removed += conn.execute(
+            "DELETE FROM enrichment_cache WHERE rowid IN "
+            "(SELECT rowid FROM enrichment_cache ORDER BY last_access ASC LIMIT ?)",
+            (overflow,)
+        ).rowcount
+
+    if removed:
+        stats["evictions"] += removed
+        logging.info(f"[Cache] Evicted {removed} enrichment entries.")
+
+
+def get_stats() -> dict:
+    entries = {}
+    try:
+        with _lock:
+            for provider, status, count in _get_conn().execute(
+                    "SELECT provider, status, COUNT(*) FROM enrichment_cache GROUP BY provider, status"):
+                entries.setdefault(provider, {})[status] = count
+    except Exception as e:
+        logging.warning(f"[Cache] Failed to read cache size: {e}")
+
+    lookups = stats["hits"] + stats["misses"]
+    return {
+        "enabled": CACHE_ENABLED,
+        "path": CACHE_PATH,
+        "stale_ttl": STALE_TTL,
+        "max_entries": CACHE_MAX_ENTRIES,
+        "entries": entries,
+        "hit_ratio": round(stats["hits"] / lookups, 3) if lookups else 0.0,
+        **stats
+    }
+
+
+def clear():
+    with _lock:
+        _get_conn().execute("DELETE FROM enrichment_cache")
+        _get_conn().execute("DELETE FROM refresh_claims")
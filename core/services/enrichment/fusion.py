@@ -15,14 +15,154 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import time
+import asyncio
 import logging
-from core.services.enrichment import virustotal
-from core.services.enrichment.abuseipdb import enrich_ip as abuseipdb_enrich
+import weakref
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from core.services.enrichment import cache, local_feeds, refresher, ratelimit, providers as provider_registry
+from core.services.enrichment.singleflight import SingleFlight, AsyncSingleFlight
 
 logger = logging.getLogger(__name__)
 
+# Whole-IOC deadline in seconds; each provider is also bounded by its own latency budget.
+# 0 disables both, so every provider is waited for.
+_deadline_env = float(os.getenv("ENRICH_DEADLINE_SECONDS", 15))
+DEADLINE = _deadline_env if _deadline_env > 0 else None
 
-def enrich_ioc(ioc_type: str, ioc_value: str) -> dict:
+# Provider clients are blocking, so fan-out and the async path run them on a dedicated pool
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ENRICH_WORKERS", sum(p.concurrency for p in provider_registry.all_providers()) + 4)),
+    thread_name_prefix="enrich"
+)
+
+# asyncio.Semaphore is bound to the loop that first uses it, so keep one set per loop
+_semaphores = weakref.WeakKeyDictionary()
+
+# Concurrent lookups of the same IOC (across requests) share one in-flight call
+_provider_flight = SingleFlight("provider_calls")
+_provider_flight_async = AsyncSingleFlight("provider_calls_async")
+_ioc_flight = SingleFlight("enrich_ioc")
+_ioc_flight_async = AsyncSingleFlight("enrich_ioc_async")
+
+
+def _get_semaphore(provider: str) -> asyncio.Semaphore:
+    per_loop = _semaphores.setdefault(asyncio.get_running_loop(), {})
+    if provider not in per_loop:
+        per_loop[provider] = asyncio.Semaphore(provider_registry.get(provider).concurrency)
+    return per_loop[provider]
+
+
+def _plan_sources(ioc_type: str, ioc_value: str) -> tuple:
+    """
+    Checks the local feeds first. Returns the sources already known and the
+    providers that still need to be queried.
+    """
+    sources = {}
+    providers = provider_registry.for_ioc_type(ioc_type)
+
+    local = local_feeds.lookup(ioc_type, ioc_value)
+    if local:
+        sources["local_feeds"] = local
+        # Known-good or known-bad IOCs do not need paid lookups such as VirusTotal;
+        # a Bloom filter hit may be a false positive, so the providers still decide
+        if not local.get("probabilistic"):
+            providers = [p for p in providers if not p.skip_on_local_verdict]
+
+    return sources, providers
+
+
+def _deadline_at(provider, started: float, deadline):
+    if deadline is None:
+        return None
+    return started + min(provider.latency_budget, deadline)
+
+
+def _time_left(provider, started: float, deadline):
+    deadline_at = _deadline_at(provider, started, deadline)
+    if deadline_at is None:
+        return None
+    return max(0.0, deadline_at - time.monotonic())
+
+
+def _timed_out(provider, result: dict) -> dict:
+    provider.stats["timeouts"] += 1
+    result.setdefault("timed_out", []).append(provider.name)
+    logger.warning(f"[Fusion] {provider.name} exceeded its latency budget for "
+                   f"{result['ioc_type']}::{result['ioc_value']}")
+    return {"error": f"Timed out waiting for {provider.name}", "timed_out": True}
+
+
+def _cached(provider: str, ioc_type: str, ioc_value: str):
+    """
+    Cache lookup with stale-while-revalidate: a recently expired entry is returned
+    at once, tagged stale, and a background refresh is queued for it.
+    """
+    data, state = cache.lookup(provider, ioc_type, ioc_value)
+    if state == "stale":
+        data["stale"] = True
+        refresher.schedule(provider, ioc_type, ioc_value)
+    return data
+
+
+def _fetch_and_store(provider: str, ioc_type: str, ioc_value: str, deadline_at=None) -> dict:
+    return _provider_flight.do((provider, ioc_type, ioc_value), _fetch_and_store_once,
+                               provider, ioc_type, ioc_value, deadline_at)
+
+
+def _fetch_and_store_once(provider: str, ioc_type: str, ioc_value: str, deadline_at=None) -> dict:
+    """
+    Calls the provider. With a deadline_at (time.monotonic()), a lookup whose rate
+    limit token would only be granted after it comes back rate limited at once and
+    is deferred to the background refresher instead of holding an enrichment thread.
+    """
+    p = provider_registry.get(provider)
+    started = time.monotonic()
+    try:
+        with ratelimit.token_deadline(deadline_at):
+            data = p.fetch(ioc_type, ioc_value)
+    except Exception:
+        p.stats["errors"] += 1
+        raise
+    finally:
+        p.stats["calls"] += 1
+        p.stats["total_latency"] += time.monotonic() - started
+
+    if deadline_at is not None and isinstance(data, dict) and data.get("rate_limited"):
+        refresher.schedule(provider, ioc_type, ioc_value)
+    cache.put(provider, ioc_type, ioc_value, data)
+    return data
+
+
+async def query_provider_async(provider: str, ioc_type: str, ioc_value: str, deadline_at=None) -> dict:
+    """
+    Returns the provider response for an IOC. Cache hits return immediately, misses wait for
+    a free slot of the provider's concurrency limit and run on the enrichment pool.
+    """
+    cached = _cached(provider, ioc_type, ioc_value)
+    if cached is not None:
+        return cached
+    return await _provider_flight_async.do((provider, ioc_type, ioc_value), _fetch_async,
+                                           provider, ioc_type, ioc_value, deadline_at)
+
+
+async def _fetch_async(provider: str, ioc_type: str, ioc_value: str, deadline_at=None) -> dict:
+    async with _get_semaphore(provider):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, _fetch_and_store, provider, ioc_type, ioc_value, deadline_at)
+
+
+def enrich_ioc(ioc_type: str, ioc_value: str, deadline=DEADLINE) -> dict:
+    """
+    Queries every applicable provider in parallel. Providers that miss their latency
+    budget (or the whole-IOC deadline) are reported as timed out; their lookup keeps
+    running in the background and lands in the cache for the next request.
+    """
+    return _ioc_flight.do((ioc_type, ioc_value, deadline), _enrich_ioc, ioc_type, ioc_value, deadline)
+
+
+def _enrich_ioc(ioc_type: str, ioc_value: str, deadline) -> dict:
     result = {
         "ioc_type": ioc_type,
         "ioc_value": ioc_value,
@@ -31,24 +171,28 @@ def enrich_ioc(ioc_type: str, ioc_value: str) -> dict:
     }
 
     try:
-        # Enrichment with AbuseIPDB (only if it is IP)
-        if ioc_type == "ip":
-            abuse_data = abuseipdb_enrich(ioc_value)
-            result["sources"]["abuseipdb"] = abuse_data
-
-        # VirusTotal Enrichment
-        if ioc_type == "ip":
-            vt_data = virustotal.get_ip_report(ioc_value)
-        elif ioc_type == "domain":
-            vt_data = virustotal.get_domain_report(ioc_value)
-        elif ioc_type == "hash":
-            vt_data = virustotal.get_file_hash_report(ioc_value)
-        elif ioc_type == "url":
-            vt_data = virustotal.get_url_report(ioc_value)
-        else:
-            vt_data = {"error": f"Unsupported IOC type: {ioc_type}"}
-
-        result["sources"]["virustotal"] = vt_data
+        result["sources"], providers = _plan_sources(ioc_type, ioc_value)
+        started = time.monotonic()
+
+        futures = {}
+        for p in providers:
+            cached = _cached(p.name, ioc_type, ioc_value)
+            if cached is not None:
+                result["sources"][p.name] = cached
+            else:
+                futures[p.name] = _executor.submit(_fetch_and_store, p.name, ioc_type, ioc_value,
+                                                   _deadline_at(p, started, deadline))
+
+        for p in providers:
+            if p.name not in futures:
+                continue
+            try:
+                result["sources"][p.name] = futures[p.name].result(timeout=_time_left(p, started, deadline))
+            except FutureTimeoutError:
+                result["sources"][p.name] = _timed_out(p, result)
+            except Exception as e:
+                logger.error(f"Failed to enrich IOC with {p.name}: {e}")
+                result["error"] = str(e)
 
         # Cálculo de risco baseado em enriquecimentos
         result["risk_score"] = calculate_combined_risk(result["sources"], ioc_type)
@@ -60,9 +204,91 @@ def enrich_ioc(ioc_type: str, ioc_value: str) -> dict:
     return result
 
 
+async def enrich_ioc_async(ioc_type: str, ioc_value: str, deadline=DEADLINE) -> dict:
+    """
+    Same result as enrich_ioc, for use from the event loop.
+    """
+    return await _ioc_flight_async.do((ioc_type, ioc_value, deadline), _enrich_ioc_async, ioc_type, ioc_value, deadline)
+
+
+async def _enrich_ioc_async(ioc_type: str, ioc_value: str, deadline) -> dict:
+    result = {
+        "ioc_type": ioc_type,
+        "ioc_value": ioc_value,
+        "sources": {},
+        "risk_score": 0
+    }
+
+    try:
+        result["sources"], providers = _plan_sources(ioc_type, ioc_value)
+        started = time.monotonic()
+        responses = await asyncio.gather(*[
+            asyncio.wait_for(query_provider_async(p.name, ioc_type, ioc_value, _deadline_at(p, started, deadline)),
+                             _time_left(p, started, deadline))
+            for p in providers
+        ], return_exceptions=True)
+
+        # Keep whatever the other providers returned when one of them fails
+        for p, response in zip(providers, responses):
+            if isinstance(response, asyncio.TimeoutError):
+                result["sources"][p.name] = _timed_out(p, result)
+            elif isinstance(response, Exception):
+                logger.error(f"Failed to enrich IOC with {p.name}: {response}")
+                result["error"] = str(response)
+            else:
+                result["sources"][p.name] = response
+
+        result["risk_score"] = calculate_combined_risk(result["sources"], ioc_type)
+
+    except Exception as e:
+        logger.exception("Failed to enrich IOC")
+        result["error"] = str(e)
+
+    return result
+
+
+def plan_batch(iocs: list) -> tuple:
+    """
+    Groups a list of (ioc_type, ioc_value) pairs.
+    Returns the distinct pairs and, for every input row, the index of its group.
+    """
+    groups = {}
+    row_groups = [groups.setdefault(ioc, len(groups)) for ioc in iocs]
+    return list(groups), row_groups
+
+
+async def enrich_batch(iocs: list, deadline=DEADLINE) -> tuple:
+    """
+    Enriches each distinct (ioc_type, ioc_value) pair once, concurrently, and fans the
+    result back to every row. Returns the per-row results (input order) and batch stats.
+    """
+    unique_iocs, row_groups = plan_batch(iocs)
+    enriched = await asyncio.gather(*[enrich_ioc_async(ioc_type, ioc_value, deadline)
+                                      for ioc_type, ioc_value in unique_iocs])
+
+    batch_stats = {
+        "rows": len(iocs),
+        "unique_iocs": len(unique_iocs),
+        "timed_out": sum(1 for r in enriched if r.get("timed_out")),
+        "dedup_ratio": round(len(iocs) / len(unique_iocs), 2) if unique_iocs else 1.0
+    }
+    logger.info(f"[Fusion] Enriched {batch_stats['unique_iocs']} distinct IOCs for {batch_stats['rows']} rows")
+
+    # Rows sharing an IOC share the same (read-only) enrichment dict
+    return [enriched[group] for group in row_groups], batch_stats
+
+
 def calculate_combined_risk(sources: dict, ioc_type: str) -> int:
     score = 0
 
+    # Local feeds: exact allow/block matches override provider scores
+    local = sources.get("local_feeds")
+    if isinstance(local, dict) and not local.get("probabilistic"):
+        if local.get("verdict") == "benign":
+            return 0
+        if local.get("verdict") == "malicious":
+            return 100
+
     # AbuseIPDB: reputation + number of reports
     if "abuseipdb" in sources and isinstance(sources["abuseipdb"], dict):
         abuse_data = sources["abuseipdb"]
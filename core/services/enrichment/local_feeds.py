@@ -0,0 +1,316 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# SOAR Lite – Local threat feeds
+#
+# Feeds are plain text files, one indicator per line ('#' starts a comment):
+#
+#   data/feeds/blocklist/ip/*.txt       IPs and CIDRs (IPv4/IPv6)
+#   data/feeds/blocklist/domain/*.txt   domains, also matching their subdomains
+#   data/feeds/blocklist/hash/*.txt     MD5/SHA1/SHA256 hashes
+#   data/feeds/allowlist/<same kinds>
+#
+# Allowlists take precedence over blocklists. Matches from Bloom-filtered feeds are
+# reported as probabilistic: a hint that does not replace provider lookups.
+
+import os
+import math
+import time
+import hashlib
+import logging
+import ipaddress
+import threading
+from array import array
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+FEEDS_DIR = os.getenv("LOCAL_FEEDS_DIR", os.path.join(BASE_DIR, "data", "feeds"))
+FEEDS_ENABLED = os.getenv("LOCAL_FEEDS_ENABLED", "true").lower() == "true"
+CHECK_INTERVAL = float(os.getenv("LOCAL_FEEDS_CHECK_INTERVAL", 30))
+
+# Hash feeds larger than this are loaded into a Bloom filter instead of a set
+BLOOM_THRESHOLD = int(os.getenv("LOCAL_FEEDS_BLOOM_THRESHOLD", 2_000_000))
+BLOOM_FP_RATE = float(os.getenv("LOCAL_FEEDS_BLOOM_FP_RATE", 0.001))
+
+LISTS = {"allowlist": "benign", "blocklist": "malicious"}
+KINDS = ("ip", "domain", "hash")
+
+
+class CidrTree:
+    """
+    Binary prefix tree over address bits. Nodes live in flat int arrays
+    (child index 0 means "no child") to keep large feeds compact.
+    """
+
+    def __init__(self, bits: int):
+        self.bits = bits
+        self.children = (array("i", [0]), array("i", [0]))
+        self.terminal = bytearray(1)
+
+    def insert(self, network: int, prefixlen: int):
+        node = 0
+        for i in range(prefixlen):
+            if self.terminal[node]:
+                return  # a shorter prefix already covers it
+            bit = (network >> (self.bits - 1 - i)) & 1
+            child = self.children[bit][node]
+            if child == 0:
+                child = len(self.terminal)
+                self.children[0].append(0)
+                self.children[1].append(0)
+                self.terminal.append(0)
+                self.children[bit][node] = child
+            node = child
+        self.terminal[node] = 1
+
+    def contains(self, address: int) -> bool:
+        node = 0
+        for i in range(self.bits):
+            if self.terminal[node]:
+                return True
+            node = self.children[(address >> (self.bits - 1 - i)) & 1][node]
+            if node == 0:
+                return False
+        return bool(self.terminal[node])
+
+    def __len__(self):
+        return len(self.terminal)
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, fp_rate: float):
+        self.size = max(8, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bitset = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: bytes):
+        digest = hashlib.blake2b(value, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value: bytes):
+        for pos in self._positions(value):
+            self.bitset[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, value: bytes) -> bool:
+        return all(self.bitset[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+def _hash_key(value: str):
+    value = value.strip().lower()
+    try:
+        return bytes.fromhex(value)
+    except ValueError:
+        return value.encode()
+
+
+def _read_entries(path):
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            entry = line.split("#", 1)[0].strip()
+            if entry:
+                yield entry.split()[0].split(",")[0]
+
+
+class Feed:
+    def __init__(self, path: str, list_name: str, kind: str):
+        self.path = path
+        self.name = os.path.relpath(path, FEEDS_DIR)
+        self.list_name = list_name
+        self.kind = kind
+        stat = os.stat(path)
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        self.count = 0
+        self.probabilistic = False
+        self._load()
+
+    def _load(self):
+        entries = _read_entries(self.path)
+        if self.kind == "ip":
+            self.trees = {4: CidrTree(32), 6: CidrTree(128)}
+            for entry in entries:
+                try:
+                    network = ipaddress.ip_network(entry, strict=False)
+                except ValueError:
+                    continue
+                self.trees[network.version].insert(int(network.network_address), network.prefixlen)
+                self.count += 1
+        elif self.kind == "domain":
+            self.domains = {entry.lower().rstrip(".") for entry in entries}
+            self.count = len(self.domains)
+        else:
+            # Count first so very large feeds are never fully materialized as a set
+            self.count = sum(1 for _ in _read_entries(self.path))
+            if self.count > BLOOM_THRESHOLD:
+                self.hashes = BloomFilter(self.count, BLOOM_FP_RATE)
+                for entry in entries:
+                    self.hashes.add(_hash_key(entry))
+                self.probabilistic = True
+            else:
+                self.hashes = {_hash_key(entry) for entry in entries}
+
+    def match(self, kind: str, value):
+        if kind == "ip":
+            return self.trees[value.version].contains(int(value))
+        if kind == "domain":
+            # evil.com also matches a.b.evil.com
+            labels = value.split(".")
+            return any(".".join(labels[i:]) in self.domains for i in range(len(labels)))
+        return value in self.hashes
+
+
+class FeedIndex:
+    def __init__(self, feeds_dir: str):
+        self.feeds_dir = feeds_dir
+        self.feeds = {}
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+        self.stats = {"lookups": 0, "hits": 0, "reloads": 0}
+
+    def _scan(self):
+        found = {}
+        for list_name in LISTS:
+            for kind in KINDS:
+                directory = os.path.join(self.feeds_dir, list_name, kind)
+                if not os.path.isdir(directory):
+                    continue
+                for entry in os.scandir(directory):
+                    if entry.is_file() and not entry.name.startswith("."):
+                        stat = entry.stat()
+                        found[entry.path] = (list_name, kind, (stat.st_mtime_ns, stat.st_size))
+        return found
+
+    def refresh(self, force: bool = False):
+        """
+        Reloads only the feed files that were added, changed or removed since the last check.
+        """
+        now = time.monotonic()
+        if not force and now - self.checked_at < CHECK_INTERVAL:
+            return
+        # Lookups keep using the current feeds while another thread reloads,
+        # except for the very first load
+        if not self.lock.acquire(blocking=force or self.checked_at == 0.0):
+            return
+        try:
+            if not force and now - self.checked_at < CHECK_INTERVAL:
+                return
+            self.checked_at = now
+
+            found = self._scan()
+            feeds = {path: feed for path, feed in self.feeds.items()
+                     if path in found and found[path][2] == feed.signature}
+            for path, (list_name, kind, _) in found.items():
+                if path in feeds:
+                    continue
+                try:
+                    feeds[path] = Feed(path, list_name, kind)
+                    self.stats["reloads"] += 1
+                    logging.info(f"[LocalFeeds] Loaded {feeds[path].name} ({feeds[path].count} entries)")
+                except Exception as e:
+                    logging.warning(f"[LocalFeeds] Failed to load {path}: {e}")
+
+            # Swap the whole dict so lookups never see a half-updated index
+            self.feeds = feeds
+        finally:
+            self.lock.release()
+
+    def lookup(self, ioc_type: str, ioc_value: str):
+        """
+        Returns the local verdict for an IOC, or None if no feed lists it.
+        """
+        self.refresh()
+        self.stats["lookups"] += 1
+
+        candidates = _candidates(ioc_type, ioc_value)
+        if not candidates:
+            return None
+
+        matches = []
+        for feed in self.feeds.values():
+            value = candidates.get(feed.kind)
+            if value is not None and feed.match(feed.kind, value):
+                matches.append(feed)
+
+        if not matches:
+            return None
+        # Exact matches win over Bloom filter hits, then allowlists over blocklists
+        match = min(matches, key=lambda feed: (feed.probabilistic, feed.list_name != "allowlist"))
+
+        self.stats["hits"] += 1
+        return {
+            "verdict": LISTS[match.list_name],
+            "list": match.list_name,
+            "feed": match.name,
+            "probabilistic": match.probabilistic,
+            "source": "local_feeds"
+        }
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": FEEDS_ENABLED,
+            "feeds_dir": self.feeds_dir,
+            "feeds": [{"feed": f.name, "list": f.list_name, "kind": f.kind, "entries": f.count,
+                       "probabilistic": f.probabilistic} for f in self.feeds.values()],
+            **self.stats
+        }
+
+
+def _candidates(ioc_type: str, ioc_value: str) -> dict:
+    """
+    Maps an IOC to the normalized values each feed kind is matched against.
+    """
+    value = (ioc_value or "").strip()
+    if not value:
+        return {}
+
+    if ioc_type == "url":
+        value = urlsplit(value if "://" in value else f"http://{value}").hostname or ""
+        ioc_type = "domain"
+
+    if ioc_type in ("ip", "domain") and value:
+        try:
+            return {"ip": ipaddress.ip_address(value)}
+        except ValueError:
+            return {"domain": value.lower().rstrip(".")} if ioc_type == "domain" else {}
+
+    if ioc_type == "hash":
+        return {"hash": _hash_key(value)}
+
+    return {}
+
+
+index = FeedIndex(FEEDS_DIR)
+
+
+def lookup(ioc_type: str, ioc_value: str):
+    if not FEEDS_ENABLED:
+        return None
+    try:
+        return index.lookup(ioc_type, ioc_value)
+    except Exception as e:
+        logging.warning(f"[LocalFeeds] Lookup failed for {ioc_type}::{ioc_value}: {e}")
+        return None
+
+
+def get_stats() -> dict:
+    index.refresh()
+    return index.get_stats()
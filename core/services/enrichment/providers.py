@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+from dataclasses import dataclass, field
+from typing import Callable
+from core.services.enrichment import virustotal
+from core.services.enrichment.abuseipdb import enrich_ip as abuseipdb_enrich
+
+
+@dataclass
+class Provider:
+    """
+    An enrichment source. fetch(ioc_type, ioc_value) must return a dict and may block.
+    """
+    name: str
+    fetch: Callable
+    ioc_types: tuple
+    # Relative cost of one lookup (quota/money). Free sources use 0.
+    cost: float = 1.0
+    # Seconds a lookup may take before it is reported as timed out
+    latency_budget: float = 10.0
+    # Maximum in-flight lookups on the async path
+    concurrency: int = 4
+    # Skip this provider when the local feeds already have a verdict for the IOC
+    skip_on_local_verdict: bool = True
+    stats: dict = field(default_factory=lambda: {"calls": 0, "timeouts": 0, "errors": 0, "total_latency": 0.0})
+
+    def supports(self, ioc_type: str) -> bool:
+        return ioc_type in self.ioc_types
+
+
+_registry = {}
+
+
+def register(provider: Provider):
+    _registry[provider.name] = provider
+
+
+def get(name: str) -> Provider:
+    return _registry[name]
+
+
+def for_ioc_type(ioc_type: str) -> list:
+    """
+    Providers supporting an IOC type, cheapest first.
+    """
+    return sorted((p for p in _registry.values() if p.supports(ioc_type)), key=lambda p: p.cost)
+
+
+def all_providers() -> list:
+    return list(_registry.values())
+
+
+def get_stats() -> dict:
+    stats = {}
+    for p in _registry.values():
+        calls = p.stats["calls"]
+        stats[p.name] = {
+            "ioc_types": list(p.ioc_types),
+            "cost": p.cost,
+            "latency_budget": p.latency_budget,
+            "concurrency": p.concurrency,
+            "calls": calls,
+            "timeouts": p.stats["timeouts"],
+            "errors": p.stats["errors"],
+            "avg_latency": round(p.stats["total_latency"] / calls, 3) if calls else 0.0
+        }
+    return stats
+
+
+def _query_abuseipdb(ioc_type: str, ioc_value: str) -> dict:
+    return abuseipdb_enrich(ioc_value)
+
+
+def _query_virustotal(ioc_type: str, ioc_value: str) -> dict:
+    if ioc_type == "ip":
+        return virustotal.get_ip_report(ioc_value)
+    elif ioc_type == "domain":
+        return virustotal.get_domain_report(ioc_value)
+    elif ioc_type == "hash":
+        return virustotal.get_file_hash_report(ioc_value)
+    elif ioc_type == "url":
+        return virustotal.get_url_report(ioc_value)
+    return {"error": f"Unsupported IOC type: {ioc_type}"}
+
+
+register(Provider(
+    name="abuseipdb",
+    fetch=_query_abuseipdb,
+    ioc_types=("ip",),
+    cost=1.0,
+    latency_budget=float(os.getenv("ABUSEIPDB_LATENCY_BUDGET", 5)),
+    concurrency=int(os.getenv("ABUSEIPDB_CONCURRENCY", 8)),
+    # Country/usage data still feeds the ML features for known IPs
+    skip_on_local_verdict=False
+))
+
+register(Provider(
+    name="virustotal",
+    fetch=_query_virustotal,
+    ioc_types=("ip", "domain", "hash", "url"),
+    cost=5.0,
+    latency_budget=float(os.getenv("VT_LATENCY_BUDGET", 10)),
+    concurrency=int(os.getenv("VT_CONCURRENCY", 4))
+))
@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MAX_RETRIES = int(os.getenv("PROVIDER_MAX_RETRIES", 3))
+BACKOFF_BASE = float(os.getenv("PROVIDER_BACKOFF_BASE", 1.0))
+BACKOFF_MAX = float(os.getenv("PROVIDER_BACKOFF_MAX", 30.0))
+
+# Retry-After values above this are treated as "quota exhausted" and not waited for
+MAX_RETRY_WAIT = float(os.getenv("PROVIDER_MAX_RETRY_WAIT", 90.0))
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Background work (the enrichment refresher) may only use tokens while each bucket
+# keeps more than this share of its capacity for foreground lookups, and never waits
+BACKGROUND_RESERVED_SHARE = float(os.getenv("ENRICHMENT_REFRESH_RESERVED_SHARE", 0.5))
+
+
+class QuotaExhausted(Exception):
+    """
+    Raised instead of calling a provider whose quota is known to be exhausted.
+    """
+
+
+class TokenUnavailable(QuotaExhausted):
+    """
+    Raised when no token would be granted before the caller's deadline.
+    """
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. A caller reserves a token (the balance may go negative,
+    queueing later callers behind it) and then waits until it is due.
+    """
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, max_wait=None, keep: float = 0.0) -> float:
+        """
+        Takes a token and returns how long to wait before using it. Raises
+        TokenUnavailable (taking nothing) if that is longer than max_wait, or if
+        fewer than `keep` tokens would be left.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if keep and self.tokens - 1 < keep:
+                raise TokenUnavailable(f"{self.tokens:.1f} tokens left, {keep:g} kept for foreground lookups")
+            if self.tokens >= 1:
+                wait = max(0.0, self.paused_until - now)
+            elif self.rate:
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            else:
+                raise TokenUnavailable("no tokens left and none are refilled")
+            if max_wait is not None and wait > max_wait:
+                raise TokenUnavailable(f"next token in {wait:.1f}s")
+            self.tokens -= 1
+            return wait
+
+    def spare(self, keep: float) -> bool:
+        """
+        Whether a token can be taken at once while leaving `keep` tokens.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            return self.tokens - 1 >= keep and self.paused_until <= now
+
+    def refund(self):
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+    def pause(self, seconds: float):
+        """
+        Stops handing out tokens for a while, e.g. after the provider answered 429.
+        """
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def _per_minute(env_name, default):
+    return float(os.getenv(env_name, default)) / 60.0
+
+
+# VirusTotal public API: 4 requests/minute, 500/day
+# AbuseIPDB free plan: 1000 checks/day
+LIMITERS = {
+    "virustotal": [
+        TokenBucket(_per_minute("VT_RATE_LIMIT_PER_MINUTE", 4), float(os.getenv("VT_RATE_LIMIT_BURST", 4))),
+        TokenBucket(float(os.getenv("VT_DAILY_QUOTA", 500)) / 86400, float(os.getenv("VT_DAILY_QUOTA", 500)))
+    ],
+    "abuseipdb": [
+        TokenBucket(_per_minute("ABUSEIPDB_RATE_LIMIT_PER_MINUTE", 60),
+                    float(os.getenv("ABUSEIPDB_RATE_LIMIT_BURST", 10))),
+        TokenBucket(float(os.getenv("ABUSEIPDB_DAILY_QUOTA", 1000)) / 86400,
+                    float(os.getenv("ABUSEIPDB_DAILY_QUOTA", 1000)))
+    ]
+}
+
+stats = {provider: {"requests": 0, "throttled_seconds": 0.0, "retries": 0, "rate_limited": 0, "waiting": 0,
+                    "deadline_exceeded": 0, "background_deferred": 0}
+         for provider in LIMITERS}
+
+# Per-thread deadline (time.monotonic()) set by callers with a latency budget
+_local = threading.local()
+
+# Providers that answered with a Retry-After too long to wait for
+_exhausted_until = {}
+
+
+@contextmanager
+def token_deadline(deadline_at):
+    """
+    Within the block, acquire() raises TokenUnavailable instead of waiting for a
+    token past deadline_at (time.monotonic()); None waits as long as needed.
+    """
+    previous = getattr(_local, "deadline_at", None)
+    _local.deadline_at = deadline_at
+    try:
+        yield
+    finally:
+        _local.deadline_at = previous
+
+
+@contextmanager
+def background_priority():
+    """
+    Within the block, acquire() only takes a token that is free right now and leaves
+    BACKGROUND_RESERVED_SHARE of every bucket to foreground lookups; otherwise it
+    raises TokenUnavailable.
+    """
+    previous = getattr(_local, "background", False)
+    _local.background = True
+    try:
+        yield
+    finally:
+        _local.background = previous
+
+
+def _reserved(bucket) -> float:
+    return bucket.capacity * BACKGROUND_RESERVED_SHARE
+
+
+def has_spare_tokens(provider: str) -> bool:
+    """
+    Whether background work could take a token of this provider now.
+    """
+    return all(bucket.spare(_reserved(bucket)) for bucket in LIMITERS.get(provider, []))
+
+
+def acquire(provider: str):
+    deadline_at = getattr(_local, "deadline_at", None)
+    max_wait = None if deadline_at is None else max(0.0, deadline_at - time.monotonic())
+    background = getattr(_local, "background", False)
+    if background:
+        max_wait = 0.0
+
+    # Reserve a token in every bucket first, so a caller that cannot make its
+    # deadline gives its reservations back instead of blocking
+    reserved = []
+    waited = 0.0
+    try:
+        for bucket in LIMITERS.get(provider, []):
+            waited = max(waited, bucket.reserve(max_wait, _reserved(bucket) if background else 0.0))
+            reserved.append(bucket)
+    except TokenUnavailable as e:
+        for bucket in reserved:
+            bucket.refund()
+        if provider in stats:
+            stats[provider]["background_deferred" if background else "deadline_exceeded"] += 1
+        raise TokenUnavailable(f"{provider} rate limit: {e}")
+
+    if waited:
+        if provider in stats:
+            stats[provider]["waiting"] += 1
+        try:
+            time.sleep(waited)
+        finally:
+            if provider in stats:
+                stats[provider]["waiting"] -= 1
+    if provider in stats:
+        stats[provider]["requests"] += 1
+        stats[provider]["throttled_seconds"] += waited
+
+
+def pause(provider: str, seconds: float):
+    for bucket in LIMITERS.get(provider, []):
+        bucket.pause(seconds)
+
+
+def parse_retry_after(value):
+    """
+    Retry-After is either a number of seconds or an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def backoff_delay(attempt: int) -> float:
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def request_with_retry(provider: str, send):
+    """
+    Calls send() (which performs one HTTP request and returns the response) under the
+    provider's rate limit. 429 and 5xx responses and network errors are retried with
+    backoff, honouring Retry-After. The last response is returned, or the last
+    exception re-raised, once retries are exhausted.
+    """
+    remaining = _exhausted_until.get(provider, 0) - time.time()
+    if remaining > 0:
+        raise QuotaExhausted(f"{provider} quota exhausted, retry in {remaining:.0f}s")
+
+    for attempt in range(MAX_RETRIES + 1):
+        acquire(provider)
+        try:
+            response = send()
+        except Exception as e:
+            if attempt == MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt)
+            logging.warning(f"[RateLimit] {provider} request failed ({e}), retrying in {delay:.1f}s")
+            stats[provider]["retries"] += 1
+            time.sleep(delay)
+            continue
+
+        if response.status_code not in RETRY_STATUS_CODES or attempt == MAX_RETRIES:
+            if response.status_code == 429:
+                stats[provider]["rate_limited"] += 1
+            return response
+
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None and retry_after > MAX_RETRY_WAIT:
+            logging.warning(f"[RateLimit] {provider} quota exhausted, Retry-After {retry_after:.0f}s. Giving up.")
+            _exhausted_until[provider] = time.time() + retry_after
+            stats[provider]["rate_limited"] += 1
+            return response
+
+        delay = retry_after if retry_after is not None else backoff_delay(attempt)
+        if response.status_code == 429:
+            # Hold back every caller of this provider, not only this one
+            pause(provider, delay)
+        logging.warning(f"[RateLimit] {provider} returned {response.status_code}, retrying in {delay:.1f}s")
+        stats[provider]["retries"] += 1
+        time.sleep(delay)
+
+    return response
+
+
+def get_stats() -> dict:
+    now = time.time()
+    return {provider: {**values,
+                       "throttled_seconds": round(values["throttled_seconds"], 1),
+                       "exhausted_for_seconds": max(0, round(_exhausted_until.get(provider, 0) - now))}
+            for provider, values in stats.items()}
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import queue
+import logging
+import threading
+from dotenv import load_dotenv
+from core.services.enrichment import cache, ratelimit
+
+load_dotenv()
+
+REFRESH_ENABLED = os.getenv("ENRICHMENT_REFRESH_ENABLED", "true").lower() == "true"
+REFRESH_WORKERS = int(os.getenv("ENRICHMENT_REFRESH_WORKERS", 1))
+REFRESH_QUEUE_MAX = int(os.getenv("ENRICHMENT_REFRESH_QUEUE_MAX", 1000))
+
+# Proactive refresh: every REFRESH_INTERVAL seconds, re-enrich the REFRESH_TOP_N most
+# frequently hit entries that expire within REFRESH_AHEAD seconds
+REFRESH_INTERVAL = float(os.getenv("ENRICHMENT_REFRESH_INTERVAL", 300))
+REFRESH_AHEAD = float(os.getenv("ENRICHMENT_REFRESH_AHEAD", 1800))
+REFRESH_TOP_N = int(os.getenv("ENRICHMENT_REFRESH_TOP_N", 50))
+# Each worker process runs a refresher; an entry is re-fetched by whichever claims it
+# first in the cache, and the claim holds for this many seconds
+REFRESH_CLAIM_TTL = float(os.getenv("ENRICHMENT_REFRESH_CLAIM_TTL", 300))
+
+_queue = queue.Queue(maxsize=REFRESH_QUEUE_MAX)
+_pending = set()
+_lock = threading.Lock()
+_started = False
+_stop = threading.Event()
+
+stats = {"scheduled": 0, "refreshed": 0, "failed": 0, "dropped": 0, "claimed_elsewhere": 0, "deferred": 0,
+         "proactive_runs": 0}
+
+
+def schedule(provider: str, ioc_type: str, ioc_value: str) -> bool:
+    """
+    Queues a background refresh of one provider entry. Duplicate requests for an
+    entry that is already queued are ignored.
+    """
+    if not REFRESH_ENABLED:
+        return False
+
+    key = (provider, ioc_type, ioc_value)
+    with _lock:
+        if key in _pending:
+            return False
+        try:
+            _queue.put_nowait(key)
+        except queue.Full:
+            stats["dropped"] += 1
+            return False
+        _pending.add(key)
+        stats["scheduled"] += 1
+
+    start()
+    return True
+
+
+def _refresh_worker():
+    # Imported here to avoid a circular import (fusion schedules refreshes)
+    from core.services.enrichment.fusion import _fetch_and_store
+
+    while not _stop.is_set():
+        try:
+            key = _queue.get(timeout=1)
+        except queue.Empty:
+            continue
+        try:
+            # Background priority: only tokens beyond the share kept for foreground lookups are
+            # used; a skipped entry is scheduled again by its next stale hit or proactive run
+            if not ratelimit.has_spare_tokens(key[0]):
+                stats["deferred"] += 1
+                continue
+            if not cache.claim_refresh(*key, REFRESH_CLAIM_TTL):
+                stats["claimed_elsewhere"] += 1
+                continue
+            with ratelimit.background_priority():
+                data = _fetch_and_store(*key)
+            if isinstance(data, dict) and data.get("rate_limited"):
+                stats["deferred"] += 1
+            else:
+                stats["refreshed"] += 1
+        except Exception as e:
+            stats["failed"] += 1
+            logging.warning(f"[Refresher] Failed to refresh {key[0]} entry for {key[1]}::{key[2]}: {e}")
+        finally:
+            with _lock:
+                _pending.discard(key)
+            _queue.task_done()
+
+
+def _proactive_loop():
+    while not _stop.wait(REFRESH_INTERVAL):
+        hot = cache.hot_entries(REFRESH_AHEAD, REFRESH_TOP_N)
+        scheduled = sum(1 for entry in hot if schedule(*entry))
+        stats["proactive_runs"] += 1
+        if scheduled:
+            logging.info(f"[Refresher] Scheduled proactive refresh of {scheduled} hot entries")
+
+
+def start():
+    global _started
+    if _started or not REFRESH_ENABLED:
+        return
+    with _lock:
+        if _started:
+            return
+        _started = True
+
+    for i in range(REFRESH_WORKERS):
+        threading.Thread(target=_refresh_worker, name=f"enrich-refresh-{i}", daemon=True).start()
+    threading.Thread(target=_proactive_loop, name="enrich-refresh-proactive", daemon=True).start()
+    logging.info("[Refresher] Background enrichment refresher started")
+
+
+def stop():
+    _stop.set()
+
+
+def get_stats() -> dict:
+    return {"enabled": REFRESH_ENABLED, "queued": _queue.qsize(), **stats}
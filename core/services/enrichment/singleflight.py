@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import weakref
+
+_registry = {}
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls (from any thread) with the same key:
+    only the first caller runs fn, the others wait and receive its result.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.stats = {"calls": 0, "coalesced": 0}
+        _registry[name] = self
+
+    def do(self, key, fn, *args):
+        with self.lock:
+            self.stats["calls"] += 1
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        return len(self.calls)
+
+
+class AsyncSingleFlight:
+    """
+    asyncio flavour of SingleFlight: concurrent awaits with the same key share one task.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        # Tasks belong to a loop, so keep one table per running loop
+        self.tasks = weakref.WeakKeyDictionary()
+        self.stats = {"calls": 0, "coalesced": 0}
+        _registry[name] = self
+
+    async def do(self, key, coro_fn, *args):
+        loop = asyncio.get_running_loop()
+        tasks = self.tasks.setdefault(loop, {})
+        self.stats["calls"] += 1
+
+        task = tasks.get(key)
+        if task is None:
+            task = tasks[key] = loop.create_task(coro_fn(*args))
+            task.add_done_callback(lambda _: tasks.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+
+        # A cancelled caller must not cancel the shared work for the others
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return sum(len(tasks) for tasks in list(self.tasks.values()))
+
+
+def get_stats() -> dict:
+    return {name: {**flight.stats, "in_flight": flight.in_flight()} for name, flight in _registry.items()}
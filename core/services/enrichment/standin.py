@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# SOAR Lite – Provider stand-in server
+#
+# Local replacement for the VirusTotal v3 and AbuseIPDB v2 endpoints used by the
+# enrichment clients, for benchmarks and load tests without spending real quota:
+#
+#   uvicorn core.services.enrichment.standin:app --port 8099
+#
+#   VT_BASE_URL=http://localhost:8099/api/v3
+#   ABUSEIPDB_BASE_URL=http://localhost:8099/api/v2
+#   DEBUG_MODE=false  (API keys may be any non-empty value in replay mode)
+#
+# STANDIN_MODE=replay  serves fixtures from STANDIN_FIXTURES_DIR; requests without a
+#                      fixture get a deterministic synthetic answer (or a 404 when
+#                      STANDIN_MISSING=404)
+# STANDIN_MODE=record  forwards to the real APIs with the caller's key and saves
+#                      every response as a fixture
+#
+# Fault profiles (global STANDIN_<NAME> or per provider STANDIN_VT_<NAME> / STANDIN_ABUSEIPDB_<NAME>):
+#   LATENCY_MS, LATENCY_JITTER_MS, ERROR_RATE (0-1, answers 503), RATE_LIMIT_RATE (0-1, answers 429),
+#   RETRY_AFTER (seconds sent with 429). They can be changed at runtime with POST /_standin/profile.
+
+import os
+import json
+import random
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from dotenv import load_dotenv
+from core.services import http_client
+
+load_dotenv()
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+MODE = os.getenv("STANDIN_MODE", "replay").lower()
+MISSING = os.getenv("STANDIN_MISSING", "synthesize").lower()
+FIXTURES_DIR = os.getenv("STANDIN_FIXTURES_DIR", os.path.join(BASE_DIR, "data", "standin_fixtures"))
+
+UPSTREAMS = {
+    "virustotal": os.getenv("STANDIN_VT_UPSTREAM", "https://www.virustotal.com/api/v3"),
+    "abuseipdb": os.getenv("STANDIN_ABUSEIPDB_UPSTREAM", "https://api.abuseipdb.com/api/v2")
+}
+
+_ENV_PREFIX = {"virustotal": "STANDIN_VT_", "abuseipdb": "STANDIN_ABUSEIPDB_"}
+_PROFILE_DEFAULTS = {"latency_ms": 0.0, "latency_jitter_ms": 0.0, "error_rate": 0.0,
+                     "rate_limit_rate": 0.0, "retry_after": 1.0}
+
+
+def _load_profile(provider: str) -> dict:
+    profile = {}
+    for name, default in _PROFILE_DEFAULTS.items():
+        value = os.getenv(f"{_ENV_PREFIX[provider]}{name.upper()}", os.getenv(f"STANDIN_{name.upper()}", default))
+        profile[name] = float(value)
+    return profile
+
+
+profiles = {provider: _load_profile(provider) for provider in UPSTREAMS}
+stats = {provider: {"requests": 0, "fixtures": 0, "synthesized": 0, "recorded": 0, "errors": 0, "rate_limited": 0}
+         for provider in UPSTREAMS}
+
+app = FastAPI(title="SOAR Lite provider stand-in")
+
+
+def _fixture_path(provider: str, request_key: str) -> str:
+    digest = hashlib.sha1(request_key.encode()).hexdigest()
+    return os.path.join(FIXTURES_DIR, provider, f"{digest}.json")
+
+
+def _load_fixture(provider: str, request_key: str):
+    path = _fixture_path(provider, request_key)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _save_fixture(provider: str, request_key: str, status: int, body):
+    path = _fixture_path(provider, request_key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"request": request_key, "status": status, "body": body}, f, indent=2)
+
+
+def _seed(value: str) -> random.Random:
+    # Same IOC, same synthetic answer
+    return random.Random(int(hashlib.sha1(value.encode()).hexdigest()[:16], 16))
+
+
+def _synthesize_vt(kind: str, ioc_id: str) -> dict:
+    rng = _seed(ioc_id)
+    malicious = rng.choice([0, 0, 0, 1, 2, 5, 12, 30])
+    suspicious = rng.randint(0, 3) if malicious else 0
+    return {
+        "data": {
+            "id": ioc_id,
+            "type": kind,
+            "attributes": {
+                "last_analysis_stats": {
+                    "malicious": malicious,
+                    "suspicious": suspicious,
+                    "undetected": rng.randint(5, 20),
+                    "harmless": max(0, 70 - malicious - suspicious)
+                },
+                "reputation": -malicious * 3
+            }
+        }
+    }
+
+
+def _synthesize_abuseipdb(ip: str) -> dict:
+    rng = _seed(ip)
+    score = rng.choice([0, 0, 5, 25, 50, 75, 100])
+    last_reported = datetime.now(timezone.utc) - timedelta(days=rng.randint(0, 30))
+    return {
+        "data": {
+            "ipAddress": ip,
+            "abuseConfidenceScore": score,
+            "countryCode": rng.choice(["US", "RU", "CN", "BR", "DE", "NL", "IN", "KP"]),
+            "usageType": rng.choice(["Data Center/Web Hosting/Transit", "Fixed Line ISP",
+                                     "Content Delivery Network", "Commercial"]),
+            "totalReports": rng.randint(0, 200) if score else 0,
+            "lastReportedAt": last_reported.isoformat() if score else None,
+            "asn": rng.randint(1000, 65000)
+        }
+    }
+
+
+async def _apply_profile(provider: str):
+    """
+    Sleeps for the configured latency and returns an injected error response, if any.
+    """
+    profile = profiles[provider]
+    delay = profile["latency_ms"] + random.uniform(-1, 1) * profile["latency_jitter_ms"]
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+
+    roll = random.random()
+    if roll < profile["rate_limit_rate"]:
+        stats[provider]["rate_limited"] += 1
+        return JSONResponse({"error": {"code": "QuotaExceededError", "message": "Quota exceeded"}},
+                            status_code=429, headers={"Retry-After": str(int(profile["retry_after"]))})
+    if roll < profile["rate_limit_rate"] + profile["error_rate"]:
+        stats[provider]["errors"] += 1
+        return JSONResponse({"error": {"code": "TransientError", "message": "Injected failure"}}, status_code=503)
+    return None
+
+
+async def _serve(provider: str, request: Request, upstream_path: str, synthesize):
+    stats[provider]["requests"] += 1
+
+    injected = await _apply_profile(provider)
+    if injected is not None:
+        return injected
+
+    request_key = upstream_path if not request.url.query else f"{upstream_path}?{request.url.query}"
+
+    if MODE == "record":
+        headers = {k: v for k, v in request.headers.items() if k.lower() in ("x-apikey", "key", "accept")}
+        response = await asyncio.to_thread(
+            http_client.get, UPSTREAMS[provider] + upstream_path, params=dict(request.query_params), headers=headers
+        )
+        try:
+            body = response.json()
+        except ValueError:
+            body = {"error": response.text}
+        if response.status_code != 429:
+            _save_fixture(provider, request_key, response.status_code, body)
+            stats[provider]["recorded"] += 1
+        return JSONResponse(body, status_code=response.status_code)
+
+    fixture = _load_fixture(provider, request_key)
+    if fixture is not None:
+        stats[provider]["fixtures"] += 1
+        return JSONResponse(fixture["body"], status_code=fixture["status"])
+
+    if MISSING == "404":
+        return JSONResponse({"error": {"code": "NotFoundError", "message": "No fixture recorded"}}, status_code=404)
+
+    stats[provider]["synthesized"] += 1
+    return JSONResponse(synthesize())
+
+
+@app.get("/api/v3/ip_addresses/{ip}")
+async def vt_ip(ip: str, request: Request):
+    return await _serve("virustotal", request, f"/ip_addresses/{ip}", lambda: _synthesize_vt("ip_address", ip))
+
+
+@app.get("/api/v3/domains/{domain}")
+async def vt_domain(domain: str, request: Request):
+    return await _serve("virustotal", request, f"/domains/{domain}", lambda: _synthesize_vt("domain", domain))
+
+
+@app.get("/api/v3/files/{file_hash}")
+async def vt_file(file_hash: str, request: Request):
+    return await _serve("virustotal", request, f"/files/{file_hash}", lambda: _synthesize_vt("file", file_hash))
+
+
+@app.get("/api/v3/urls/{url_id}")
+async def vt_url(url_id: str, request: Request):
+    return await _serve("virustotal", request, f"/urls/{url_id}", lambda: _synthesize_vt("url", url_id))
+
+
+@app.get("/api/v2/check")
+async def abuseipdb_check(request: Request, ipAddress: str = "", maxAgeInDays: str = "90"):
+    return await _serve("abuseipdb", request, "/check", lambda: _synthesize_abuseipdb(ipAddress))
+
+
+@app.get("/_standin/stats")
+def standin_stats():
+    return {"mode": MODE, "fixtures_dir": FIXTURES_DIR, "profiles": profiles, "stats": stats}
+
+
+@app.post("/_standin/profile")
+async def update_profile(request: Request):
+    """
+    Body: {"virustotal": {"latency_ms": 300, "rate_limit_rate": 0.1}, "abuseipdb": {...}}
+    """
+    changes = await request.json()
+    for provider, values in changes.items():
+        if provider not in profiles:
+            return JSONResponse({"error": f"Unknown provider: {provider}"}, status_code=400)
+        for name, value in values.items():
+            if name not in _PROFILE_DEFAULTS:
+                return JSONResponse({"error": f"Unknown profile setting: {name}"}, status_code=400)
+            profiles[provider][name] = float(value)
+    logging.info(f"[Standin] Profiles updated: {profiles}")
+    return profiles
@@ -17,51 +17,58 @@
 
 from dotenv import load_dotenv
 import os
-import requests
+import base64
+import logging
+from core.services import http_client
+from core.services.enrichment.ratelimit import request_with_retry, QuotaExhausted
 
 load_dotenv()
 
 VT_API_KEY = os.getenv("VT_API_KEY")
-VT_BASE_URL = "https://www.virustotal.com/api/v3"
+VT_BASE_URL = os.getenv("VT_BASE_URL", "https://www.virustotal.com/api/v3").rstrip("/")
 
 HEADERS = {
     "x-apikey": VT_API_KEY
 }
 
 
-def get_ip_report(ip):
-    url = f"{VT_BASE_URL}/ip_addresses/{ip}"
-    response = requests.get(url, headers=HEADERS)
+def _get(url):
+    if not VT_API_KEY:
+        logging.warning("[VirusTotal] VT_API_KEY not set. Skipping lookup.")
+        return {"error": "VirusTotal API key not configured"}
+
+    try:
+        response = request_with_retry(
+            "virustotal",
+            lambda: http_client.get(url, headers=HEADERS)
+        )
+    except QuotaExhausted as e:
+        logging.warning(f"[VirusTotal] {e}")
+        return {"error": "Error 429 from VirusTotal", "rate_limited": True}
+
     if response.status_code == 200:
         return response.json()
-    else:
-        return {"error": f"Error {response.status_code} from VirusTotal"}
+
+    error = {"error": f"Error {response.status_code} from VirusTotal"}
+    if response.status_code == 429:
+        # Flag it so a quota problem is not mistaken for a clean IOC
+        error["rate_limited"] = True
+        logging.warning(f"[VirusTotal] Rate limited while querying {url}")
+    return error
+
+
+def get_ip_report(ip):
+    return _get(f"{VT_BASE_URL}/ip_addresses/{ip}")
 
 
 def get_domain_report(domain):
-    url = f"{VT_BASE_URL}/domains/{domain}"
-    response = requests.get(url, headers=HEADERS)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        return {"error": f"Error {response.status_code} from VirusTotal"}
+    return _get(f"{VT_BASE_URL}/domains/{domain}")
 
 
 def get_file_hash_report(file_hash):
-    url = f"{VT_BASE_URL}/files/{file_hash}"
-    response = requests.get(url, headers=HEADERS)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        return {"error": f"Error {response.status_code} from VirusTotal"}
+    return _get(f"{VT_BASE_URL}/files/{file_hash}")
 
 
 def get_url_report(url_to_check):
-    import base64
     url_id = base64.urlsafe_b64encode(url_to_check.encode()).decode().strip("=")
-    url = f"{VT_BASE_URL}/urls/{url_id}"
-    response = requests.get(url, headers=HEADERS)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        return {"error": f"Error {response.status_code} from VirusTotal"}
+    return _get(f"{VT_BASE_URL}/urls/{url_id}")
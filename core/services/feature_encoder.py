@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# SOAR Lite – Compiled feature encoders
+#
+# The LabelEncoders saved with a model are turned into plain dict lookups when the
+# model loads. Values the model was not trained on go to an explicit unknown bucket
+# (UNKNOWN_CODE, the value the classifier has always used) and are counted per
+# feature instead of raising and logging on every alert. Counts are kept per model
+# version, so a newly trained model starts from zero.
+
+import threading
+import numpy as np
+
+UNKNOWN_CODE = -1
+# Distinct unknown values remembered per feature for /model/encoder-stats
+MAX_TRACKED_UNKNOWN = 100
+# Model versions whose counts are kept (the oldest is dropped first)
+MAX_TRACKED_VERSIONS = 5
+
+_lock = threading.Lock()
+# {version: {feature: counts}}
+stats = {}
+
+
+class CompiledEncoder:
+    """
+    Dict-backed LabelEncoder.transform for one feature, with an unknown bucket.
+    classes is the encoder's classes_ (sorted, as LabelEncoder stores them);
+    version is the model version whose counts it updates.
+    """
+
+    def __init__(self, feature: str, classes, version: str = None):
+        self.feature = feature
+        self.version = version
+        self.codes = {str(value): code for code, value in enumerate(classes)}
+        with _lock:
+            if version not in stats:
+                stats[version] = {}
+                while len(stats) > MAX_TRACKED_VERSIONS:
+                    del stats[next(iter(stats))]
+            self._stats = stats[version].setdefault(feature, {"encoded": 0, "unknown": 0, "unknown_values": {}})
+
+    def encode(self, values) -> np.ndarray:
+        """
+        Encodes a column of values; unknown values become UNKNOWN_CODE.
+        """
+        get = self.codes.get
+        codes = np.fromiter((get(str(value), UNKNOWN_CODE) for value in values), dtype=np.int64)
+        unknown = codes == UNKNOWN_CODE
+        self._count(values, codes, unknown)
+        return codes
+
+    def _count(self, values, codes, unknown):
+        unknown_count = int(unknown.sum())
+        with _lock:
+            feature_stats = self._stats
+            feature_stats["encoded"] += len(codes)
+            if not unknown_count:
+                return
+            feature_stats["unknown"] += unknown_count
+            tracked = feature_stats["unknown_values"]
+            for value in np.asarray(values, dtype=object)[unknown]:
+                value = str(value)
+                if value in tracked or len(tracked) < MAX_TRACKED_UNKNOWN:
+                    tracked[value] = tracked.get(value, 0) + 1
+
+
+def get_stats(version: str = None) -> dict:
+    """
+    Per-feature counts for one model version.
+    """
+    with _lock:
+        return {
+            feature: {
+                "encoded": values["encoded"],
+                "unknown": values["unknown"],
+                "unknown_ratio": round(values["unknown"] / values["encoded"], 4) if values["encoded"] else 0.0,
+                "top_unknown_values": dict(sorted(values["unknown_values"].items(),
+                                                  key=lambda item: item[1], reverse=True)[:20])
+            }
+            for feature, values in stats.get(version, {}).items()
+        }
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import logging
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# HTTP/2 needs the optional httpx[http2] package, otherwise requests (HTTP/1.1 keep-alive) is used
+HTTP2_ENABLED = os.getenv("HTTP_CLIENT_HTTP2", "false").lower() == "true"
+
+DEFAULT_SETTINGS = {
+    "pool_maxsize": int(os.getenv("HTTP_POOL_MAXSIZE", 10)),
+    "connect_timeout": float(os.getenv("HTTP_CONNECT_TIMEOUT", 3.05)),
+    "read_timeout": float(os.getenv("HTTP_READ_TIMEOUT", 10))
+}
+
+# Per-host pool sizes and timeouts. Pools should be at least as large as the
+# number of concurrent callers, otherwise extra connections are discarded.
+HOST_SETTINGS = {
+    "www.virustotal.com": {
+        "pool_maxsize": int(os.getenv("VT_CONCURRENCY", 4)),
+        "read_timeout": float(os.getenv("VT_TIMEOUT", 10))
+    },
+    "api.abuseipdb.com": {
+        "pool_maxsize": int(os.getenv("ABUSEIPDB_CONCURRENCY", 8)),
+        "read_timeout": float(os.getenv("ABUSEIPDB_TIMEOUT", 5))
+    },
+    "hooks.slack.com": {
+        "pool_maxsize": 2,
+        "read_timeout": float(os.getenv("WEBHOOK_TIMEOUT", 5))
+    }
+}
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_settings(host: str) -> dict:
+    return {**DEFAULT_SETTINGS, **HOST_SETTINGS.get(host, {})}
+
+
+class _Http2Client:
+    """
+    Thin wrapper giving an httpx HTTP/2 client the subset of the requests API we use.
+    """
+
+    def __init__(self, settings):
+        import httpx
+        self.httpx = httpx
+        self.client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=settings["pool_maxsize"],
+                                max_keepalive_connections=settings["pool_maxsize"]),
+            timeout=httpx.Timeout(settings["read_timeout"], connect=settings["connect_timeout"])
+        )
+
+    def _timeout(self, timeout):
+        if isinstance(timeout, tuple):
+            return self.httpx.Timeout(timeout[1], connect=timeout[0])
+        return timeout
+
+    def get(self, url, timeout=None, **kwargs):
+        return self.client.get(url, timeout=self._timeout(timeout), **kwargs)
+
+    def post(self, url, timeout=None, **kwargs):
+        return self.client.post(url, timeout=self._timeout(timeout), **kwargs)
+
+    def close(self):
+        self.client.close()
+
+
+def _create_client(host: str, settings: dict):
+    if HTTP2_ENABLED:
+        try:
+            import h2  # noqa: F401
+            logging.info(f"[HTTP] Using HTTP/2 client for {host}")
+            return _Http2Client(settings)
+        except ImportError:
+            logging.warning("[HTTP] HTTP_CLIENT_HTTP2 is set but httpx[http2] is not installed. Using HTTP/1.1.")
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings["pool_maxsize"])
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_client(host: str):
+    """
+    Returns the pooled keep-alive client for a host, creating it on first use.
+    """
+    client = _clients.get(host)
+    if client is None:
+        with _lock:
+            client = _clients.get(host)
+            if client is None:
+                client = _create_client(host, get_settings(host))
+                _clients[host] = client
+    return client
+
+
+def _request(method: str, url: str, **kwargs):
+    host = urlsplit(url).hostname or ""
+    if "timeout" not in kwargs:
+        settings = get_settings(host)
+        kwargs["timeout"] = (settings["connect_timeout"], settings["read_timeout"])
+    return getattr(get_client(host), method)(url, **kwargs)
+
+
+def get(url: str, **kwargs):
+    return _request("get", url, **kwargs)
+
+
+def post(url: str, **kwargs):
+    return _request("post", url, **kwargs)
+
+
+def close_all():
+    with _lock:
+        for client in _clients.values():
+            try:
+                client.close()
+            except Exception as e:
+                logging.warning(f"[HTTP] Error closing client: {e}")
+        _clients.clear()
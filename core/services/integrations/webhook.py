@@ -17,6 +17,7 @@
 
 import os
 import json
+import time
 import logging
 from dotenv import load_dotenv
 
@@ -24,15 +25,38 @@ load_dotenv()
 
 CONFIG_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "data", "webhook_config.json"))
 
+# The config is re-read only when its mtime/size changes, checked at most once per interval
+CONFIG_CHECK_INTERVAL = float(os.getenv("WEBHOOK_CONFIG_CHECK_INTERVAL", 1.0))
 
-def should_trigger_webhook(alert: dict, destination: str = "slack") -> bool:
-    if not os.path.exists(CONFIG_PATH):
-        logging.warning("[Webhook] No webhook_config.json found. Skipping webhook trigger.")
-        return False
+_config = {"signature": None, "checked_at": 0.0, "value": None}
+
+
+def _load_config():
+    now = time.monotonic()
+    if now - _config["checked_at"] < CONFIG_CHECK_INTERVAL:
+        return _config["value"]
+    _config["checked_at"] = now
 
     try:
+        stat = os.stat(CONFIG_PATH)
+    except FileNotFoundError:
+        _config.update(signature=None, value=None)
+        return None
+
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if signature != _config["signature"]:
         with open(CONFIG_PATH, "r") as f:
-            config = json.load(f)
+            _config["value"] = json.load(f)
+        _config["signature"] = signature
+    return _config["value"]
+
+
+def should_trigger_webhook(alert: dict, destination: str = "slack") -> bool:
+    try:
+        config = _load_config()
+        if config is None:
+            logging.warning("[Webhook] No webhook_config.json found. Skipping webhook trigger.")
+            return False
 
         rules_list = config.get(destination)
         if not rules_list:
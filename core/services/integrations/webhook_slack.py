@@ -17,7 +17,7 @@
 
 import os
 import logging
-import requests
+from core.services import http_client
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -68,7 +68,7 @@ def send_webhook_to_slack(alert: dict):
     }
 
     try:
-        response = requests.post(SLACK_WEBHOOK_URL, json=payload, timeout=5)
+        response = http_client.post(SLACK_WEBHOOK_URL, json=payload)
         if response.status_code == 200:
             logging.info(f"[Slack] Alert sent: {ioc} [{priority}]")
         else:
@@ -0,0 +1,460 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# SOAR Lite – Background alert processing jobs
+#
+# Every job lives in its own directory so it survives restarts:
+#
+#   output/jobs/<job_id>/input.csv       the uploaded alerts
+#   output/jobs/<job_id>/job.json        status and progress
+#   output/jobs/<job_id>/results.ndjson  one processed alert per line, appended as they complete
+#
+# Queued and running jobs are picked up again on startup and resume after the
+# last result written.
+#
+# Several worker processes share output/jobs. A process owns a job while it holds
+# an flock on output/jobs/<job_id>/job.lock (from the upload until the job ends),
+# so a job is run by one process only, and a job is only resumed or failed by
+# another process once its owner is gone. Status requests for jobs owned elsewhere
+# are answered from job.json; cancelling one leaves a "cancel" marker file that
+# its owner picks up.
+
+import os
+import re
+import json
+import time
+import uuid
+import queue
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from dotenv import load_dotenv
+from core.services.alert_pipeline import (CsvRowParser, process_rows, dedup_ratio,
+                                          ResultsWriter, UPLOAD_CHUNK_SIZE)
+from core.services.enrichment import ratelimit
+
+try:
+    import fcntl
+except ImportError:
+    # No inter-process claims on this platform; a single worker process is assumed
+    fcntl = None
+
+load_dotenv()
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+JOBS_DIR = os.getenv("JOBS_DIR", os.path.join(BASE_DIR, "output", "jobs"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+PROGRESS_INTERVAL = float(os.getenv("JOB_PROGRESS_INTERVAL", 1.0))
+# Bulk jobs have no per-IOC deadline unless one is configured (0 disables)
+JOB_ENRICH_DEADLINE = float(os.getenv("JOB_ENRICH_DEADLINE_SECONDS", 0)) or None
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_queue = queue.Queue()
+# Jobs owned by this process, with their cancel events and held job.lock files
+_jobs = {}
+_cancel = {}
+_claims = {}
+_lock = threading.Lock()
+_started = False
+_stop = threading.Event()
+
+
+def _path(job_id: str, name: str) -> str:
+    return os.path.join(JOBS_DIR, job_id, name)
+
+
+def _save(job: dict):
+    path = _path(job["id"], "job.json")
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(job, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def _load(job_id: str):
+    if not re.fullmatch(r"[0-9a-f]{32}", job_id or ""):
+        return None
+    try:
+        with open(_path(job_id, "job.json"), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _claim(job_id: str) -> bool:
+    """
+    Takes ownership of a job for this process. Returns False if another process
+    (or another claim in this one) holds it.
+    """
+    lock_file = open(_path(job_id, "job.lock"), "a")
+    if fcntl is not None:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+    with _lock:
+        _claims[job_id] = lock_file
+    return True
+
+
+def _release(job_id: str):
+    with _lock:
+        lock_file = _claims.pop(job_id, None)
+        _jobs.pop(job_id, None)
+        _cancel.pop(job_id, None)
+    if lock_file is not None:
+        # Closing the file drops the flock
+        lock_file.close()
+
+
+def _cancel_requested(job_id: str) -> bool:
+    return os.path.exists(_path(job_id, "cancel"))
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _estimate_rows(path: str) -> int:
+    lines = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            lines += chunk.count(b"\n")
+            last = chunk
+    if lines and not last.endswith(b"\n"):
+        lines += 1
+    return max(0, lines - 1)
+
+
+def _iter_file_rows(path: str, skip: int = 0):
+    """
+    Yields the rows of a CSV file as dicts, skipping the first `skip` rows.
+    """
+    parser = CsvRowParser()
+    seen = 0
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        for text in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), ""):
+            for row in parser.feed(text):
+                seen += 1
+                if seen > skip:
+                    yield row
+    for row in parser.close():
+        seen += 1
+        if seen > skip:
+            yield row
+
+
+def _completed_results(job_id: str) -> int:
+    """
+    Counts the results already written, dropping a trailing partial line left by a crash.
+    """
+    path = _path(job_id, "results.ndjson")
+    if not os.path.exists(path):
+        return 0
+    count = 0
+    valid_size = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            count += 1
+            valid_size += len(line)
+    if valid_size != os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(valid_size)
+    return count
+
+
+def create_job(filename: str) -> dict:
+    """
+    Creates the job directory. The caller writes input.csv and then calls submit().
+    """
+    start()
+    job_id = uuid.uuid4().hex
+    os.makedirs(os.path.join(JOBS_DIR, job_id), exist_ok=True)
+    job = {
+        "id": job_id,
+        "filename": filename,
+        "status": "uploading",
+        "created_at": _now(),
+        "started_at": None,
+        "finished_at": None,
+        "rows_estimate": 0,
+        "rows_done": 0,
+        "unique_iocs": 0,
+        "timed_out": 0,
+        "error": None
+    }
+    _claim(job_id)
+    with _lock:
+        _jobs[job_id] = job
+        _cancel[job_id] = threading.Event()
+    _save(job)
+    return job
+
+
+def input_path(job_id: str) -> str:
+    return _path(job_id, "input.csv")
+
+
+def abort_upload(job_id: str, error: str):
+    """
+    Marks a job whose upload failed and gives it up.
+    """
+    job = _jobs.get(job_id)
+    if job is not None:
+        job.update(status="failed", error=error, finished_at=_now())
+        _save(job)
+    _release(job_id)
+
+
+def submit(job_id: str) -> dict:
+    job = _jobs[job_id]
+    job["rows_estimate"] = _estimate_rows(input_path(job_id))
+    job["status"] = "queued"
+    _save(job)
+    _queue.put(job_id)
+    logging.info(f"[Jobs] Job {job_id} queued ({job['rows_estimate']} rows)")
+    return job
+
+
+def get_job(job_id: str):
+    # Jobs owned by this process are more current in memory than on disk
+    job = _jobs.get(job_id) or _load(job_id)
+    if job is None:
+        return None
+
+    progress = dict(job)
+    rate = job.get("rows_per_second", 0.0)
+    remaining = max(0, job["rows_estimate"] - job["rows_done"])
+    progress["eta_seconds"] = round(remaining / rate) if job["status"] == "running" and rate else None
+    progress["provider_backlog"] = {provider: {"waiting": values["waiting"],
+                                               "exhausted_for_seconds": values["exhausted_for_seconds"]}
+                                    for provider, values in ratelimit.get_stats().items()}
+    return progress
+
+
+def list_jobs() -> list:
+    jobs = {}
+    if os.path.isdir(JOBS_DIR):
+        for entry in os.scandir(JOBS_DIR):
+            job = _load(entry.name)
+            if job is not None:
+                jobs[job["id"]] = job
+    jobs.update((job_id, dict(job)) for job_id, job in list(_jobs.items()))
+    return sorted(jobs.values(), key=lambda job: job["created_at"], reverse=True)
+
+
+def cancel(job_id: str):
+    job = _jobs.get(job_id) or _load(job_id)
+    if job is None:
+        return None
+    if job["status"] not in ACTIVE_STATUSES:
+        return job
+
+    # Picked up by whichever process owns the job
+    open(_path(job_id, "cancel"), "a").close()
+    if job_id in _jobs:
+        _cancel[job_id].set()
+        if job["status"] == "queued":
+            job["status"] = "cancelled"
+            job["finished_at"] = _now()
+            _save(job)
+    elif _claim(job_id):
+        # Nobody owns it (its process is gone): cancel it here
+        job = _load(job_id) or job
+        if job["status"] in ACTIVE_STATUSES:
+            job.update(status="cancelled", finished_at=_now())
+            _save(job)
+        _release(job_id)
+    return job
+
+
+def iter_results(job_id: str, offset: int = 0, limit: int = None):
+    """
+    Yields the NDJSON lines written so far (partial results while the job runs).
+    """
+    path = _path(job_id, "results.ndjson")
+    if not os.path.exists(path):
+        return
+    sent = 0
+    with open(path, "r") as f:
+        for i, line in enumerate(f):
+            if not line.endswith("\n"):
+                break
+            if i < offset:
+                continue
+            if limit is not None and sent >= limit:
+                break
+            sent += 1
+            yield line
+
+
+def _publish(job_id: str):
+    """
+    Adds a finished job to the results store, ML dataset and country statistics,
+    like a synchronous /process-alert upload.
+    """
+    writer = ResultsWriter(batch_id=job_id)
+    try:
+        with open(_path(job_id, "results.ndjson"), "r") as f:
+            for line in f:
+                writer.write(json.loads(line))
+        writer.commit()
+    except Exception:
+        writer.abort()
+        raise
+
+
+async def _run(job: dict):
+    job_id = job["id"]
+    cancel_event = _cancel[job_id]
+
+    done = _completed_results(job_id)
+    job.update(status="running", started_at=job["started_at"] or _now(), rows_done=done, rows_per_second=0.0)
+    _save(job)
+    if done:
+        logging.info(f"[Jobs] Resuming job {job_id} after {done} rows")
+
+    # Counters carried over from an interrupted run
+    base_iocs, base_timed_out = job["unique_iocs"], job["timed_out"]
+    stats = {}
+    rows = _iter_file_rows(input_path(job_id), skip=done)
+    run_started = last_saved = time.monotonic()
+
+    with open(_path(job_id, "results.ndjson"), "a") as out:
+        async for result in process_rows(rows, stats, deadline=JOB_ENRICH_DEADLINE):
+            out.write(json.dumps(result) + "\n")
+            job["rows_done"] += 1
+
+            now = time.monotonic()
+            if now - last_saved >= PROGRESS_INTERVAL:
+                out.flush()
+                job["rows_per_second"] = round((job["rows_done"] - done) / (now - run_started), 2)
+                job["unique_iocs"] = base_iocs + stats["unique_iocs"]
+                job["timed_out"] = base_timed_out + stats["timed_out"]
+                _save(job)
+                last_saved = now
+                if _cancel_requested(job_id):
+                    cancel_event.set()
+
+            if cancel_event.is_set() or _stop.is_set():
+                break
+
+    elapsed = time.monotonic() - run_started
+    job["rows_per_second"] = round((job["rows_done"] - done) / elapsed, 2) if elapsed else 0.0
+    job["unique_iocs"] = base_iocs + stats.get("unique_iocs", 0)
+    job["timed_out"] = base_timed_out + stats.get("timed_out", 0)
+    job["dedup_ratio"] = dedup_ratio({"rows": job["rows_done"], "unique_iocs": job["unique_iocs"]})
+
+    if cancel_event.is_set():
+        job["status"] = "cancelled"
+    elif _stop.is_set():
+        # Shutting down: leave the job queued so it resumes on the next start
+        job["status"] = "queued"
+        _save(job)
+        return
+    else:
+        _publish(job_id)
+        job["status"] = "completed"
+        job["rows_estimate"] = job["rows_done"]
+
+    job["finished_at"] = _now()
+    _save(job)
+    logging.info(f"[Jobs] Job {job_id} {job['status']} after {job['rows_done']} rows")
+
+
+def _worker():
+    while not _stop.is_set():
+        try:
+            job_id = _queue.get(timeout=1)
+        except queue.Empty:
+            continue
+
+        job = _jobs.get(job_id)
+        if job is None:
+            continue
+        try:
+            if job["status"] != "queued":
+                continue
+            if _cancel_requested(job_id):
+                job.update(status="cancelled", finished_at=_now())
+                _save(job)
+                continue
+            # Each worker drives its own event loop
+            asyncio.run(_run(job))
+        except Exception as e:
+            job.update(status="failed", error=str(e), finished_at=_now())
+            _save(job)
+            logging.error(f"[Jobs] Job {job_id} failed: {e}")
+        finally:
+            # Left queued on shutdown: any process may resume it
+            _release(job_id)
+
+
+def _resume():
+    if not os.path.isdir(JOBS_DIR):
+        return
+    pending = []
+    for entry in os.scandir(JOBS_DIR):
+        job = _load(entry.name)
+        if job is None or job["status"] not in ACTIVE_STATUSES + ("uploading",):
+            continue
+        # Jobs still owned by a live process (uploading or running) are left alone
+        if not _claim(job["id"]):
+            continue
+        # Re-read under the claim: the previous owner may have just finished it
+        job = _load(job["id"]) or job
+        if job["status"] in ACTIVE_STATUSES:
+            job["status"] = "queued"
+            with _lock:
+                _jobs[job["id"]] = job
+                _cancel[job["id"]] = threading.Event()
+            pending.append(job)
+        else:
+            if job["status"] == "uploading":
+                job.update(status="failed", error="Upload interrupted", finished_at=_now())
+                _save(job)
+            _release(job["id"])
+
+    for job in sorted(pending, key=lambda job: job["created_at"]):
+        _queue.put(job["id"])
+    if pending:
+        logging.info(f"[Jobs] Resuming {len(pending)} unfinished jobs")
+
+
+def start():
+    global _started
+    if _started:
+        return
+    with _lock:
+        if _started:
+            return
+        _started = True
+
+    _stop.clear()
+    _resume()
+    for i in range(JOB_WORKERS):
+        threading.Thread(target=_worker, name=f"alert-job-{i}", daemon=True).start()
+    logging.info(f"[Jobs] {JOB_WORKERS} job workers started")
+
+
+def stop():
+    _stop.set()
@@ -17,40 +17,36 @@
 
 import logging
 import os
-import joblib
-import pandas as pd
-from functools import lru_cache
+import numpy as np
+from dotenv import load_dotenv
+from core.services.feature_encoder import CompiledEncoder
+from core.services import compiled_forest, model_registry
+
+load_dotenv()
 
 # Base project directory
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 
-MODELS_DIR = os.path.join(BASE_DIR, "models")
+MODELS_DIR = model_registry.MODELS_DIR
+
+# Serve from the compiled NumPy export (forest.npz) when a model version has one
+COMPILED_INFERENCE = os.getenv("ML_COMPILED_INFERENCE", "true").lower() == "true"
 
 # Minimal confirmation for startup context
 print(f"[ML] BASE_DIR: {BASE_DIR}")
 print(f"[ML] MODELS_DIR: {MODELS_DIR}")
 
 
-def safe_transform(encoder, value, fallback=-1):
-    try:
-        return encoder.transform([value])[0]
-    except ValueError as e:
-        logging.warning(f"[ML] Unknown value '{value}' for encoder {encoder.__class__.__name__}: {e}")
-        return fallback
-
-
-# Cache the latest model path and loaded objects
 def get_latest_model_dir():
-    versions = [d for d in os.listdir(MODELS_DIR) if d.startswith("v")]
-    versions.sort(reverse=True)
-    if not versions:
-        raise FileNotFoundError("No trained model versions found in /models")
-    return os.path.join(MODELS_DIR, versions[0])
+    """
+    Directory of the model being served, answered from memory by the model registry.
+    """
+    return model_registry.current_model_dir()
 
 
-@lru_cache(maxsize=1)
-def load_latest_model_and_encoders():
-    model_dir = get_latest_model_dir()
+def load_model_and_encoders(model_dir: str):
+    # Imported here: the compiled backend serves without joblib or scikit-learn
+    import joblib
     model = joblib.load(os.path.join(model_dir, "alert_classifier.joblib"))
     le_event = joblib.load(os.path.join(model_dir, "le_event.joblib"))
     le_country = joblib.load(os.path.join(model_dir, "le_country.joblib"))
@@ -59,50 +55,85 @@ def load_latest_model_and_encoders():
     return model, le_event, le_country, le_usage, le_action
 
 
-def classify_alert(alert: dict) -> str:
-    """
-    Classifies an alert using the latest trained ML model.
-    If prediction fails, returns 'unclassified'.
-    """
-    try:
-        model, le_event, le_country, le_usage, le_action = load_latest_model_and_encoders()
-
-        event_type = alert.get("event_type", "")
-        country = alert.get("enrichment", {}).get("country", "")
-        usage_type = alert.get("enrichment", {}).get("usage_type", "")
+FEATURE_COLUMNS = ["event_type_enc", "abuse_score", "total_reports", "country_enc", "usage_type_enc",
+                   "legacy_risk_score"]
 
-        logging.info(f"[ML] Input received => event_type: {event_type}, country: {country}, usage_type: {usage_type}")
 
-        event_type_enc = safe_transform(le_event, event_type)
-        country_enc = safe_transform(le_country, country)
-        usage_type_enc = safe_transform(le_usage, usage_type)
-
-        logging.info(f"[ML] Encoded features => event_type_enc: {event_type_enc}, country_enc: {country_enc}, usage_type_enc: {usage_type_enc}")
+def load_classifier(model_dir: str) -> dict:
+    """
+    Loads a model version for serving: the compiled NumPy forest when the version
+    has one (no joblib/scikit-learn needed), otherwise the joblib model.
+    """
+    if COMPILED_INFERENCE and compiled_forest.exists(model_dir):
+        forest = compiled_forest.CompiledForest.load(model_dir)
+        encoder_classes = forest.encoders
+        predict_proba = forest.predict_proba
+        model_classes = forest.classes_
+        labels = np.asarray(encoder_classes["action"], dtype=object)
+        backend = "compiled"
+    else:
+        import pandas as pd
+        model, le_event, le_country, le_usage, le_action = load_model_and_encoders(model_dir)
+        encoder_classes = {"event_type": le_event.classes_, "country": le_country.classes_,
+                           "usage_type": le_usage.classes_}
+        predict_proba = lambda features: model.predict_proba(pd.DataFrame(features, columns=FEATURE_COLUMNS))
+        model_classes = model.classes_
+        labels = np.asarray(le_action.classes_, dtype=object)
+        backend = "sklearn"
+
+    logging.info(f"[ML] Loaded {os.path.basename(model_dir)} with the {backend} backend")
+    return {
+        "version": os.path.basename(model_dir),
+        "backend": backend,
+        "predict_proba": predict_proba,
+        "model_classes": np.asarray(model_classes, dtype=np.int64),
+        "labels": labels,
+        "encoders": {feature: CompiledEncoder(feature, encoder_classes[feature], os.path.basename(model_dir))
+                     for feature in ("event_type", "country", "usage_type")}
+    }
+
+
+def reload_model():
+    """
+    Reloads the current version in this worker now; the others pick it up from models/CURRENT.
+    """
+    model_registry.refresh(force=True)
 
-        features = pd.DataFrame([[
-            event_type_enc,
-            alert.get("enrichment", {}).get("abuse_score", 0),
-            alert.get("enrichment", {}).get("total_reports", 0),
-            country_enc,
-            usage_type_enc,
-            alert.get("legacy_risk_score", 0)
-        ]], columns=["event_type_enc", "abuse_score", "total_reports", "country_enc", "usage_type_enc",
-                     "legacy_risk_score"])
 
-        prediction = model.predict(features)[0]
-        proba = model.predict_proba(features)[0]
-        confidence = max(proba)
+def build_features(alerts: list, encoders: dict) -> np.ndarray:
+    """
+    Encodes a batch of alerts into one feature matrix (rows in FEATURE_COLUMNS order).
+    """
+    enrichments = [alert.get("enrichment", {}) or {} for alert in alerts]
+    features = np.empty((len(alerts), len(FEATURE_COLUMNS)), dtype=np.float64)
+    features[:, 0] = encoders["event_type"].encode([alert.get("event_type", "") for alert in alerts])
+    features[:, 1] = [enrichment.get("abuse_score", 0) or 0 for enrichment in enrichments]
+    features[:, 2] = [enrichment.get("total_reports", 0) or 0 for enrichment in enrichments]
+    features[:, 3] = encoders["country"].encode([enrichment.get("country", "") for enrichment in enrichments])
+    features[:, 4] = encoders["usage_type"].encode([enrichment.get("usage_type", "") for enrichment in enrichments])
+    features[:, 5] = [alert.get("legacy_risk_score", 0) or 0 for alert in alerts]
+    return features
+
+
+def classify_alerts(alerts: list) -> list:
+    """
+    Classifies a batch of alerts with one predict_proba call.
+    Returns a (label, confidence) pair per alert; ('unclassified', 0.0) if prediction fails.
+    """
+    if not alerts:
+        return []
+    try:
+        classifier = model_registry.get_classifier()
 
-        logging.info(f"[ML] Raw prediction index: {prediction}")
+        features = build_features(alerts, classifier["encoders"])
+        proba = classifier["predict_proba"](features)
+        best = proba.argmax(axis=1)
+        labels = classifier["labels"][classifier["model_classes"][best]]
+        confidences = proba[np.arange(len(alerts)), best]
 
-        try:
-            label = le_action.inverse_transform([prediction])[0]
-            logging.info(f"[ML] Prediction label: {label} (confidence: {confidence:.2f})")
-            return label, confidence
-        except Exception as e:
-            logging.warning(f"[ML] Failed to decode predicted label '{prediction}': {e}")
-            return "unclassified", 0.0
+        logging.info(f"[ML] Classified {len(alerts)} alerts")
+        return [(str(label), float(confidence)) for label, confidence in zip(labels, confidences)]
 
     except Exception as e:
-        logging.warning(f"[ML] Failed to classify alert: {e}")
-        return "unclassified"
+        logging.warning(f"[ML] Failed to classify {len(alerts)} alerts: {e}")
+        return [("unclassified", 0.0)] * len(alerts)
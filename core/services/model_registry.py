@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# SOAR Lite – Model registry
+#
+# Keeps the model being served in memory, per worker. The training script publishes
+# a version by writing its name to models/CURRENT (atomically, after the version
+# directory is complete). A background thread stats that file and the models/
+# directory every MODEL_WATCH_INTERVAL seconds; when either changes it loads the
+# new version next to the old one and then swaps a single reference, so requests
+# never see a half-loaded model and every worker follows the pointer on its own.
+# Without a CURRENT file the newest v* directory is served, as before.
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from dotenv import load_dotenv
+from core.services import state_files
+
+load_dotenv()
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+CURRENT_PATH = os.path.join(MODELS_DIR, "CURRENT")
+
+WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", 2))
+
+_lock = threading.Lock()
+_started = False
+_stop = threading.Event()
+_checked = False
+_signature = None
+# {"version", "model_dir", "classifier", "loaded_at"}; replaced as a whole, never mutated
+_active = None
+
+stats = {"checks": 0, "swaps": 0, "load_failures": 0, "last_swap": None, "last_error": None}
+
+
+def _stat(path: str):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size, st.st_ino
+    except FileNotFoundError:
+        return None
+
+
+def _current_signature() -> tuple:
+    return _stat(CURRENT_PATH), _stat(MODELS_DIR)
+
+
+def resolve_version():
+    """
+    Version to serve: the one named in models/CURRENT, otherwise the newest v* directory.
+    """
+    try:
+        with open(CURRENT_PATH, "r") as f:
+            version = f.read().strip()
+        if version and os.path.isdir(os.path.join(MODELS_DIR, version)):
+            return version
+        logging.warning(f"[Models] CURRENT points to a missing version '{version}'")
+    except FileNotFoundError:
+        pass
+
+    try:
+        versions = [d for d in os.listdir(MODELS_DIR) if d.startswith("v")]
+    except FileNotFoundError:
+        return None
+    return max(versions) if versions else None
+
+
+def publish(version: str):
+    """
+    Points models/CURRENT at a complete version directory.
+    """
+    state_files.replace_file(CURRENT_PATH, lambda f: f.write(f"{version}\n"))
+
+
+def refresh(force: bool = False) -> bool:
+    """
+    Loads and swaps in the current version if it changed. Returns True on a swap.
+    """
+    global _active, _signature, _checked
+    # Imported here to avoid a circular import (ml_classifier serves through this module)
+    from core.services import ml_classifier
+
+    with _lock:
+        signature = _current_signature()
+        stats["checks"] += 1
+        if _checked and not force and signature == _signature:
+            return False
+        _signature = signature
+        _checked = True
+
+        version = resolve_version()
+        if version is None:
+            if _active is not None:
+                logging.info("[Models] No model versions left, nothing is served")
+            _active = None
+            return False
+        if not force and _active is not None and _active["version"] == version:
+            return False
+
+        model_dir = os.path.join(MODELS_DIR, version)
+        try:
+            classifier = ml_classifier.load_classifier(model_dir)
+        except Exception as e:
+            # Keep serving what is loaded; a changed signature triggers the next attempt
+            stats["load_failures"] += 1
+            stats["last_error"] = f"{version}: {e}"
+            logging.error(f"[Models] Failed to load {version}: {e}")
+            return False
+
+        previous = _active["version"] if _active else None
+        _active = {"version": version, "model_dir": model_dir, "classifier": classifier,
+                   "loaded_at": datetime.now().isoformat(timespec="seconds")}
+        stats["swaps"] += 1
+        stats["last_swap"] = _active["loaded_at"]
+        logging.info(f"[Models] Serving {version} (was {previous}) with the {classifier['backend']} backend")
+        return True
+
+
+def _get_active():
+    if not _checked:
+        refresh()
+    return _active
+
+
+def is_model_available() -> bool:
+    """
+    Whether a model is loaded, answered from memory.
+    """
+    return _get_active() is not None
+
+
+def current_model_dir() -> str:
+    active = _get_active()
+    if active is None:
+        raise FileNotFoundError("No trained model versions found in /models")
+    return active["model_dir"]
+
+
+def get_classifier() -> dict:
+    active = _get_active()
+    if active is None:
+        raise FileNotFoundError("No trained model versions found in /models")
+    return active["classifier"]
+
+
+def _loop():
+    while not _stop.wait(WATCH_INTERVAL):
+        try:
+            refresh()
+        except Exception as e:
+            stats["last_error"] = str(e)
+            logging.error(f"[Models] Watch failed: {e}")
+
+
+def start():
+    global _started
+    if _started:
+        return
+    with _lock:
+        if _started:
+            return
+        _started = True
+    _stop.clear()
+    started = time.monotonic()
+    refresh()
+    threading.Thread(target=_loop, name="model-registry", daemon=True).start()
+    logging.info(f"[Models] Watching {MODELS_DIR} every {WATCH_INTERVAL:g}s "
+                 f"(initial load {time.monotonic() - started:.2f}s)")
+
+
+def stop():
+    _stop.set()
+
+
+def get_stats() -> dict:
+    active = _active
+    return {
+        "version": active["version"] if active else None,
+        "backend": active["classifier"]["backend"] if active else None,
+        "loaded_at": active["loaded_at"] if active else None,
+        "watch_interval_seconds": WATCH_INTERVAL,
+        **stats
+    }
@@ -16,21 +16,44 @@
 # limitations under the License.
 
 import os
-import json
 import html
+from urllib.parse import urlencode
+from dotenv import load_dotenv
+from core.services import results_store
+
+load_dotenv()
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 
+# Alerts per report page, newest first
+REPORT_PAGE_SIZE = int(os.getenv("REPORT_PAGE_SIZE", 100))
+
+
+def _pagination(query: dict, next_cursor: str) -> str:
+    """
+    First/next page links, keeping the current filters.
+    """
+    query = {key: value for key, value in query.items() if key != "cursor"}
+    first = f"/report?{urlencode(query)}" if query else "/report"
+    links = f'<a href="{html.escape(first)}" class="btn btn-outline-secondary btn-sm me-2">First page</a>'
+    if next_cursor:
+        following = f"/report?{urlencode({**query, 'cursor': next_cursor})}"
+        links += f'<a href="{html.escape(following)}" class="btn btn-outline-primary btn-sm">Next page</a>'
+    return links
+
 
-def generate_html_report(json_path):
+def generate_html_report(filters: dict = None, cursor: str = None, query: dict = None, limit: int = REPORT_PAGE_SIZE):
     """
     Generates an HTML report with enriched alerts including ML prediction.
     Highlights discrepancies between suggested_action and ml_priority.
+    Renders one page of stored alerts, newest first; query holds the request's
+    query parameters, reused in the pagination links.
     """
-    with open(json_path, 'r') as f:
-        results = json.load(f)
+    if not results_store.count():
+        raise FileNotFoundError("No processed alerts found")
 
-    results.sort(key=lambda x: x.get("timestamp", ""))
+    results, next_cursor = results_store.query(filters, sort="timestamp", descending=True,
+                                               limit=limit, cursor=cursor)
     discrepancy_count = 0
     table_rows = ""
 
@@ -50,6 +73,8 @@ def generate_html_report(json_path):
         # Determine which sources were used
         sources = item.get("sources", {})
         used_sources = []
+        if "local_feeds" in sources:
+            used_sources.append("Local Feeds")
         if "abuseipdb" in sources:
             used_sources.append("AbuseIPDB")
         if "virustotal" in sources:
@@ -134,5 +159,6 @@ def generate_html_report(json_path):
     # Replace placeholders
     html_content = template.replace("{rows}", table_rows)
     html_content = html_content.replace("{discrepancy_count}", str(discrepancy_count))
+    html_content = html_content.replace("{pagination}", _pagination(query or {}, next_cursor))
 
     return html_content
\ No newline at end of file
@@ -0,0 +1,740 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# SOAR Lite – Results store
+#
+# Every processed alert is appended to an SQLite database (WAL mode) instead of
+# overwriting output/results.json. The full alert is kept as JSON next to indexed
+# columns used for filtering and aggregation. An existing results.json is imported
+# once, the first time the store is opened.
+#
+# A sighting index is maintained in the same transaction: per IOC the first/last
+# timestamp and count, plus hourly counts for time-window queries.
+
+import os
+import json
+import base64
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from dotenv import load_dotenv
+from core.services.attck_mapper import map_event_to_mitre
+
+load_dotenv()
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# Relative paths are taken from the project directory, not the working directory
+RESULTS_DB_PATH = os.path.join(BASE_DIR, os.getenv("RESULTS_DB_PATH", os.path.join("output", "results.db")))
+LEGACY_RESULTS_PATH = os.path.join(BASE_DIR, "output", "results.json")
+
+# Rows fetched per round trip when streaming results out of the store
+FETCH_SIZE = 1000
+PAGE_SIZE_MAX = int(os.getenv("RESULTS_PAGE_SIZE_MAX", 1000))
+
+# Sort keys accepted by query(); each is backed by an index (which also holds the id)
+SORT_COLUMNS = ("id", "timestamp", "risk_score", "confidence_score")
+
+# Seconds a connection waits for another writer (thread or worker process) before failing
+BUSY_TIMEOUT = float(os.getenv("RESULTS_DB_BUSY_TIMEOUT", 30))
+
+# Serializes writers within this process; each thread reads and writes on its own connection
+_lock = threading.Lock()
+_local = threading.local()
+_initialized = False
+# Bumped by close()/clear(); threads reopen their connection when it changes
+_generation = 0
+
+COLUMNS = ("batch_id", "processed_at", "timestamp", "ioc_type", "ioc_value", "event_type", "ml_priority",
+           "confidence_score", "suggested_action", "risk_score", "legacy_risk_score", "country", "usage_type",
+           "abuse_score", "mitre_id", "mitre_name", "seen_before", "data")
+
+
+def _connect(check_same_thread: bool = True):
+    conn = sqlite3.connect(RESULTS_DB_PATH, timeout=BUSY_TIMEOUT, check_same_thread=check_same_thread,
+                           isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _init_schema():
+    os.makedirs(os.path.dirname(RESULTS_DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(RESULTS_DB_PATH, timeout=BUSY_TIMEOUT, isolation_level=None)
+    try:
+        # Only takes effect on a new database; lets retention give pages back in small steps
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS alerts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                batch_id TEXT NOT NULL,
+                processed_at REAL NOT NULL,
+                timestamp TEXT,
+                ioc_type TEXT,
+                ioc_value TEXT,
+                event_type TEXT,
+                ml_priority TEXT,
+                confidence_score REAL,
+                suggested_action TEXT,
+                risk_score INTEGER,
+                legacy_risk_score INTEGER,
+                country TEXT,
+                usage_type TEXT,
+                abuse_score INTEGER,
+                mitre_id TEXT,
+                mitre_name TEXT,
+                seen_before INTEGER,
+                data TEXT NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_ioc ON alerts (ioc_type, ioc_value)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_timestamp ON alerts (timestamp)")
+        # Filter column + timestamp, so filtered pages sorted by time walk a single index
+        conn.execute("DROP INDEX IF EXISTS idx_alerts_priority")
+        conn.execute("DROP INDEX IF EXISTS idx_alerts_event_type")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_priority_ts ON alerts (ml_priority, timestamp)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_event_type_ts ON alerts (event_type, timestamp)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_country_ts ON alerts (country, timestamp)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_batch ON alerts (batch_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_processed ON alerts (processed_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_risk ON alerts (risk_score)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_confidence ON alerts (confidence_score)")
+        conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ioc_sightings (
+                ioc_key TEXT PRIMARY KEY,
+                first_seen TEXT,
+                last_seen TEXT,
+                count INTEGER NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ioc_sightings_hourly (
+                ioc_key TEXT NOT NULL,
+                hour TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (ioc_key, hour)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS alert_summaries (
+                day TEXT NOT NULL,
+                ioc_type TEXT NOT NULL,
+                ioc_value TEXT NOT NULL,
+                alerts INTEGER NOT NULL,
+                first_seen TEXT,
+                last_seen TEXT,
+                max_risk_score INTEGER,
+                max_legacy_risk_score INTEGER,
+                max_seen_count INTEGER,
+                priorities TEXT NOT NULL,
+                event_types TEXT NOT NULL,
+                country TEXT,
+                PRIMARY KEY (day, ioc_type, ioc_value)
+            ) WITHOUT ROWID
+        """)
+        _migrate_legacy(conn)
+        _backfill_sightings(conn)
+    finally:
+        conn.close()
+
+
+def _get_conn():
+    """
+    Connection of the calling thread. Each thread gets its own, so a reader never
+    runs inside another thread's open write transaction.
+    """
+    global _initialized
+    if not _initialized:
+        with _lock:
+            if not _initialized:
+                _init_schema()
+                _initialized = True
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.generation != _generation:
+        # The store was closed or cleared since this connection was opened
+        conn.close()
+        conn = None
+    if conn is None:
+        conn = _connect()
+        _local.conn = conn
+        _local.generation = _generation
+    return conn
+
+
+def _row(result: dict, batch_id: str, processed_at: float) -> tuple:
+    enrichment = result.get("enrichment", {}) or {}
+    mitre = result.get("mitre_technique", {}) or {}
+    return (
+        batch_id,
+        processed_at,
+        result.get("timestamp"),
+        result.get("ioc_type"),
+        result.get("ioc_value", result.get("src_ip")),
+        result.get("event_type"),
+        result.get("ml_priority"),
+        result.get("confidence_score"),
+        result.get("suggested_action"),
+        result.get("risk_score"),
+        result.get("legacy_risk_score"),
+        enrichment.get("country"),
+        enrichment.get("usage_type"),
+        enrichment.get("abuse_score"),
+        mitre.get("id"),
+        mitre.get("name"),
+        int(bool(result.get("ioc_seen_before"))),
+        json.dumps(result)
+    )
+
+
+def make_key(ioc_type: str, ioc_value: str) -> str:
+    return f"{ioc_type}::{ioc_value}"
+
+
+def _hour(timestamp) -> str:
+    # ISO timestamps sort lexically; the first 13 characters are YYYY-MM-DDTHH
+    return str(timestamp or "")[:13].replace(" ", "T")
+
+
+_SIGHTING_UPSERT = """
+    INSERT INTO ioc_sightings (ioc_key, first_seen, last_seen, count) VALUES (?, ?, ?, 1)
+    ON CONFLICT (ioc_key) DO UPDATE SET
+        first_seen = COALESCE(MIN(first_seen, excluded.first_seen), first_seen, excluded.first_seen),
+        last_seen = COALESCE(MAX(last_seen, excluded.last_seen), last_seen, excluded.last_seen),
+        count = count + 1
+"""
+
+_HOURLY_UPSERT = """
+    INSERT INTO ioc_sightings_hourly (ioc_key, hour, count) VALUES (?, ?, 1)
+    ON CONFLICT (ioc_key, hour) DO UPDATE SET count = count + 1
+"""
+
+
+def _insert(conn, results, batch_id: str) -> int:
+    processed_at = time.time()
+    rows = [_row(result, batch_id, processed_at) for result in results]
+    if rows:
+        conn.executemany(f"INSERT INTO alerts ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+        # columns: timestamp (2), ioc_type (3), ioc_value (4)
+        sightings = [(make_key(row[3], row[4]), row[2], row[2]) for row in rows]
+        conn.executemany(_SIGHTING_UPSERT, sightings)
+        conn.executemany(_HOURLY_UPSERT, [(key, _hour(timestamp)) for key, timestamp, _ in sightings])
+    return len(rows)
+
+
+def _backfill_sightings(conn):
+    """
+    Builds the sighting index from stores created before it existed.
+    """
+    if conn.execute("SELECT 1 FROM store_meta WHERE key = 'sightings_backfill'").fetchone():
+        return
+    conn.execute("BEGIN")
+    try:
+        conn.execute("""
+            INSERT OR REPLACE INTO ioc_sightings (ioc_key, first_seen, last_seen, count)
+            SELECT ioc_type || '::' || ioc_value, MIN(timestamp), MAX(timestamp), COUNT(*)
+            FROM alerts GROUP BY ioc_type, ioc_value
+        """)
+        conn.execute("""
+            INSERT OR REPLACE INTO ioc_sightings_hourly (ioc_key, hour, count)
+            SELECT ioc_type || '::' || ioc_value, REPLACE(SUBSTR(COALESCE(timestamp, ''), 1, 13), ' ', 'T'), COUNT(*)
+            FROM alerts GROUP BY 1, 2
+        """)
+        conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('sightings_backfill', '1')")
+        conn.execute("COMMIT")
+    except Exception as e:
+        conn.execute("ROLLBACK")
+        logging.warning(f"[ResultsStore] Could not build the sighting index: {e}")
+
+
+def _migrate_legacy(conn):
+    if conn.execute("SELECT 1 FROM store_meta WHERE key = 'legacy_import'").fetchone():
+        return
+    imported = 0
+    if os.path.exists(LEGACY_RESULTS_PATH):
+        try:
+            with open(LEGACY_RESULTS_PATH, "r") as f:
+                legacy = json.load(f)
+            conn.execute("BEGIN")
+            imported = _insert(conn, legacy if isinstance(legacy, list) else [], "legacy")
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            logging.warning(f"[ResultsStore] Could not import {LEGACY_RESULTS_PATH}: {e}")
+            return
+    conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('legacy_import', ?)", (str(imported),))
+    if imported:
+        logging.info(f"[ResultsStore] Imported {imported} results from {LEGACY_RESULTS_PATH}")
+
+
+def new_batch_id() -> str:
+    return uuid.uuid4().hex
+
+
+def append(results: list, batch_id: str = None) -> int:
+    """
+    Appends processed alerts in one transaction. Returns the number of rows written.
+    """
+    if not results:
+        return 0
+    conn = _get_conn()
+    with _lock:
+        conn.execute("BEGIN")
+        try:
+            written = _insert(conn, results, batch_id or new_batch_id())
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return written
+
+
+def _iter_query(sql: str, params=()):
+    # A streamed read holds its cursor across yields and may be resumed from another
+    # thread (e.g. a streaming response), so it reads on a connection of its own
+    _get_conn()
+    conn = _connect(check_same_thread=False)
+    try:
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+
+def iter_results(batch_id: str = None, order_by: str = "id", limit: int = None, descending: bool = False):
+    """
+    Streams stored alerts (as dicts), optionally only one batch.
+    """
+    if order_by not in ("id", "timestamp"):
+        raise ValueError(f"Unsupported order: {order_by}")
+    sql = "SELECT data FROM alerts"
+    params = []
+    if batch_id is not None:
+        sql += " WHERE batch_id = ?"
+        params.append(batch_id)
+    sql += f" ORDER BY {order_by} {'DESC' if descending else 'ASC'}"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    for (data,) in _iter_query(sql, params):
+        yield json.loads(data)
+
+
+def encode_cursor(sort_value, row_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([sort_value, row_id]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return sort_value, int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def _after_cursor(column: str, value, row_id: int, descending: bool) -> tuple:
+    """
+    Keyset condition for rows after (value, row_id) in ORDER BY column, id.
+    SQLite sorts NULLs first ascending and last descending.
+    """
+    op = "<" if descending else ">"
+    if column == "id":
+        return f"id {op} ?", [row_id]
+    if value is None:
+        if descending:
+            return f"({column} IS NULL AND id < ?)", [row_id]
+        return f"(({column} IS NULL AND id > ?) OR {column} IS NOT NULL)", [row_id]
+    condition = f"{column} {op} ? OR ({column} = ? AND id {op} ?)"
+    if descending:
+        condition += f" OR {column} IS NULL"
+    return f"({condition})", [value, value, row_id]
+
+
+def query(filters: dict = None, sort: str = "timestamp", descending: bool = True,
+          limit: int = 100, cursor: str = None) -> tuple:
+    """
+    One page of stored alerts. Supported filters: since/until (timestamp), ioc_type,
+    ioc_value, ml_priority, event_type, country, batch_id, min_risk/max_risk and seen_before.
+    Returns (alerts, next_cursor); next_cursor is None on the last page.
+
+    Pages are fetched with a keyset condition on (sort column, id) instead of OFFSET,
+    so a page costs the same however deep it is.
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Unsupported sort: {sort}")
+    limit = max(1, min(limit, PAGE_SIZE_MAX))
+    filters = filters or {}
+
+    conditions, params = [], []
+    for column in ("ioc_type", "ioc_value", "ml_priority", "event_type", "country", "batch_id"):
+        value = filters.get(column)
+        if value is None:
+            continue
+        values = value if isinstance(value, (list, tuple)) else [value]
+        conditions.append(f"{column} IN ({', '.join('?' * len(values))})")
+        params.extend(values)
+    if filters.get("since"):
+        conditions.append("timestamp >= ?")
+        params.append(filters["since"])
+    if filters.get("until"):
+        conditions.append("timestamp <= ?")
+        params.append(filters["until"])
+    if filters.get("min_risk") is not None:
+        conditions.append("risk_score >= ?")
+        params.append(filters["min_risk"])
+    if filters.get("max_risk") is not None:
+        conditions.append("risk_score <= ?")
+        params.append(filters["max_risk"])
+    if filters.get("seen_before") is not None:
+        conditions.append("seen_before = ?")
+        params.append(int(bool(filters["seen_before"])))
+    if cursor:
+        condition, cursor_params = _after_cursor(sort, *decode_cursor(cursor), descending)
+        conditions.append(condition)
+        params.extend(cursor_params)
+
+    direction = "DESC" if descending else "ASC"
+    order = f"id {direction}" if sort == "id" else f"{sort} {direction}, id {direction}"
+    sql = f"SELECT id, {sort}, data FROM alerts"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += f" ORDER BY {order} LIMIT ?"
+    params.append(limit + 1)
+
+    rows = _get_conn().execute(sql, params).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        row_id, sort_value, _ = rows[-1]
+        next_cursor = encode_cursor(sort_value, row_id)
+    return [json.loads(data) for _, _, data in rows], next_cursor
+
+
+def get_sightings(iocs) -> dict:
+    """
+    Sighting summaries for (ioc_type, ioc_value) pairs, keyed by IOC key.
+    IOCs never seen are left out.
+    """
+    keys = list({make_key(ioc_type, ioc_value) for ioc_type, ioc_value in iocs})
+    sightings = {}
+    conn = _get_conn()
+    # Stay below SQLite's bound-parameter limit
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        for key, first_seen, last_seen, seen in conn.execute(
+                f"SELECT ioc_key, first_seen, last_seen, count FROM ioc_sightings "
+                f"WHERE ioc_key IN ({', '.join('?' * len(chunk))})", chunk):
+            sightings[key] = {"first_seen": first_seen, "last_seen": last_seen, "count": seen}
+    return sightings
+
+
+def get_sighting(ioc_type: str, ioc_value: str):
+    return get_sightings([(ioc_type, ioc_value)]).get(make_key(ioc_type, ioc_value))
+
+
+def count_sightings(ioc_type: str, ioc_value: str, since: str, until: str = None) -> int:
+    """
+    Number of sightings of an IOC with a timestamp in [since, until], at hour granularity.
+    """
+    sql = "SELECT COALESCE(SUM(count), 0) FROM ioc_sightings_hourly WHERE ioc_key = ? AND hour >= ?"
+    params = [make_key(ioc_type, ioc_value), _hour(since)]
+    if until:
+        sql += " AND hour <= ?"
+        params.append(_hour(until))
+    return _get_conn().execute(sql, params).fetchone()[0]
+
+
+def _merge_counts(current: str, added: dict) -> str:
+    counts = json.loads(current) if current else {}
+    for key, value in added.items():
+        counts[key] = counts.get(key, 0) + value
+    return json.dumps(counts, sort_keys=True)
+
+
+def _max(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def _min(*values):
+    values = [value for value in values if value is not None]
+    return min(values) if values else None
+
+
+def _summarize(rows) -> dict:
+    groups = {}
+    for (_, timestamp, processed_at, ioc_type, ioc_value, event_type, priority, risk, legacy_risk,
+         country, seen_count) in rows:
+        day = str(timestamp)[:10] if timestamp else time.strftime("%Y-%m-%d", time.localtime(processed_at))
+        key = (day, ioc_type or "unknown", ioc_value or "")
+        group = groups.setdefault(key, {"alerts": 0, "first_seen": None, "last_seen": None, "max_risk": None,
+                                        "max_legacy_risk": None, "max_seen_count": None, "priorities": {},
+                                        "event_types": {}, "country": None})
+        group["alerts"] += 1
+        group["first_seen"] = _min(group["first_seen"], timestamp)
+        group["last_seen"] = _max(group["last_seen"], timestamp)
+        group["max_risk"] = _max(group["max_risk"], risk)
+        group["max_legacy_risk"] = _max(group["max_legacy_risk"], legacy_risk)
+        group["max_seen_count"] = _max(group["max_seen_count"], seen_count)
+        priority = priority or "unclassified"
+        group["priorities"][priority] = group["priorities"].get(priority, 0) + 1
+        event_type = event_type or "unknown"
+        group["event_types"][event_type] = group["event_types"].get(event_type, 0) + 1
+        group["country"] = country or group["country"]
+    return groups
+
+
+def compact_before(processed_before: float, chunk_size: int = 1000) -> int:
+    """
+    Folds up to chunk_size alerts stored before processed_before into the per-IOC,
+    per-day summaries and deletes them, in one short transaction. Returns the number
+    of alerts compacted; call again until it returns 0.
+    """
+    conn = _get_conn()
+    with _lock:
+        # IMMEDIATE: another worker process compacting at the same time waits instead of double counting
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("""
+                SELECT id, timestamp, processed_at, ioc_type, ioc_value, event_type, ml_priority, risk_score,
+                       legacy_risk_score, country, json_extract(data, '$.seen_count')
+                FROM alerts WHERE processed_at < ? ORDER BY processed_at LIMIT ?
+            """, (processed_before, chunk_size)).fetchall()
+
+            for (day, ioc_type, ioc_value), group in _summarize(rows).items():
+                existing = conn.execute("""
+                    SELECT alerts, first_seen, last_seen, max_risk_score, max_legacy_risk_score, max_seen_count,
+                           priorities, event_types, country
+                    FROM alert_summaries WHERE day = ? AND ioc_type = ? AND ioc_value = ?
+                """, (day, ioc_type, ioc_value)).fetchone() or (0, None, None, None, None, None, None, None, None)
+                conn.execute("""
+                    INSERT OR REPLACE INTO alert_summaries (day, ioc_type, ioc_value, alerts, first_seen, last_seen,
+                        max_risk_score, max_legacy_risk_score, max_seen_count, priorities, event_types, country)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (day, ioc_type, ioc_value, existing[0] + group["alerts"],
+                      _min(existing[1], group["first_seen"]), _max(existing[2], group["last_seen"]),
+                      _max(existing[3], group["max_risk"]), _max(existing[4], group["max_legacy_risk"]),
+                      _max(existing[5], group["max_seen_count"]),
+                      _merge_counts(existing[6], group["priorities"]), _merge_counts(existing[7], group["event_types"]),
+                      group["country"] or existing[8]))
+            conn.executemany("DELETE FROM alerts WHERE id = ?", [(row[0],) for row in rows])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return len(rows)
+
+
+def downsample_sightings_before(hour_before: str, chunk_size: int = 1000) -> int:
+    """
+    Merges up to chunk_size hourly sighting buckets older than hour_before into one
+    bucket per day (hour 00). Sighting totals are unchanged; time-window counts over
+    that period become day-granular. Returns the number of buckets merged.
+    """
+    conn = _get_conn()
+    with _lock:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("""
+                SELECT ioc_key, hour, count FROM ioc_sightings_hourly
+                WHERE hour < ? AND LENGTH(hour) = 13 AND SUBSTR(hour, 12, 2) != '00' LIMIT ?
+            """, (_hour(hour_before), chunk_size)).fetchall()
+            conn.executemany("""
+                INSERT INTO ioc_sightings_hourly (ioc_key, hour, count) VALUES (?, ?, ?)
+                ON CONFLICT (ioc_key, hour) DO UPDATE SET count = count + excluded.count
+            """, [(key, f"{hour[:10]}T00", seen) for key, hour, seen in rows])
+            conn.executemany("DELETE FROM ioc_sightings_hourly WHERE ioc_key = ? AND hour = ?",
+                             [(key, hour) for key, hour, _ in rows])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return len(rows)
+
+
+def reclaim_space(pages: int = 256) -> int:
+    """
+    Returns up to `pages` free pages to the filesystem (incremental vacuum) and
+    checkpoints the WAL without waiting for readers. Returns the pages still free.
+    """
+    conn = _get_conn()
+    with _lock:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+        conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+        return conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+def iter_summaries(ioc_type: str = None, ioc_value: str = None, since: str = None, until: str = None,
+                   limit: int = None):
+    """
+    Streams the daily per-IOC summaries of compacted alerts, newest day first.
+    """
+    sql = ("SELECT day, ioc_type, ioc_value, alerts, first_seen, last_seen, max_risk_score, max_legacy_risk_score, "
+           "max_seen_count, priorities, event_types, country FROM alert_summaries")
+    conditions, params = [], []
+    for column, value in (("ioc_type", ioc_type), ("ioc_value", ioc_value)):
+        if value is not None:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+    if since:
+        conditions.append("day >= ?")
+        params.append(since[:10])
+    if until:
+        conditions.append("day <= ?")
+        params.append(until[:10])
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY day DESC, ioc_type, ioc_value"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    names = ("day", "ioc_type", "ioc_value", "alerts", "first_seen", "last_seen", "max_risk_score",
+             "max_legacy_risk_score", "max_seen_count", "priorities", "event_types", "country")
+    for row in _iter_query(sql, params):
+        summary = dict(zip(names, row))
+        summary["priorities"] = json.loads(summary["priorities"])
+        summary["event_types"] = json.loads(summary["event_types"])
+        yield summary
+
+
+def storage_stats() -> dict:
+    conn = _get_conn()
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return {
+        "alerts": count(),
+        "summaries": conn.execute("SELECT COUNT(*) FROM alert_summaries").fetchone()[0],
+        "oldest_processed_at": conn.execute("SELECT MIN(processed_at) FROM alerts").fetchone()[0],
+        "size_bytes": conn.execute("PRAGMA page_count").fetchone()[0] * page_size,
+        "free_bytes": conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size,
+        "incremental_vacuum": conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    }
+
+
+def count(batch_id: str = None) -> int:
+    if batch_id is None:
+        return _get_conn().execute("SELECT COUNT(*) FROM alerts").fetchone()[0]
+    return _get_conn().execute("SELECT COUNT(*) FROM alerts WHERE batch_id = ?", (batch_id,)).fetchone()[0]
+
+
+def last_id() -> int:
+    return _get_conn().execute("SELECT COALESCE(MAX(id), 0) FROM alerts").fetchone()[0]
+
+
+def summary() -> dict:
+    """
+    Aggregates for the Threat Intelligence Overview, computed in SQL. Alerts compacted by
+    retention are counted from their daily summaries; the risk average covers stored alerts only.
+    """
+    conn = _get_conn()
+    totals = {"ioc_types": {}, "ml_priority": {}, "countries": {}, "mitre_techniques": {}}
+
+    def add(name, rows, default):
+        counts = totals[name]
+        for value, n in rows:
+            value = value or default
+            counts[value] = counts.get(value, 0) + n
+
+    def grouped(column):
+        return conn.execute(f"SELECT {column}, COUNT(*) FROM alerts GROUP BY {column}").fetchall()
+
+    # One read transaction, so alerts moved into summaries meanwhile are counted exactly once
+    conn.execute("BEGIN")
+    try:
+        add("ioc_types", grouped("ioc_type"), "unknown")
+        add("ml_priority", grouped("ml_priority"), "unclassified")
+        add("countries", grouped("country"), "unknown")
+        add("mitre_techniques", conn.execute("""
+            SELECT mitre_id || ' – ' || mitre_name AS label, COUNT(*) FROM alerts
+            WHERE mitre_id IS NOT NULL AND mitre_id != '' AND mitre_name IS NOT NULL AND mitre_name != ''
+            GROUP BY label
+        """).fetchall(), None)
+        risk_score_avg_by_priority = {
+            priority or "unclassified": round(avg, 1)
+            for priority, avg in conn.execute(
+                "SELECT ml_priority, AVG(COALESCE(legacy_risk_score, 0)) FROM alerts GROUP BY ml_priority")
+        }
+
+        add("ioc_types", conn.execute(
+            "SELECT ioc_type, SUM(alerts) FROM alert_summaries GROUP BY ioc_type").fetchall(), "unknown")
+        add("countries", conn.execute(
+            "SELECT country, SUM(alerts) FROM alert_summaries GROUP BY country").fetchall(), "unknown")
+        add("ml_priority", conn.execute("""
+            SELECT p.key, SUM(p.value) FROM alert_summaries, json_each(alert_summaries.priorities) AS p
+            GROUP BY p.key
+        """).fetchall(), "unclassified")
+        event_types = conn.execute("""
+            SELECT e.key, SUM(e.value) FROM alert_summaries, json_each(alert_summaries.event_types) AS e
+            GROUP BY e.key
+        """).fetchall()
+    finally:
+        conn.execute("COMMIT")
+    for event_type, n in event_types:
+        mitre = map_event_to_mitre(event_type)
+        add("mitre_techniques", [(f"{mitre['id']} – {mitre['name']}", n)], None)
+
+    def ranked(name):
+        return sorted(totals[name].items(), key=lambda item: item[1], reverse=True)
+
+    return {
+        "ioc_types": ranked("ioc_types"),
+        "ml_priority": ranked("ml_priority"),
+        "countries": ranked("countries"),
+        "mitre_techniques": ranked("mitre_techniques"),
+        "risk_score_avg_by_priority": risk_score_avg_by_priority
+    }
+
+
+def count_compacted() -> int:
+    """
+    Number of alerts folded into daily summaries by retention.
+    """
+    return _get_conn().execute("SELECT COALESCE(SUM(alerts), 0) FROM alert_summaries").fetchone()[0]
+
+
+def close():
+    """
+    Closes this thread's connection; other threads reopen theirs on their next call.
+    """
+    global _initialized, _generation
+    with _lock:
+        _generation += 1
+        _initialized = False
+        conn = getattr(_local, "conn", None)
+        if conn is not None:
+            conn.close()
+            _local.conn = None
+
+
+def clear():
+    """
+    Deletes the store (used by /reset-system).
+    """
+    close()
+    for suffix in ("", "-wal", "-shm"):
+        path = RESULTS_DB_PATH + suffix
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# SOAR Lite – Results retention
+#
+# Alerts are kept at full fidelity in the results store for ALERT_RETENTION_DAYS
+# after they were processed. A background thread then folds them into per-IOC,
+# per-day summaries (alert count, priorities, event types, max risk and seen_count),
+# downsamples old hourly sighting buckets to one per day and gives freed pages back
+# to the filesystem. Work is done in small transactions with pauses in between, so
+# ingestion is never blocked for long. IOC sighting totals are never reduced.
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from core.services import results_store
+
+load_dotenv()
+
+# 0 (the default) keeps every alert at full fidelity. When set, compacted alerts leave
+# /report, /results and dataset rebuilds; the overview keeps counting them from summaries
+RETENTION_DAYS = float(os.getenv("ALERT_RETENTION_DAYS", 0))
+RETENTION_INTERVAL = float(os.getenv("ALERT_RETENTION_INTERVAL", 3600))
+RETENTION_CHUNK_SIZE = int(os.getenv("ALERT_RETENTION_CHUNK_SIZE", 1000))
+# Pause between chunks, leaving the store to ingestion
+RETENTION_CHUNK_PAUSE = float(os.getenv("ALERT_RETENTION_CHUNK_PAUSE", 0.05))
+VACUUM_PAGES = int(os.getenv("ALERT_RETENTION_VACUUM_PAGES", 256))
+
+_lock = threading.Lock()
+_started = False
+_stop = threading.Event()
+
+stats = {"runs": 0, "alerts_compacted": 0, "sighting_buckets_merged": 0, "last_run": None,
+         "last_duration_seconds": None, "errors": 0}
+
+
+def _drain(step) -> int:
+    total = 0
+    while not _stop.is_set():
+        done = step()
+        total += done
+        if done < RETENTION_CHUNK_SIZE:
+            break
+        time.sleep(RETENTION_CHUNK_PAUSE)
+    return total
+
+
+def run_once() -> dict:
+    """
+    Compacts everything older than the retention window. Returns what was done.
+    """
+    if RETENTION_DAYS <= 0:
+        return {"alerts_compacted": 0, "sighting_buckets_merged": 0}
+
+    started = time.monotonic()
+    cutoff = datetime.now() - timedelta(days=RETENTION_DAYS)
+
+    compacted = _drain(lambda: results_store.compact_before(cutoff.timestamp(), RETENTION_CHUNK_SIZE))
+    merged = _drain(lambda: results_store.downsample_sightings_before(cutoff.isoformat(timespec="seconds"),
+                                                                      RETENTION_CHUNK_SIZE))
+    free_pages = None
+    while not _stop.is_set():
+        remaining = results_store.reclaim_space(VACUUM_PAGES)
+        if remaining == free_pages or not remaining:
+            break
+        free_pages = remaining
+        time.sleep(RETENTION_CHUNK_PAUSE)
+
+    stats["runs"] += 1
+    stats["alerts_compacted"] += compacted
+    stats["sighting_buckets_merged"] += merged
+    stats["last_run"] = datetime.now().isoformat(timespec="seconds")
+    stats["last_duration_seconds"] = round(time.monotonic() - started, 3)
+    if compacted or merged:
+        logging.info(f"[Retention] Compacted {compacted} alerts and merged {merged} hourly sighting buckets "
+                     f"older than {cutoff.date()}")
+    return {"alerts_compacted": compacted, "sighting_buckets_merged": merged}
+
+
+def _loop():
+    while not _stop.is_set():
+        try:
+            run_once()
+        except Exception as e:
+            stats["errors"] += 1
+            logging.error(f"[Retention] Run failed: {e}")
+        _stop.wait(RETENTION_INTERVAL)
+
+
+def start():
+    global _started
+    if _started or RETENTION_DAYS <= 0:
+        return
+    with _lock:
+        if _started:
+            return
+        _started = True
+    _stop.clear()
+    threading.Thread(target=_loop, name="results-retention", daemon=True).start()
+    logging.info(f"[Retention] Keeping {RETENTION_DAYS:g} days of full alerts, compacting every {RETENTION_INTERVAL:g}s")
+
+
+def stop():
+    _stop.set()
+
+
+def get_stats() -> dict:
+    return {"retention_days": RETENTION_DAYS, "interval_seconds": RETENTION_INTERVAL, **stats,
+            "store": results_store.storage_stats()}
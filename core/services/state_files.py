@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# SOAR Lite – Shared state files
+#
+# JSON and CSV files under data/ are shared by every uvicorn worker, the background
+# threads and the training subprocess. Writes go through this module:
+#
+#   - whole-file writes go to a temp file in the same directory and are renamed over
+#     the target, so readers see either the old or the new file, never a partial one
+#   - writers (and CSV readers, which can otherwise catch an append half-way) take an
+#     flock on <file>.lock, shared between processes
+#   - every write bumps a version stamp kept in the lock file, next to a generation id
+#     that changes whenever the file is replaced or started anew (not on appends)
+#   - write_json_coalesced() hands frequent rewrites (dashboard data, statistics) to
+#     whichever thread is already writing, so requests do not queue up on the lock
+
+import os
+import json
+import uuid
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # No inter-process locking on this platform; threads are still serialized
+    fcntl = None
+
+_thread_locks = {}
+_coalesce_locks = {}
+_registry_lock = threading.Lock()
+_pending = {}
+_owned = threading.local()
+
+
+def _thread_lock(path: str) -> threading.Lock:
+    with _registry_lock:
+        return _thread_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+def _held_locks() -> dict:
+    # {abspath: (lock file, shared)} for the state file locks the calling thread holds
+    held = getattr(_owned, "locks", None)
+    if held is None:
+        held = _owned.locks = {}
+    return held
+
+
+def _coalesce_lock(path: str) -> threading.Lock:
+    with _registry_lock:
+        return _coalesce_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+def _read_lock(lock_file) -> tuple:
+    # "<stamp> <generation>"; lock files written before generations existed hold only the stamp
+    lock_file.seek(0)
+    parts = lock_file.read().split()
+    try:
+        stamp = int(parts[0]) if parts else 0
+    except ValueError:
+        stamp = 0
+    return stamp, parts[1] if len(parts) > 1 else None
+
+
+def _read_stamp(lock_file) -> int:
+    return _read_lock(lock_file)[0]
+
+
+def read_generation(lock_file):
+    """
+    Generation id recorded in an open lock file (see locked()), or None.
+    """
+    return _read_lock(lock_file)[1]
+
+
+@contextmanager
+def locked(path: str, shared: bool = False):
+    """
+    Holds the lock of a state file: exclusive for writers, shared for readers.
+    Yields the open lock file, which carries the version stamp. A nested call from the
+    thread that already holds the lock reuses it instead of taking a second flock,
+    which would block on the first; upgrading a shared hold to exclusive is refused.
+    """
+    key = os.path.abspath(path)
+    held = _held_locks()
+    if key in held:
+        lock_file, held_shared = held[key]
+        if held_shared and not shared:
+            raise RuntimeError(f"{path} is held shared by this thread; cannot take it exclusively")
+        yield lock_file
+        return
+
+    os.makedirs(os.path.dirname(key), exist_ok=True)
+    thread_lock = _thread_lock(path)
+    with thread_lock:
+        with open(f"{path}.lock", "a+") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            held[key] = (lock_file, shared)
+            try:
+                yield lock_file
+            finally:
+                del held[key]
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _bump(lock_file, new_generation: bool = False) -> int:
+    stamp, generation = _read_lock(lock_file)
+    stamp += 1
+    if new_generation:
+        generation = uuid.uuid4().hex
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(f"{stamp} {generation}" if generation else str(stamp))
+    lock_file.flush()
+    return stamp
+
+
+def version(path: str) -> int:
+    """
+    Version stamp of a state file: the number of writes since the lock file was created.
+    """
+    try:
+        with open(f"{path}.lock", "r") as lock_file:
+            return _read_stamp(lock_file)
+    except FileNotFoundError:
+        return 0
+
+
+def _replace(path: str, write):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_json(path: str, data) -> int:
+    """
+    Atomically replaces a JSON file. Returns the new version stamp.
+    """
+    with locked(path) as lock_file:
+        _replace(path, lambda f: json.dump(data, f, indent=2))
+        return _bump(lock_file, new_generation=True)
+
+
+def read_json(path: str, default=None):
+    """
+    Reads a JSON file; renames are atomic, so no lock is needed.
+    """
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def update_json(path: str, update, default=None):
+    """
+    Read-modify-write under the exclusive lock: update(data) returns the new content.
+    """
+    with locked(path) as lock_file:
+        data = update(read_json(path, default))
+        _replace(path, lambda f: json.dump(data, f, indent=2))
+        _bump(lock_file, new_generation=True)
+        return data
+
+
+def write_json_coalesced(path: str, data):
+    """
+    Queues data as the next content of path. If another thread is already writing
+    the file it will also write this value, so the caller does not wait; only the
+    latest value is written.
+    """
+    key = os.path.abspath(path)
+    coalesce_lock = _coalesce_lock(path)
+    _pending[key] = data
+    # The writer re-checks after releasing, so a value queued meanwhile is not left behind
+    while key in _pending:
+        if not coalesce_lock.acquire(blocking=False):
+            return
+        try:
+            write_json(path, _pending.pop(key))
+        except KeyError:
+            pass
+        except Exception as e:
+            logging.warning(f"[StateFiles] Could not write {path}: {e}")
+        finally:
+            coalesce_lock.release()
+
+
+def replace_file(path: str, write) -> int:
+    """
+    Atomically replaces a file with the content write(f) produces.
+    """
+    with locked(path) as lock_file:
+        _replace(path, write)
+        return _bump(lock_file, new_generation=True)
+
+
+def append_text(path: str, chunks, header: str = "") -> int:
+    """
+    Appends text chunks to a file under the exclusive lock, writing header first
+    when the file is new or empty (which also starts a new generation).
+    """
+    with locked(path) as lock_file:
+        with open(path, "a", newline="") as f:
+            started = f.tell() == 0
+            if header and started:
+                f.write(header)
+            for chunk in chunks:
+                f.write(chunk)
+        return _bump(lock_file, new_generation=started)
@@ -16,8 +16,8 @@
 # limitations under the License.
 
 import os
-import json
 import logging
+from core.services import state_files
 
 RULES_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "webhook_config.json"))
 
@@ -27,8 +27,7 @@ def load_rules() -> dict:
         logging.warning("[WebhookRules] Config file not found, returning empty.")
         return {}
     try:
-        with open(RULES_PATH, "r") as f:
-            return json.load(f)
+        return state_files.read_json(RULES_PATH, {})
     except Exception as e:
         logging.error(f"[WebhookRules] Error loading rules: {e}")
         return {}
@@ -36,10 +35,26 @@ def load_rules() -> dict:
 
 def save_rules(config: dict) -> bool:
     try:
-        os.makedirs(os.path.dirname(RULES_PATH), exist_ok=True)
-        with open(RULES_PATH, "w") as f:
-            json.dump(config, f, indent=2)
+        state_files.write_json(RULES_PATH, config)
         return True
     except Exception as e:
         logging.error(f"[WebhookRules] Error saving rules: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+def update_rules(update) -> bool:
+    """
+    Applies update(config), which edits config in place, to the stored rules under the file lock, so concurrent
+    edits from other requests or workers are not lost.
+    """
+    def apply(config):
+        config = config or {}
+        update(config)
+        return config
+
+    try:
+        state_files.update_json(RULES_PATH, apply, {})
+        return True
+    except Exception as e:
+        logging.error(f"[WebhookRules] Error saving rules: {e}")
+        return False
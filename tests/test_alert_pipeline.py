@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import csv
+import pytest
+from core.services.alert_pipeline import CsvRowParser
+
+HEADER = "timestamp,src_ip,event_type\n"
+
+CASES = {
+    "stray_quote": HEADER + '2025-01-01,1.1.1.1,port 5" scan\n'
+                            "2025-01-02,2.2.2.2,login\n"
+                            "2025-01-03,3.3.3.3,scan\n",
+    "quoted_newlines": HEADER + '2025-01-01,1.1.1.1,"multi\nline\n""quoted"" event"\n'
+                                '2025-01-02,2.2.2.2,"a,b"\n',
+    "crlf": HEADER.replace("\n", "\r\n") + '2025-01-01,1.1.1.1,"x\r\ny"\r\n'
+                                            "2025-01-02,2.2.2.2,login\r\n",
+    "lone_cr": HEADER.replace("\n", "\r") + "2025-01-01,1.1.1.1,login\r2025-01-02,2.2.2.2,scan\r",
+    "no_trailing_newline": HEADER + "2025-01-01,1.1.1.1,login\n2025-01-02,2.2.2.2,scan",
+    "short_and_long_rows": HEADER + "2025-01-01,1.1.1.1\n2025-01-02,2.2.2.2,scan,extra\n\n",
+}
+
+
+def parse(text: str, chunk_size: int) -> list:
+    parser = CsvRowParser()
+    rows = []
+    for start in range(0, len(text), chunk_size):
+        rows.extend(parser.feed(text[start:start + chunk_size]))
+    return rows + parser.close()
+
+
+@pytest.mark.parametrize("name", CASES)
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1 << 20])
+def test_matches_dict_reader(name, chunk_size):
+    text = CASES[name]
+    expected = list(csv.DictReader(io.StringIO(text, newline="")))
+    assert parse(text, chunk_size) == expected
+
+
+def test_stray_quote_keeps_following_rows():
+    rows = parse(CASES["stray_quote"], 4)
+    assert [row["src_ip"] for row in rows] == ["1.1.1.1", "2.2.2.2", "3.3.3.3"]
+    assert rows[0]["event_type"] == 'port 5" scan'
+
+
+def test_quoted_newline_across_chunks():
+    rows = parse(CASES["quoted_newlines"], 5)
+    assert rows[0]["event_type"] == 'multi\nline\n"quoted" event'
+    assert rows[1]["event_type"] == "a,b"
+
+
+def test_crlf_split_between_chunks():
+    parser = CsvRowParser()
+    assert parser.feed("a,b\r") == []
+    assert parser.feed("\n1,2\r") == []
+    assert parser.feed("\n") == [{"a": "1", "b": "2"}]
+    assert parser.close() == []
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from core.services import archive
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path))
+    monkeypatch.setattr(archive, "ARCHIVE_ENABLED", True)
+    return tmp_path
+
+
+def alert(ioc_value, country=None, risk_score=0):
+    return {"timestamp": "2025-01-01 10:00:00", "ioc_type": "ip", "ioc_value": ioc_value,
+            "enrichment": {"country": country} if country else {}, "risk_score": risk_score}
+
+
+def test_aggregate_counts_groups_with_a_null_key(archive_dir):
+    archive.append([alert("a", risk_score=5), alert("b", risk_score=5), alert("c", risk_score=5),
+                    alert("d", "RU", risk_score=9)])
+
+    rows = archive.aggregate(["country"], ["risk_score"])
+
+    assert rows == [{"country": None, "count": 3, "risk_score_avg": 5.0},
+                    {"country": "RU", "count": 1, "risk_score_avg": 9.0}]
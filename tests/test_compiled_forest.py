@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# SOAR Lite Threat Intel Automation
+#
+# Copyright 2025 Renato Kopke (@renatokopke)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+from core.services.compiled_forest import CompiledForest, FOREST_META, export_forest, verify_export
+
+ensemble = pytest.importorskip("sklearn.ensemble")
+preprocessing = pytest.importorskip("sklearn.preprocessing")
+
+FEATURES = ["event_type_enc", "abuse_score", "total_reports", "country_enc", "usage_type_enc", "legacy_risk_score"]
+
+
+def fitted_forest(n_estimators=8, seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.integers(0, 4, 300),
+        rng.integers(0, 101, 300),
+        rng.integers(0, 500, 300),
+        rng.integers(0, 6, 300),
+        rng.integers(0, 3, 300),
+        rng.integers(0, 100, 300),
+    ]).astype(np.float64)
+    y = (X[:, 1] > 50).astype(int) + (X[:, 5] > 70).astype(int)
+    model = ensemble.RandomForestClassifier(n_estimators=n_estimators, max_depth=6, random_state=seed).fit(X, y)
+    return model, X
+
+
+def encoders():
+    def fitted(values):
+        return preprocessing.LabelEncoder().fit(values)
+
+    return {
+        "event_type": fitted(["brute_force", "c2_traffic", "port_scan", "suspicious_login"]),
+        "country": fitted(["BR", "CN", "DE", "RU", "US", "unknown"]),
+        "usage_type": fitted(["Data Center", "ISP", "unknown"]),
+        "action": fitted(["block", "investigate", "monitor"]),
+    }
+
+
+def test_verify_export_matches_sklearn(tmp_path):
+    model, X = fitted_forest()
+    export_forest(model, str(tmp_path), FEATURES, encoders())
+
+    result = verify_export(model, str(tmp_path), X)
+
+    assert result["samples"] == len(X)
+    assert result["same_labels"]
+    assert result["max_abs_diff"] <= 1e-9
+    with open(tmp_path / FOREST_META) as f:
+        assert json.load(f)["verification"] == result
+    forest = CompiledForest.load(str(tmp_path))
+    np.testing.assert_array_equal(forest.apply(X), model.apply(X.astype(np.float32)) + forest.roots)
+
+
+def test_verify_export_rejects_a_different_model(tmp_path):
+    model, X = fitted_forest(seed=0)
+    other, _ = fitted_forest(seed=1)
+    export_forest(other, str(tmp_path), FEATURES, encoders())
+
+    with pytest.raises(ValueError):
+        verify_export(model, str(tmp_path), X)
+    with open(tmp_path / FOREST_META) as f:
+        assert "verification" not in json.load(f)
+
+
+def test_classifier_module_does_not_import_joblib_or_pandas():
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    code = ("import sys; import core.services.ml_classifier; "
+            "print(sorted(name for name in ('joblib', 'pandas', 'sklearn') if name in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert output.stdout.strip().splitlines()[-1] == "[]"